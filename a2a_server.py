@@ -1,6 +1,11 @@
-from flask import Flask, request, jsonify
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, Response, request, jsonify
 from config import Config
 from agents import OpportunityAgent, RiskComplianceAgent
+import llm_clients
+from idempotency import IdempotencyConflict, IdempotencyTimeout, fingerprint, get_a2a_idempotency_cache
+import metrics
+import time
 import logging
 
 # Try to import A2A types if available
@@ -13,12 +18,113 @@ app = Flask(__name__)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("A2A_Server")
 
-# Initialize agents
+# Initialize agents (they share the process-wide model clients)
+llm_clients.warm_up()
 agents = {
     "opportunity_agent": OpportunityAgent(),
     "risk_compliance_agent": RiskComplianceAgent()
 }
 
+# One pool for every /a2a/message/batch request: concurrent batches share A2A_BATCH_MAX_WORKERS agent runs
+batch_executor = ThreadPoolExecutor(max_workers=max(1, Config.A2A_BATCH_MAX_WORKERS), thread_name_prefix="a2a-batch")
+
+metrics.register_process_collectors()
+metrics.REGISTRY.register_collector(metrics.stats_collector(
+    "copilot_a2a_idempotency", lambda: get_a2a_idempotency_cache().stats(),
+    {"executions": "counter", "replays": "counter", "joined": "counter", "conflicts": "counter",
+     "evictions": "counter", "entries": "gauge", "in_flight": "gauge"}))
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype=metrics.CONTENT_TYPE)
+
+@app.route('/health', methods=['GET'])
+def health():
+    return jsonify({"status": "ok", "agents": sorted(agents), "llm_clients": llm_clients.stats(),
+                    "idempotency": get_a2a_idempotency_cache().stats()})
+
+REQUIRED_KEYS = ["message_id", "from_agent", "to_agent", "payload"]
+RETRY_AFTER_SECONDS = 5  # suggested to a peer whose duplicate timed out waiting for the first execution
+
+
+def _run_agent(envelope: dict) -> dict:
+    """Runs the target agent on the envelope's payload and builds the response envelope."""
+    target_agent_name = envelope.get("to_agent")
+    agent = agents[target_agent_name]
+    payload = envelope.get("payload", {})
+
+    # Execute Agent Logic
+    started = time.perf_counter()
+    try:
+        # We map the A2A payload directly to the agent's run method kwargs
+        # In a full ADK implementation, we might specificy the 'tool' or 'task' in the envelope
+        result = agent.run(**payload)
+        status = "success"
+        output_payload = result
+    except Exception as e:
+        logger.error(f"Agent execution failed: {e}")
+        status = "error"
+        output_payload = {"error": str(e)}
+    metrics.A2A_MESSAGE_SECONDS.observe(time.perf_counter() - started, agent=target_agent_name, status=status)
+
+    # Construct Response Envelope
+    return {
+        "message_id": f"{envelope.get('message_id')}_resp",
+        "reply_to": envelope.get("message_id"),
+        "from_agent": target_agent_name,
+        "to_agent": envelope.get("from_agent"),
+        "status": status,
+        "payload": output_payload,
+        "metadata": {
+            "library": "google-adk",
+            "version": "1.0-prototype"
+        }
+    }
+
+
+def process_envelope(envelope) -> tuple:
+    """
+    (response body, HTTP status) for one A2A envelope.
+    A message_id the sender already used is answered from the idempotency cache (metadata.replayed),
+    without running the agent again; failed executions are not stored, so a retry runs for real.
+    """
+    logger.info(f"Received A2A message: {envelope}")
+
+    # Envelope Validation (Minimal)
+    if not isinstance(envelope, dict) or not all(k in envelope for k in REQUIRED_KEYS):
+        return {"error": "Invalid A2A Envelope", "missing": REQUIRED_KEYS}, 400
+
+    target_agent_name = envelope.get("to_agent")
+    if target_agent_name not in agents:
+        return {"error": f"Agent {target_agent_name} not found"}, 404
+
+    try:
+        response_envelope, replayed = get_a2a_idempotency_cache().run(
+            f"{envelope['from_agent']}:{envelope['message_id']}",
+            fingerprint(target_agent_name, envelope["payload"]),
+            lambda: _run_agent(envelope),
+            store=lambda response: response["status"] == "success"
+        )
+    except IdempotencyConflict as e:
+        return {"error": str(e)}, 409
+    except IdempotencyTimeout as e:
+        # Not an error on the peer's side: the first delivery is still running, the reply will be stored
+        return {"error": str(e), "retry_after": RETRY_AFTER_SECONDS}, 503
+
+    if replayed:
+        response_envelope = dict(response_envelope, metadata=dict(response_envelope["metadata"], replayed=True))
+    return response_envelope, 200
+
+
+def _process_batch_item(envelope) -> dict:
+    try:
+        body, http_status = process_envelope(envelope)
+    except Exception as e:
+        logger.error(f"A2A batch item failed: {e}")
+        body, http_status = {"error": str(e)}, 500
+    return {"http_status": http_status, "response": body}
+
+
 @app.route('/a2a/message', methods=['POST'])
 def handle_message():
     """
@@ -26,48 +132,33 @@ def handle_message():
     Adheres to the standard envelope structure found in google-adk a2a specifications.
     """
     try:
-        envelope = request.json
-        logger.info(f"Received A2A message: {envelope}")
-        
-        # Envelope Validation (Minimal)
-        required_keys = ["message_id", "from_agent", "to_agent", "payload"]
-        if not all(k in envelope for k in required_keys):
-            return jsonify({"error": "Invalid A2A Envelope", "missing": required_keys}), 400
-
-        target_agent_name = envelope.get("to_agent")
-        if target_agent_name not in agents:
-            return jsonify({"error": f"Agent {target_agent_name} not found"}), 404
-            
-        agent = agents[target_agent_name]
-        payload = envelope.get("payload", {})
-        
-        # Execute Agent Logic
-        try:
-            # We map the A2A payload directly to the agent's run method kwargs
-            # In a full ADK implementation, we might specificy the 'tool' or 'task' in the envelope
-            result = agent.run(**payload)
-            status = "success"
-            output_payload = result
-        except Exception as e:
-            logger.error(f"Agent execution failed: {e}")
-            status = "error"
-            output_payload = {"error": str(e)}
-
-        # Construct Response Envelope
-        response_envelope = {
-            "message_id": f"{envelope.get('message_id')}_resp",
-            "reply_to": envelope.get("message_id"),
-            "from_agent": target_agent_name,
-            "to_agent": envelope.get("from_agent"),
-            "status": status,
-            "payload": output_payload,
-            "metadata": {
-                "library": "google-adk",
-                "version": "1.0-prototype"
-            }
-        }
-        
-        return jsonify(response_envelope), 200
+        body, http_status = process_envelope(request.json)
+        headers = {"Retry-After": str(body["retry_after"])} if "retry_after" in body else {}
+        return jsonify(body), http_status, headers
+
+    except Exception as e:
+        logger.error(f"A2A Server Error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/a2a/message/batch', methods=['POST'])
+def handle_message_batch():
+    """
+    Several A2A envelopes in one request (a JSON array, or {"messages": [...]}), run concurrently on the
+    shared batch pool (A2A_BATCH_MAX_WORKERS threads across all batches). Results keep the request order,
+    each with its own HTTP status.
+    """
+    try:
+        data = request.json
+        envelopes = data.get("messages") if isinstance(data, dict) else data
+        if not isinstance(envelopes, list) or not envelopes:
+            return jsonify({"error": "A non-empty list of A2A envelopes is required"}), 400
+        if len(envelopes) > Config.A2A_BATCH_MAX_MESSAGES:
+            return jsonify({"error": f"At most {Config.A2A_BATCH_MAX_MESSAGES} envelopes per batch"}), 413
+
+        results = list(batch_executor.map(_process_batch_item, envelopes))
+
+        succeeded = sum(1 for r in results if r["http_status"] == 200 and r["response"].get("status") == "success")
+        return jsonify({"results": results, "succeeded": succeeded, "failed": len(results) - succeeded}), 200
 
     except Exception as e:
         logger.error(f"A2A Server Error: {e}")
@@ -1,7 +1,21 @@
 import google.generativeai as genai
-import json
+from google.api_core.exceptions import InvalidArgument
 import logging
+import time
+from bct_index import extract_regulation_query
+from call_policy import call_with_policy
 from config import Config
+from llm_cache import get_response_cache
+from llm_providers import get_provider
+from metrics import (
+    LLM_CACHE_HITS, LLM_CALL_SECONDS, LLM_ERRORS, LLM_OUTPUT_TOKENS, LLM_PROMPT_TOKENS, LLM_VALIDATION_FAILURES
+)
+from normalizer import normalize_client_snapshot
+from prompting import (
+    PromptSection, build_prompt, compact_schema, disable_response_schema, estimate_tokens, project_for,
+    response_schema
+)
+from rate_limit import acquire_gemini_slot
 from schemas import (
     NormalizedClientSnapshot, FicheDeVisiteResult, RiskComplianceResult,
     OpportunityPlanResult, AfterMeetingResult
@@ -25,152 +39,255 @@ except ImportError:
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Configure Gemini
-try:
-    genai.configure(api_key=Config.GEMINI_API_KEY)
-except Exception as e:
-    logger.error(f"Failed to configure Gemini: {e}")
-
 class BaseAgent(AdkAgent):
     """
     Wrapper combining Google ADK Agent structure with Gemini 2.0 Flash reasoning.
     """
-    def __init__(self, name: str, model_name: str = Config.GEMINI_MODEL):
+    model_name: str = Config.GEMINI_MODEL
+
+    def __init__(self, name: str, output_schema=None, model_name: str = Config.GEMINI_MODEL):
         super().__init__(name=name)
-        self.model = genai.GenerativeModel(model_name)
-        
-    def generate(self, prompt: str, schema_class) -> dict:
-        """Generates content and attempts to parse it as strict JSON matching the schema."""
-        logger.info(f"Agent {self.name} invoked.")
-        
-        full_prompt = (
+        self.model_name = model_name
+        self.model = get_provider().get_model(model_name, name, output_schema)
+        if output_schema is not None:
+            # Precompute both schema forms once instead of on every call
+            compact_schema(output_schema)
+            response_schema(output_schema)
+
+    def _build_full_prompt(self, prompt: str, schema_class, structured: bool) -> str:
+        if structured:
+            # Constrained decoding enforces the schema: no need to spend tokens on it
+            return f"You are the {self.name}.\n\nTask:\n{prompt}"
+        return (
             f"You are the {self.name}. \n"
             f"Your output must be strict JSON adhering to the following schema:\n"
-            f"{schema_class.model_json_schema()}\n"
+            f"{compact_schema(schema_class)}\n"
             f"Important: Do not output markdown blocks like ```json ... ```. Just the raw JSON string.\n\n"
             f"Task:\n{prompt}"
         )
 
+    def generate(self, prompt: str, schema_class) -> dict:
+        """Generates content and attempts to parse it as strict JSON matching the schema."""
+        logger.info(f"Agent {self.name} invoked.")
+
+        schema = response_schema(schema_class)
+        full_prompt = self._build_full_prompt(prompt, schema_class, schema is not None)
+        prompt_tokens = estimate_tokens(full_prompt)
+
+        # Identical prompts (same agent/model/schema) are answered from the response cache.
+        # Cached text is re-validated, so a bad entry is dropped instead of poisoning the result.
+        cache = get_response_cache()
+        cache_key = cache.make_key(self.name, self.model_name, schema_class, full_prompt) if cache else None
+        cached_text = cache.get(cache_key) if cache else None
+        if cached_text is not None:
+            try:
+                result = self._parse_response(cached_text, schema_class)
+                LLM_CACHE_HITS.inc(agent=self.name)
+                logger.info(f"Agent {self.name} served from cache (~{prompt_tokens} prompt tokens saved).")
+                return result
+            except Exception as e:
+                logger.warning(f"Agent {self.name} discarded invalid cache entry: {e}")
+                cache.invalidate(cache_key)
+
         try:
-            response = self.model.generate_content(
-                full_prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=0.2, # Low temp for factual/structured output
-                    response_mime_type="application/json" 
+            call_started = time.perf_counter()
+            try:
+                response = self._generate_content(full_prompt, schema)
+            except InvalidArgument as e:
+                if schema is None:
+                    raise
+                # Gemini rejected the response schema: use the text schema from now on
+                logger.warning(f"Agent {self.name}: response_schema rejected ({e}), using the text schema")
+                disable_response_schema(schema_class)
+                full_prompt = self._build_full_prompt(prompt, schema_class, False)
+                prompt_tokens = estimate_tokens(full_prompt)
+                cache_key = cache.make_key(self.name, self.model_name, schema_class, full_prompt) if cache else None
+                response = self._generate_content(full_prompt, None)
+            LLM_CALL_SECONDS.observe(time.perf_counter() - call_started, agent=self.name)
+
+            try:
+                result = self._parse_response(response.text, schema_class)
+            except ValueError:
+                LLM_VALIDATION_FAILURES.inc(agent=self.name)
+                raise
+            if cache:
+                cache.set(cache_key, response.text)
+            usage = getattr(response, "usage_metadata", None)
+            if usage is not None:
+                LLM_PROMPT_TOKENS.observe(usage.prompt_token_count, agent=self.name)
+                LLM_OUTPUT_TOKENS.observe(usage.candidates_token_count, agent=self.name)
+                logger.info(
+                    f"Agent {self.name} finished successfully. Tokens: prompt={usage.prompt_token_count} "
+                    f"(estimated {prompt_tokens}), output={usage.candidates_token_count}"
                 )
-            )
-            
-            # Helper to clean markdown if present
-            text = response.text.strip()
-            if text.startswith("```json"):
-                text = text[7:-3]
-            elif text.startswith("```"):
-                text = text[3:-3]
-                
-            data = json.loads(text)
-            
-            # Validate with Pydantic
-            validated_obj = schema_class(**data)
-            logger.info(f"Agent {self.name} finished successfully.")
-            return validated_obj.model_dump()
+            else:
+                output_tokens = estimate_tokens(response.text)
+                LLM_PROMPT_TOKENS.observe(prompt_tokens, agent=self.name)
+                LLM_OUTPUT_TOKENS.observe(output_tokens, agent=self.name)
+                logger.info(
+                    f"Agent {self.name} finished successfully. Tokens: prompt~{prompt_tokens}, "
+                    f"output~{output_tokens}"
+                )
+            return result
             
         except Exception as e:
+            LLM_ERRORS.inc(agent=self.name, error=type(e).__name__)
             logger.error(f"Agent {self.name} failed: {e}")
             raise e
 
+    def _generate_content(self, full_prompt: str, schema):
+        """One Gemini request under the agent's call policy (retry, circuit breaker, hedging)."""
+        def request():
+            acquire_gemini_slot(self.name)
+            return self.model.generate_content(
+                full_prompt,
+                generation_config=genai.types.GenerationConfig(
+                    temperature=0.2, # Low temp for factual/structured output
+                    response_mime_type="application/json",
+                    response_schema=schema
+                )
+            )
+        return call_with_policy(self.name, request)
+
+    @staticmethod
+    def _parse_response(text: str, schema_class) -> dict:
+        """Validates the JSON text against the schema in one pass (markdown fences stripped if present)."""
+        text = text.strip()
+        if text.startswith("```json"):
+            text = text[7:-3]
+        elif text.startswith("```"):
+            text = text[3:-3]
+
+        # pydantic-core parses and validates directly from the string (no json.loads + dict copy)
+        return schema_class.model_validate_json(text).model_dump()
+
 class DataRetrieverAgent(BaseAgent):
     def __init__(self):
-        super().__init__("data_retriever_agent")
+        super().__init__("data_retriever_agent", NormalizedClientSnapshot)
 
     def run(self, client_id: str) -> dict:
         data = get_client_data(client_id)
-        prompt = (
-            f"Normalize the raw client data for {client_id} into a clean snapshot.\n"
-            f"Raw Data:\n{json.dumps(data, indent=2)}\n"
-            f"Instructions:\n"
-            f"- Extract key CRM info, financial summary (metrics), products active, and recent interaction summaries.\n"
-            f"- Include 'centrale_risques' data if available (this is CRITICAL).\n"
-            f"- Identify any critical missing documents.\n"
-            f"- Do NOT halluncinate data. If missing, leave empty or note in 'missing_data'."
+
+        # Fast path: the fixtures have a known layout, so map them directly
+        snapshot, unmapped = None, []
+        if Config.FAST_NORMALIZER:
+            snapshot, unmapped = normalize_client_snapshot(client_id, data)
+            if not unmapped:
+                logger.info(f"Agent {self.name} normalized {client_id} without LLM.")
+                return NormalizedClientSnapshot(**snapshot).model_dump()
+            logger.info(f"Agent {self.name} falling back to LLM for: {unmapped}")
+
+        # Interactions are the bulkiest and least critical source: they go first when over budget
+        raw = {k: v for k, v in data.items() if k != "interactions_log"}
+        prompt = build_prompt(
+            self.name,
+            f"Normalize the raw client data for {client_id} into a clean snapshot.",
+            [
+                PromptSection("Raw Data", raw, priority=0),
+                PromptSection("Interactions Log", data.get("interactions_log") or [], priority=1)
+            ],
+            [
+                "Extract key CRM info, financial summary (metrics), products active, and recent interaction summaries.",
+                "Include 'centrale_risques' data if available (this is CRITICAL).",
+                "Identify any critical missing documents.",
+                "Do NOT halluncinate data. If missing, leave empty or note in 'missing_data'."
+            ]
         )
-        return self.generate(prompt, NormalizedClientSnapshot)
+        llm_snapshot = self.generate(prompt, NormalizedClientSnapshot)
+        if snapshot is None:
+            return llm_snapshot
+
+        # Keep the deterministic mapping, take from the LLM only what it could not map
+        for field in unmapped:
+            snapshot[field] = llm_snapshot.get(field)
+        snapshot["missing_data"] += [m for m in llm_snapshot.get("missing_data", []) if m not in snapshot["missing_data"]]
+        return NormalizedClientSnapshot(**snapshot).model_dump()
 
 class ClientBriefAgent(BaseAgent):
     def __init__(self):
-        super().__init__("client_brief_agent")
+        super().__init__("client_brief_agent", FicheDeVisiteResult)
 
     def run(self, snapshot: dict) -> dict:
-        prompt = (
-            f"Act as a Chargé de Clientèle. Prepare the 'Fiche de Visite'.\n"
-            f"Snapshot:\n{json.dumps(snapshot, indent=2)}\n"
-            f"Instructions:\n"
-            f"- 'objet_visite': Define the clear goal (e.g., 'Renouvellement dossier', 'Prospection').\n"
-            f"- 'chiffres_cles': Extract CA, Total Engagement, and Impayés (from BCT report).\n"
-            f"- 'points_vigilance': Highlight expired docs or BCT anomalies.\n"
-            f"- 'agenda_rencontre': Steps for the meeting.\n"
-            f"- 'questions_decouverte': Sales questions."
+        prompt = build_prompt(
+            self.name,
+            "Act as a Chargé de Clientèle. Prepare the 'Fiche de Visite'.",
+            [PromptSection("Snapshot", project_for(self.name, "snapshot", snapshot), priority=0)],
+            [
+                "'objet_visite': Define the clear goal (e.g., 'Renouvellement dossier', 'Prospection').",
+                "'chiffres_cles': Extract CA, Total Engagement, and Impayés (from BCT report).",
+                "'points_vigilance': Highlight expired docs or BCT anomalies.",
+                "'agenda_rencontre': Steps for the meeting.",
+                "'questions_decouverte': Sales questions."
+            ]
         )
         return self.generate(prompt, FicheDeVisiteResult)
 
 class RiskComplianceAgent(BaseAgent):
     def __init__(self):
-        super().__init__("risk_compliance_agent")
+        super().__init__("risk_compliance_agent", RiskComplianceResult)
 
     def run(self, snapshot: dict, brief: dict) -> dict:
-        # Retrieve relevant circulars (naive search based on snapshot segment or keywords)
-        # In a real app we'd extract keywords first. Here we dump all for context.
-        regulations = search_bct_regulations([]) 
+        # Only the circulars ranked most relevant to this client go into the prompt
+        regulations = search_bct_regulations(extract_regulation_query(snapshot), top_k=Config.BCT_TOP_K)
         
-        prompt = (
-            f"Analyze risk and compliance methodology.\n"
-            f"Snapshot:\n{json.dumps(snapshot, indent=2)}\n"
-            f"Brief:\n{json.dumps(brief, indent=2)}\n"
-            f"Relevant BCT Regulations:\n{json.dumps(regulations, indent=2)}\n"
-            f"Instructions:\n"
-            f"- Flag risks (KYC, financial, behavioral).\n"
-            f"- CITE specific BCT Circulars in your risk flags if applicable.\n"
-            f"- Create a strict verification checklist.\n"
-            f"- List DO NOT DO actions (guardrails).\n"
-            f"- Set requires_human_approval to true."
+        prompt = build_prompt(
+            self.name,
+            "Analyze risk and compliance methodology.",
+            [
+                PromptSection("Snapshot", project_for(self.name, "snapshot", snapshot), priority=0),
+                PromptSection("Brief", project_for(self.name, "brief", brief), priority=2),
+                PromptSection("Relevant BCT Regulations", regulations, priority=1)
+            ],
+            [
+                "Flag risks (KYC, financial, behavioral).",
+                "CITE specific BCT Circulars in your risk flags if applicable.",
+                "Create a strict verification checklist.",
+                "List DO NOT DO actions (guardrails).",
+                "Set requires_human_approval to true."
+            ]
         )
         return self.generate(prompt, RiskComplianceResult)
 
 class OpportunityAgent(BaseAgent):
     def __init__(self):
-        super().__init__("opportunity_agent")
+        super().__init__("opportunity_agent", OpportunityPlanResult)
 
     def run(self, snapshot: dict, brief: dict) -> dict:
         catalog = get_product_catalog()
         simulations = get_standard_simulations()
         
-        prompt = (
-            f"Act as a Credit Analyst. Prepare arguments for the Credit Committee.\n"
-            f"Snapshot:\n{json.dumps(snapshot, indent=2)}\n"
-            f"Catalog:\n{json.dumps(catalog, indent=2)}\n"
-            f"Financial Cheat Sheet:\n{simulations}\n"
-            f"Fiche Visite Summary: {brief.get('synthese_situation')}\n"
-            f"Instructions:\n"
-            f"- Propose a credit structure (Amount, Purpose).\n"
-            f"- JUSTIFY the proposal using financial logic (Cash flow vs Repayment).\n"
-            f"- Mention 'Mitigation Factors' for any risks.\n"
-            f"- Use 'CreditCommitteeArgument' structure."
+        prompt = build_prompt(
+            self.name,
+            "Act as a Credit Analyst. Prepare arguments for the Credit Committee.",
+            [
+                PromptSection("Snapshot", project_for(self.name, "snapshot", snapshot), priority=0),
+                PromptSection("Catalog", catalog, priority=1),
+                PromptSection("Financial Cheat Sheet", simulations, priority=2),
+                PromptSection("Fiche Visite Summary", str(brief.get('synthese_situation')), priority=0)
+            ],
+            [
+                "Propose a credit structure (Amount, Purpose).",
+                "JUSTIFY the proposal using financial logic (Cash flow vs Repayment).",
+                "Mention 'Mitigation Factors' for any risks.",
+                "Use 'CreditCommitteeArgument' structure."
+            ]
         )
         return self.generate(prompt, OpportunityPlanResult)
 
 class AfterMeetingAgent(BaseAgent):
     def __init__(self):
-        super().__init__("after_meeting_agent")
+        super().__init__("after_meeting_agent", AfterMeetingResult)
 
     def run(self, banker_notes: list, client_id: str, meeting_date: str) -> dict:
-        prompt = (
-            f"Act as a Secretary. Finalize the file after the visit.\n"
-            f"Client ID: {client_id}\n"
-            f"Date: {meeting_date}\n"
-            f"Notes:\n{json.dumps(banker_notes, indent=2)}\n"
-            f"Instructions:\n"
-            f"- Write a formal 'Compte-rendu de visite' (Official Minutes).\n"
-            f"- List specific tasks (Recuperer bilan, Signer contrats).\n"
-            f"- Draft email to client.\n"
-            f"- Determine if action_committee_required (if new credit requested)."
+        prompt = build_prompt(
+            self.name,
+            f"Act as a Secretary. Finalize the file after the visit.\nClient ID: {client_id}\nDate: {meeting_date}",
+            [PromptSection("Notes", banker_notes, priority=0)],
+            [
+                "Write a formal 'Compte-rendu de visite' (Official Minutes).",
+                "List specific tasks (Recuperer bilan, Signer contrats).",
+                "Draft email to client.",
+                "Determine if action_committee_required (if new credit requested)."
+            ]
         )
         return self.generate(prompt, AfterMeetingResult)
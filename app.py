@@ -1,11 +1,22 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
 from config import Config
 from orchestrator import Orchestrator
 import logging
-import os
 import json
 from telegram_notifier import telegram_notifier
+from llm_cache import get_response_cache
+from jobs import JobQueue
+from fixture_cache import fixture_cache
+from conversation_agent import ConversationAgent
+from session_store import get_session_store
+from client_directory import get_client_directory
+from tools import get_product_catalog, search_bct_regulations
+import llm_clients
+import call_policy
+import rate_limit
+import metrics
+import time
 
 app = Flask(__name__)
 CORS(app)
@@ -14,17 +25,107 @@ CORS(app)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize Orchestrator
+# Initialize Orchestrator and the shared model clients (one per model for the whole process).
+# When serve.py preloads this module, the gRPC clients are opened in each forked worker instead
+llm_clients.warm_up(open_clients=not Config.PRELOAD_APP)
 orchestrator = Orchestrator()
+conversation_agent = ConversationAgent()  # stateless: session state lives in session_store
+
+metrics.register_process_collectors()
+metrics.REGISTRY.register_collector(metrics.stats_collector(
+    "copilot_prep_pack_cache", lambda: orchestrator.prep_pack_cache.stats() if orchestrator.prep_pack_cache else {},
+    {"hits": "counter", "misses": "counter", "entries": "gauge"}
+))
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype=metrics.CONTENT_TYPE)
 
 @app.route('/health', methods=['GET'])
 def health():
+    cache = get_response_cache()
     return jsonify({
         "status": "ok",
         "model": Config.GEMINI_MODEL,
-        "data_mode": Config.DATA_MODE
+        "data_mode": Config.DATA_MODE,
+        "llm_cache": cache.stats() if cache else None,
+        "prep_pack_cache": orchestrator.prep_pack_cache.stats() if orchestrator.prep_pack_cache else None,
+        "fixture_cache": fixture_cache.stats(),
+        "llm_clients": llm_clients.stats(),
+        "call_policy": call_policy.stats(),
+        "sessions": session_store.stats(),
+        "client_directory": get_client_directory().stats(),
+        "telegram": telegram_notifier.stats()
     })
 
+def notify_prep_pack(client_id: str, result: dict):
+    """Queue the Telegram notification (sent by the background dispatcher, never awaited here)"""
+    try:
+        client_name = result.get("prep_pack", {}).get("snapshot", {}).get("company_name", client_id)
+        report_md = result.get("report_markdown", "")
+        telegram_notifier.send_prep_pack(client_name, report_md)
+    except Exception as tg_error:
+        logger.error(f"Telegram notification failed (non-blocking): {tg_error}")
+
+def _prep_pack_job(client_id: str, payload: dict) -> dict:
+    result = orchestrator.build_prep_pack(client_id, payload.get("language", "fr"))
+    notify_prep_pack(client_id, result)
+    return result
+
+def _after_meeting_job(client_id: str, payload: dict) -> dict:
+    return orchestrator.update_case_after_meeting(client_id, payload)
+
+# Background jobs: submit returns a job_id at once, workers run the multi-agent chain
+job_queue = JobQueue({"prep_pack": _prep_pack_job, "after_meeting": _after_meeting_job})
+if Config.PRELOAD_APP:
+    job_queue.recover()  # the workers start in each forked process (start_worker_process)
+else:
+    job_queue.start()
+
+def warm_caches():
+    """Loads client fixtures, the product catalog, the BCT base and the client directory (before forking workers)."""
+    repository = orchestrator.repository
+    for client_id in repository.list_clients()[:fixture_cache.max_clients]:
+        repository.get_client_data(client_id)
+    get_product_catalog()
+    search_bct_regulations()
+    get_client_directory().refresh()
+
+def start_worker_process(workers: int = 1):
+    """Per-process setup of a worker forked from the preloaded app (serve.py post_fork hook)."""
+    orchestrator.repository.reopen()
+    session_store.reopen()
+    cache = get_response_cache()
+    if cache:
+        cache.reopen()
+    telegram_notifier.dispatcher.reopen()
+    llm_clients.warm_up()
+    rate_limit.share_gemini_limit(workers)
+    job_queue.reopen()
+    job_queue.start(recover=False)
+
+_shutdown_deadline = None
+
+def begin_worker_shutdown(timeout: float):
+    """
+    Called when shutdown starts (SIGTERM): stops claiming background jobs at once, so the running ones
+    drain alongside in-flight requests within the same `timeout` instead of after it.
+    """
+    global _shutdown_deadline
+    if _shutdown_deadline is None:
+        _shutdown_deadline = time.monotonic() + timeout
+    job_queue.shutdown(wait=False)
+
+def stop_worker_process(timeout: float):
+    """Graceful stop: lets running jobs finish, then flushes queued Telegram notifications, all before the deadline."""
+    begin_worker_shutdown(timeout)
+    remaining = max(0.0, _shutdown_deadline - time.monotonic())
+    telegram_share = min(5.0, remaining / 4)
+    if not job_queue.shutdown(timeout=remaining - telegram_share):
+        logger.warning("Background jobs still running at the shutdown deadline; "
+                       "another worker re-queues them once their lease expires")
+    telegram_notifier.dispatcher.close(max(0.0, _shutdown_deadline - time.monotonic()))
+
 @app.route('/prep-pack', methods=['POST'])
 def prep_pack():
     try:
@@ -36,14 +137,7 @@ def prep_pack():
         language = data.get("language", "fr")
         
         result = orchestrator.build_prep_pack(client_id, language)
-        
-        # Send Telegram notification
-        try:
-            client_name = result.get("prep_pack", {}).get("snapshot", {}).get("company_name", client_id)
-            report_md = result.get("report_markdown", "")
-            telegram_notifier.send_prep_pack(client_name, report_md)
-        except Exception as tg_error:
-            logger.error(f"Telegram notification failed (non-blocking): {tg_error}")
+        notify_prep_pack(client_id, result)
         
         return jsonify(result), 200
         
@@ -51,6 +145,65 @@ def prep_pack():
         logger.error(f"Error in /prep-pack: {e}", exc_info=True)
         return jsonify({"error": str(e)}), 500
 
+def _sse(event: str, payload: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False, default=str)}\n\n"
+
+@app.route('/prep-pack/stream', methods=['GET', 'POST'])
+def prep_pack_stream():
+    """
+    Server-sent events version of /prep-pack: one event per section as soon as its agent finishes
+    (snapshot, fiche_visite, risk_assessment, opportunities), then 'complete'.
+    GET ?client_id=... works with the browser EventSource API.
+    """
+    data = request.get_json(silent=True) or request.args
+    if not data or "client_id" not in data:
+        return jsonify({"error": "client_id is required"}), 400
+
+    client_id = data["client_id"]
+    language = data.get("language", "fr")
+
+    def events():
+        try:
+            for event, payload in orchestrator.iter_prep_pack(client_id, language):
+                if event == "complete":
+                    notify_prep_pack(client_id, payload)
+                    payload = {"client_id": client_id, "report_path": payload["report_path"]}
+                yield _sse(event, payload)
+        except Exception as e:
+            logger.error(f"Error in /prep-pack/stream: {e}", exc_info=True)
+            yield _sse("error", {"client_id": client_id, "error": str(e)})
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route('/prep-pack/batch', methods=['POST'])
+def prep_pack_batch():
+    """Prep packs for a list of clients (e.g. the week's visits) plus a portfolio summary."""
+    try:
+        data = request.json
+        if not data or not isinstance(data.get("client_ids"), list) or not data["client_ids"]:
+            return jsonify({"error": "client_ids (non-empty list) is required"}), 400
+        try:
+            max_workers = int(data.get("max_workers", Config.BATCH_MAX_WORKERS))
+        except (TypeError, ValueError):
+            return jsonify({"error": "max_workers must be an integer"}), 400
+        if max_workers < 1:
+            return jsonify({"error": "max_workers must be at least 1"}), 400
+
+        result = orchestrator.build_prep_packs(
+            data["client_ids"],
+            language=data.get("language", "fr"),
+            max_workers=min(max_workers, Config.BATCH_MAX_WORKERS)
+        )
+        return jsonify(result), 200
+
+    except Exception as e:
+        logger.error(f"Error in /prep-pack/batch: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/client-update', methods=['POST'])
 def client_update():
     """Handle informal client updates (calls, emails, doc received) without formal meeting."""
@@ -66,14 +219,6 @@ def client_update():
         
         # Save directly to interactions log
         import datetime
-        from tools import new_id
-        log_path = os.path.join("data", "fake_clients", client_id, "interactions_log.json")
-        
-        if os.path.exists(log_path):
-            with open(log_path, "r", encoding="utf-8") as f:
-                logs = json.load(f)
-        else:
-            logs = []
             
         new_entry = {
             "date": datetime.datetime.now().strftime("%Y-%m-%d"),
@@ -81,10 +226,8 @@ def client_update():
             "summary": message,
             "outcome": "Logged via chatbot."
         }
-        logs.insert(0, new_entry)
-        
-        with open(log_path, "w", encoding="utf-8") as f:
-            json.dump(logs, f, indent=2)
+        orchestrator.repository.add_interaction(client_id, new_entry)
+        orchestrator.invalidate_client(client_id)
             
         return jsonify({"success": True, "message": "Update logged successfully"}), 200
         
@@ -103,17 +246,9 @@ def create_reminder():
             
         client_id = data["client_id"]
         
-        # Save to reminders file
+        # Save to reminders
         import datetime
-        import json
         from tools import new_id
-        reminders_path = os.path.join("data", "fake_clients", client_id, "reminders.json")
-        
-        if os.path.exists(reminders_path):
-            with open(reminders_path, "r", encoding="utf-8") as f:
-                reminders = json.load(f)
-        else:
-            reminders = []
             
         new_reminder = {
             "id": new_id("reminder"),
@@ -125,13 +260,8 @@ def create_reminder():
             "created_at": datetime.datetime.now().isoformat(),
             "created_by": "Banker"
         }
-        reminders.append(new_reminder)
-        
-        # Ensure directory exists
-        os.makedirs(os.path.dirname(reminders_path), exist_ok=True)
-        
-        with open(reminders_path, "w", encoding="utf-8") as f:
-            json.dump(reminders, f, indent=2)
+        orchestrator.repository.add_reminder(client_id, new_reminder)
+        orchestrator.invalidate_client(client_id)
             
         return jsonify({"success": True, "reminder": new_reminder}), 200
         
@@ -143,21 +273,26 @@ def create_reminder():
 def get_reminders(client_id):
     """Get all reminders for a client."""
     try:
-        import json
-        reminders_path = os.path.join("data", "fake_clients", client_id, "reminders.json")
-        
-        if not os.path.exists(reminders_path):
-            return jsonify({"reminders": []}), 200
-            
-        with open(reminders_path, "r", encoding="utf-8") as f:
-            reminders = json.load(f)
-            
+        reminders = orchestrator.repository.get_reminders(client_id)
         return jsonify({"reminders": reminders}), 200
         
     except Exception as e:
         logger.error(f"Error in /get-reminders: {e}", exc_info=True)
         return jsonify({"error": str(e)}), 500
 
+@app.route('/clients/search', methods=['GET'])
+def search_clients():
+    """Client lookup by (possibly misspelled) name, trade name, tax id or stakeholder: ?q=sotuplst&limit=5"""
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"error": "q is required"}), 400
+    try:
+        limit = int(request.args.get("limit", 5))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    limit = max(1, min(limit, 50))
+    return jsonify({"query": query, "results": get_client_directory().search(query, limit)}), 200
+
 @app.route('/after-meeting', methods=['POST'])
 def after_meeting():
     try:
@@ -175,14 +310,78 @@ def after_meeting():
         logger.error(f"Error in /after-meeting: {e}", exc_info=True)
         return jsonify({"error": str(e)}), 500
 
-# Conversation sessions (in-memory for demo, use Redis in production)
-conversation_sessions = {}
+@app.route('/jobs/prep-pack', methods=['POST'])
+def submit_prep_pack_job():
+    """Queue a prep pack; poll /jobs/<job_id> for progress."""
+    try:
+        data = request.json
+        if not data or "client_id" not in data:
+            return jsonify({"error": "client_id is required"}), 400
+        if not isinstance(data["client_id"], str):
+            return jsonify({"error": "client_id must be a string"}), 400
+
+        job, deduplicated = job_queue.submit("prep_pack", data["client_id"], {"language": data.get("language", "fr")})
+        return jsonify({"job_id": job["job_id"], "status": job["status"], "deduplicated": deduplicated}), 202
+
+    except Exception as e:
+        logger.error(f"Error in /jobs/prep-pack: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/jobs/after-meeting', methods=['POST'])
+def submit_after_meeting_job():
+    """Queue after-meeting processing; poll /jobs/<job_id> for progress."""
+    try:
+        data = request.json
+        required_fields = ["client_id", "meeting_date", "banker_notes"]
+        if not data or any(f not in data for f in required_fields):
+            return jsonify({"error": f"Missing required fields: {required_fields}"}), 400
+        if not isinstance(data["client_id"], str):
+            return jsonify({"error": "client_id must be a string"}), 400
+
+        job, deduplicated = job_queue.submit("after_meeting", data["client_id"], data)
+        return jsonify({"job_id": job["job_id"], "status": job["status"], "deduplicated": deduplicated}), 202
+
+    except Exception as e:
+        logger.error(f"Error in /jobs/after-meeting: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    try:
+        job = job_queue.get(job_id)
+        if job is None:
+            return jsonify({"error": f"Job {job_id} not found"}), 404
+        job.pop("result")
+        return jsonify(job), 200
+
+    except Exception as e:
+        logger.error(f"Error in /jobs/{job_id}: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    try:
+        job = job_queue.get(job_id)
+        if job is None:
+            return jsonify({"error": f"Job {job_id} not found"}), 404
+        if job["status"] == "failed":
+            return jsonify({"job_id": job_id, "status": job["status"], "error": job["error"]}), 500
+        if job["status"] != "done":
+            return jsonify({"job_id": job_id, "status": job["status"]}), 202
+        return jsonify(job["result"]), 200
+
+    except Exception as e:
+        logger.error(f"Error in /jobs/{job_id}/result: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
+# Conversation sessions (bounded LRU with idle TTL; SESSION_STORE=sqlite to share them across workers)
+session_store = get_session_store()
 
 @app.route('/chat', methods=['POST'])
 def chat():
     """Conversational AI endpoint for natural language commands."""
+    started = time.perf_counter()
     try:
-        from conversation_agent import ConversationAgent
         data = request.json
         
         if not data or "message" not in data:
@@ -191,21 +390,14 @@ def chat():
         user_message = data["message"]
         session_id = data.get("session_id", "default")
         
-        # Initialize or retrieve conversation session
-        if session_id not in conversation_sessions:
-            conversation_sessions[session_id] = {
-                "history": [],
-                "state": {}
-            }
-        
-        session = conversation_sessions[session_id]
+        session = session_store.get(session_id)
         
         # Add user message to history
         session["history"].append({"role": "user", "content": user_message})
         
         # Process with conversation agent
-        agent = ConversationAgent()
-        result = agent.process_message(user_message, session["history"], session["state"])
+        result = conversation_agent.process_message(user_message, session["history"], session["state"],
+                                                    session.get("summary", ""))
         
         # Add agent response to history
         session["history"].append({"role": "assistant", "content": result["response"]})
@@ -219,7 +411,9 @@ def chat():
             # Clear state after successful execution
             if action_result.get("success"):
                 session["state"] = {}
+        session_store.save(session_id, session)
         
+        metrics.CHAT_SECONDS.observe(time.perf_counter() - started, action=result["action"])
         return jsonify({
             "response": result["response"],
             "action_executed": result["action"] != "none",
@@ -230,6 +424,7 @@ def chat():
         
     except Exception as e:
         logger.error(f"Error in /chat: {e}", exc_info=True)
+        metrics.CHAT_SECONDS.observe(time.perf_counter() - started, action="error")
         return jsonify({"error": str(e)}), 500
 
 def execute_action(action: str, params: dict) -> dict:
@@ -248,13 +443,6 @@ def execute_action(action: str, params: dict) -> dict:
             from tools import new_id
             
             client_id = params["client_id"]
-            reminders_path = os.path.join("data", "fake_clients", client_id, "reminders.json")
-            
-            if os.path.exists(reminders_path):
-                with open(reminders_path, "r", encoding="utf-8") as f:
-                    reminders = json.load(f)
-            else:
-                reminders = []
             
             new_reminder = {
                 "id": new_id("reminder"),
@@ -266,11 +454,8 @@ def execute_action(action: str, params: dict) -> dict:
                 "created_at": datetime.datetime.now().isoformat(),
                 "created_by": "AI Assistant"
             }
-            reminders.append(new_reminder)
-            
-            os.makedirs(os.path.dirname(reminders_path), exist_ok=True)
-            with open(reminders_path, "w", encoding="utf-8") as f:
-                json.dump(reminders, f, indent=2)
+            orchestrator.repository.add_reminder(client_id, new_reminder)
+            orchestrator.invalidate_client(client_id)
                 
             return {"success": True, "data": new_reminder}
             
@@ -278,13 +463,6 @@ def execute_action(action: str, params: dict) -> dict:
             # Similar to /client-update endpoint
             import datetime
             client_id = params["client_id"]
-            log_path = os.path.join("data", "fake_clients", client_id, "interactions_log.json")
-            
-            if os.path.exists(log_path):
-                with open(log_path, "r", encoding="utf-8") as f:
-                    logs = json.load(f)
-            else:
-                logs = []
             
             new_entry = {
                 "date": datetime.datetime.now().strftime("%Y-%m-%d"),
@@ -292,10 +470,8 @@ def execute_action(action: str, params: dict) -> dict:
                 "summary": params["message"],
                 "outcome": "Logged via AI assistant."
             }
-            logs.insert(0, new_entry)
-            
-            with open(log_path, "w", encoding="utf-8") as f:
-                json.dump(logs, f, indent=2)
+            orchestrator.repository.add_interaction(client_id, new_entry)
+            orchestrator.invalidate_client(client_id)
                 
             return {"success": True, "data": new_entry}
             
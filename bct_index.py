@@ -0,0 +1,140 @@
+"""
+Ranked retrieval over the BCT knowledge base (BM25 on title, summary and keywords).
+French and English text is normalized to shared terms (accents, stopwords, plurals, FR->EN synonyms)
+so a French snapshot can match an English circular and vice versa.
+"""
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+
+STOPWORDS = {
+    # English
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "in", "is", "it", "of", "on",
+    "or", "the", "to", "with", "all", "any", "must", "above", "below", "up", "per", "new",
+    # French
+    "au", "aux", "avec", "ce", "ces", "dans", "de", "des", "du", "en", "et", "la", "le", "les", "leur",
+    "par", "pour", "sur", "un", "une", "ou", "est", "sont", "plus", "moins", "d", "l", "s", "a",
+    "bct", "circular", "circulaire"
+}
+
+# French (and a few English variants) mapped onto the vocabulary used by the knowledge base
+SYNONYMS = {
+    "pme": "sme", "entreprise": "sme", "petite": "sme",
+    "pret": "loan", "credit": "loan", "financement": "loan", "emprunt": "loan",
+    "garantie": "guarantee", "sotugar": "guarantee", "caution": "guarantee",
+    "equipement": "equipment", "machine": "equipment", "materiel": "equipment",
+    "investissement": "investment", "invest": "investment",
+    "exportation": "export", "exportateur": "export", "devise": "foreign", "currency": "foreign",
+    "prefinancement": "pre-finance", "ratio": "ratio", "endettement": "debt", "dette": "debt",
+    "risque": "risk", "classe": "class", "impaye": "unpaid", "creance": "debt",
+    "identification": "kyc", "connaissance": "kyc", "onboarding": "kyc",
+    "numerique": "digital", "chiffre": "turnover", "affaire": "turnover", "ca": "turnover",
+    "long": "long-term", "terme": "long-term", "moyen": "long-term",
+    "provision": "provisioning", "provisionnement": "provisioning",
+    "manufacturing": "manufacturing", "fabrication": "manufacturing", "industrie": "manufacturing",
+    "plastique": "manufacturing", "plastics": "manufacturing",
+}
+
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9\-]*")
+
+
+def normalize_terms(text: str) -> list:
+    """Lowercase, strip accents, drop stopwords, singularize, map synonyms."""
+    text = unicodedata.normalize("NFKD", str(text)).encode("ascii", "ignore").decode("ascii").lower()
+    terms = []
+    for token in TOKEN_RE.findall(text):
+        token = token.strip("-")
+        if not token or token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith(("s", "x")) and not token.endswith("ss"):
+            token = token[:-1]
+        token = SYNONYMS.get(token, token)
+        if token not in STOPWORDS:
+            terms.append(token)
+    return terms
+
+
+class BM25Index:
+    """Inverted index with BM25 scoring. Keywords and titles are weighted above the summary."""
+
+    FIELD_WEIGHTS = {"title": 2, "summary": 1, "keywords": 3}
+
+    def __init__(self, documents: list, k1: float = 1.5, b: float = 0.75):
+        self.documents = documents
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(list)  # term -> [(doc_index, weighted tf)]
+        self.doc_lengths = []
+        for i, doc in enumerate(documents):
+            tf = Counter()
+            for field, weight in self.FIELD_WEIGHTS.items():
+                value = doc.get(field, "")
+                if isinstance(value, list):
+                    value = " ".join(value)
+                for term in normalize_terms(value):
+                    tf[term] += weight
+            for term, freq in tf.items():
+                self.postings[term].append((i, freq))
+            self.doc_lengths.append(sum(tf.values()))
+        self.avg_length = (sum(self.doc_lengths) / len(self.doc_lengths)) if self.doc_lengths else 0.0
+        n = len(documents)
+        self.idf = {
+            term: math.log(1 + (n - len(plist) + 0.5) / (len(plist) + 0.5))
+            for term, plist in self.postings.items()
+        }
+
+    def search(self, query, top_k: int = 5) -> list:
+        """Returns [(score, document)] best first. `query` is a string or a list of keywords."""
+        if isinstance(query, (list, tuple, set)):
+            query = " ".join(str(q) for q in query)
+        scores = defaultdict(float)
+        for term in set(normalize_terms(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_index, freq in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_index] / (self.avg_length or 1))
+                scores[doc_index] += idf * freq * (self.k1 + 1) / (freq + norm)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        return [(score, self.documents[i]) for i, score in ranked]
+
+
+_index = None
+_index_source = None
+_index_lock = threading.Lock()
+
+
+def get_index(knowledge_base: list) -> BM25Index:
+    """Index for the given knowledge base, rebuilt only when the (cached) KB object changes."""
+    global _index, _index_source
+    with _index_lock:
+        if _index is None or _index_source is not knowledge_base:
+            _index = BM25Index(knowledge_base)
+            _index_source = knowledge_base
+        return _index
+
+
+def extract_regulation_query(snapshot: dict) -> list:
+    """Keywords describing the client: segment, sector, products, BCT risk class, document gaps."""
+    crm = snapshot.get("crm_data") or {}
+    query = [snapshot.get("segment", ""), crm.get("activity_sector", ""), crm.get("legal_form", "")]
+    query += [p.get("name", "") for p in snapshot.get("products_held", []) if isinstance(p, dict)]
+
+    cdr = snapshot.get("centrale_risques") or {}
+    worst_class = cdr.get("worst_class")
+    if worst_class is not None:
+        query.append("risk class")
+        if worst_class >= 2:
+            query.append("provisioning unpaid debt")
+    if cdr.get("unpaid_amount"):
+        query.append("unpaid")
+    if cdr.get("total_commitment_market"):
+        query.append("loan ratio long-term")
+
+    if "review" in str(crm.get("kyc_status", "")).lower():
+        query.append("kyc")
+    for gap in snapshot.get("missing_data", []):
+        query.append(gap)
+    return [q for q in query if q]
@@ -0,0 +1,999 @@
+"""
+Offline benchmarks for the Relationship Copilot (no Gemini calls, see fake_llm.py).
+
+Usage:
+    python benchmark.py parallel --latency 0.5 --runs 3
+    python benchmark.py cache --latency 0.5
+    python benchmark.py prep-cache --latency 0.5
+    python benchmark.py normalizer [--live --record snapshot.json | --reference snapshot.json]
+    python benchmark.py interactions --sizes 10000 100000
+    python benchmark.py bct-index --sizes 100 1000
+    python benchmark.py prompts [--budget 1500]
+    python benchmark.py structured
+    python benchmark.py clients --requests 200
+    python benchmark.py sessions --sessions 5000 --turns 20
+    python benchmark.py intents [--verbose]
+    python benchmark.py client-directory --clients 5000
+    python benchmark.py telegram --notifications 20 --chats 5 --latency 0.3
+    python benchmark.py telegram-bot --chats 20 --messages 5 --latency 0.2 --slow-latency 3
+    python benchmark.py resilience --error-rate 0.2 --slow-rate 0.02
+    python benchmark.py load --concurrency 1 4 16 --latency-spec lognormal:0.5:0.5
+    python benchmark.py serve --concurrency 4 16 --workers 4 --threads 8
+    python benchmark.py a2a --messages 16 --duplicates 8
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import shutil
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import call_policy
+import google.generativeai as genai
+import llm_clients
+import llm_providers
+import rate_limit
+from agents import DataRetrieverAgent
+from bct_index import BM25Index, extract_regulation_query
+from config import Config
+from fake_llm import CANNED_RESPONSES, FakeGenerativeModel, install_fake_models
+from interaction_journal import InteractionJournal, export_interactions
+from llm_cache import ResponseCache, get_response_cache, set_response_cache
+from normalizer import normalize_client_snapshot
+from prompting import estimate_tokens, response_schema
+from orchestrator import Orchestrator
+from schemas import (
+    AfterMeetingResult, FicheDeVisiteResult, NormalizedClientSnapshot, OpportunityPlanResult, RiskComplianceResult
+)
+from tools import get_client_data, get_product_catalog, get_standard_simulations, search_bct_regulations
+
+DEFAULT_CLIENT = "ATB-SME-001"
+
+
+def _time_runs(fn, runs: int) -> list:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def bench_parallel(args):
+    """Sequential vs fan-out execution of the risk & opportunity agents for the same mocked latency."""
+    results = {}
+    for label, parallel in (("sequential", False), ("parallel", True)):
+        orchestrator = Orchestrator(parallel=parallel, max_workers=args.max_workers)
+        install_fake_models(orchestrator, latency=args.latency)
+        timings = _time_runs(lambda: orchestrator.build_prep_pack(args.client_id), args.runs)
+        results[label] = statistics.mean(timings)
+        print(f"{label:<11} mean={results[label]:.3f}s  runs={args.runs}  llm_latency={args.latency}s")
+
+    saved = results["sequential"] - results["parallel"]
+    print(f"wall-clock reduction: {saved:.3f}s ({saved / results['sequential'] * 100:.0f}%)")
+
+
+def bench_cache(args):
+    """Cold vs warm prep pack when the LLM response cache answers identical prompts."""
+    set_response_cache(ResponseCache(max_entries=64, ttl_seconds=0))
+    orchestrator = Orchestrator()
+    fakes = install_fake_models(orchestrator, latency=args.latency)
+    cold = _time_runs(lambda: orchestrator.build_prep_pack(args.client_id), 1)[0]
+    warm = _time_runs(lambda: orchestrator.build_prep_pack(args.client_id), 1)[0]
+    llm_calls = sum(f.calls for f in fakes.values())
+    print(f"cold={cold:.3f}s  warm={warm:.3f}s  llm_calls={llm_calls}")
+    print(f"cache stats: {get_response_cache().stats()}")
+
+
+def bench_prep_cache(args):
+    """Full rebuild vs memoized prep pack (fixtures unchanged), then after an explicit invalidation."""
+    Config.PREP_PACK_CACHE_ENABLED = True
+    orchestrator = Orchestrator()
+    install_fake_models(orchestrator, latency=args.latency)
+    orchestrator.invalidate_client(args.client_id)
+    cold = _time_runs(lambda: orchestrator.build_prep_pack(args.client_id), 1)[0]
+    hit = _time_runs(lambda: orchestrator.build_prep_pack(args.client_id), 1)[0]
+    orchestrator.invalidate_client(args.client_id)
+    rebuilt = _time_runs(lambda: orchestrator.build_prep_pack(args.client_id), 1)[0]
+    print(f"cold={cold:.3f}s  hit={hit * 1000:.2f}ms  after_invalidate={rebuilt:.3f}s")
+    print(f"prep pack cache stats: {orchestrator.prep_pack_cache.stats()}")
+
+
+def _normalizer_parity(fast: dict, llm: dict) -> list:
+    """Field-level comparison of the deterministic snapshot against the LLM snapshot: [(field, fast, llm, same)]."""
+    checks = [
+        ("company_name", fast["company_name"], llm["company_name"],
+         fast["company_name"].casefold() == llm["company_name"].casefold()),
+        ("segment", fast["segment"], llm["segment"], fast["segment"].casefold() == llm["segment"].casefold()),
+        ("products_held", [p.get("name") for p in fast["products_held"]], [p.get("name") for p in llm["products_held"]],
+         len(fast["products_held"]) == len(llm["products_held"])),
+    ]
+    fast_cdr, llm_cdr = fast.get("centrale_risques"), llm.get("centrale_risques")
+    if fast_cdr and llm_cdr:
+        for key in ("total_commitment_market", "worst_class", "unpaid_amount"):
+            checks.append((f"centrale_risques.{key}", fast_cdr[key], llm_cdr[key], fast_cdr[key] == llm_cdr[key]))
+    else:
+        checks.append(("centrale_risques", fast_cdr, llm_cdr, fast_cdr == llm_cdr))
+    # Every document gap found in Python should be mentioned somewhere in the LLM snapshot
+    llm_text = json.dumps(llm, ensure_ascii=False).casefold()
+    for gap in fast["missing_data"]:
+        doc = gap.split(": ", 1)[-1].split(" (")[0]
+        checks.append((f"missing_data[{doc}]", gap, llm.get("missing_data"), doc.casefold() in llm_text))
+    return checks
+
+
+def bench_normalizer(args):
+    """
+    Deterministic fast path vs LLM normalization: latency and field parity on the fixtures.
+    Parity is only meaningful against real Gemini output: --live, or a snapshot it produced earlier
+    (--live --record FILE, then --reference FILE offline). The canned fake answer only exercises the code path.
+    """
+    fast_agent, llm_agent = DataRetrieverAgent(), DataRetrieverAgent()
+    if not args.live:
+        llm_agent.model = FakeGenerativeModel(CANNED_RESPONSES["data_retriever_agent"], args.latency)
+
+    Config.FAST_NORMALIZER = True
+    fast_timings = _time_runs(lambda: fast_agent.run(args.client_id), args.runs)
+    fast = fast_agent.run(args.client_id)
+    Config.FAST_NORMALIZER = False
+    llm_timings = _time_runs(lambda: llm_agent.run(args.client_id), args.runs)
+    llm = llm_agent.run(args.client_id)
+
+    mode = "gemini" if args.live else f"fake llm ({args.latency}s)"
+    print(f"deterministic mean={statistics.mean(fast_timings) * 1000:.2f}ms")
+    print(f"llm           mean={statistics.mean(llm_timings) * 1000:.2f}ms  [{mode}]")
+
+    if args.live and args.record:
+        with open(args.record, "w", encoding="utf-8") as f:
+            json.dump(llm, f, ensure_ascii=False, indent=2)
+        print(f"Gemini snapshot recorded to {args.record}")
+    if args.reference:
+        with open(args.reference, encoding="utf-8") as f:
+            llm = json.load(f)
+        reference = f"recorded Gemini snapshot {args.reference}"
+    elif args.live:
+        reference = "live Gemini snapshot"
+    else:
+        reference = "canned fake answer (hand-written: differences are expected, this is not a parity measure)"
+
+    print(f"parity against the {reference}:")
+    checks = _normalizer_parity(fast, llm)
+    for name, fast_value, llm_value, same in checks:
+        detail = "" if same else f"  fast={json.dumps(fast_value, ensure_ascii=False)}  llm={json.dumps(llm_value, ensure_ascii=False)}"
+        print(f"  {'OK  ' if same else 'DIFF'} {name}{detail}")
+    print(f"parity: {sum(same for *_, same in checks)}/{len(checks)} fields")
+
+
+def _interaction(i: int) -> dict:
+    return {
+        "date": f"2026-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+        "type": "Call",
+        "summary": f"Interaction {i}: client called about cash flow and overdraft usage.",
+        "outcome": "Logged via benchmark."
+    }
+
+
+def bench_interactions(args):
+    """Legacy insert(0)+rewrite JSON log vs append-only journal, at several history sizes."""
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            legacy_path = os.path.join(tmp, "interactions_log.json")
+            with open(legacy_path, "w", encoding="utf-8") as f:
+                json.dump([_interaction(i) for i in range(size)], f, indent=2)
+            journal = InteractionJournal(os.path.join(tmp, "interactions_log.jsonl"))
+            with open(journal.path, "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(_interaction(i)) + "\n" for i in range(size))
+
+            def legacy_append():
+                with open(legacy_path, "r", encoding="utf-8") as f:
+                    logs = json.load(f)
+                logs.insert(0, _interaction(size))
+                with open(legacy_path, "w", encoding="utf-8") as f:
+                    json.dump(logs, f, indent=2)
+
+            def legacy_recent():
+                with open(legacy_path, "r", encoding="utf-8") as f:
+                    return json.load(f)[:args.recent]
+
+            results = {
+                "legacy append": statistics.mean(_time_runs(legacy_append, args.runs)),
+                "journal append": statistics.mean(_time_runs(lambda: journal.append(_interaction(size)), args.runs)),
+                f"legacy read {args.recent}": statistics.mean(_time_runs(legacy_recent, args.runs)),
+                f"journal read {args.recent}": statistics.mean(
+                    _time_runs(lambda: list(journal.iter_recent(args.recent)), args.runs)
+                ),
+            }
+            start = time.perf_counter()
+            export_interactions(tmp, os.path.join(tmp, "export.json"))
+            results["export to json"] = time.perf_counter() - start
+
+            print(f"history={size}")
+            for label, seconds in results.items():
+                print(f"  {label:<16} {seconds * 1000:10.3f}ms")
+
+SYNTHETIC_TOPICS = [
+    "leasing", "microfinance", "mortgage", "agriculture", "tourism", "aml", "sanctions", "liquidity",
+    "cybersecurity", "outsourcing", "payments", "cheque", "mobile banking", "islamic finance", "real estate",
+    "consumer credit", "capital adequacy", "governance", "reporting", "fx hedging"
+]
+
+
+def _synthetic_circulars(base: list, size: int, seed: int = 7) -> list:
+    """The real circulars plus generated ones on unrelated topics, `size` entries in total."""
+    rng = random.Random(seed)
+    corpus = list(base)
+    while len(corpus) < size:
+        i = len(corpus)
+        topics = rng.sample(SYNTHETIC_TOPICS, 3)
+        corpus.append({
+            "id": f"cir_syn_{i:05d}",
+            "title": f"BCT Circular {2000 + i % 25}-{i % 99:02d}: {topics[0].title()} Requirements",
+            "summary": f"Banks must apply enhanced {topics[1]} controls to {topics[0]} exposures "
+                       f"and report {topics[2]} indicators quarterly to the supervisor.",
+            "keywords": topics
+        })
+    return corpus
+
+
+def bench_bct_index(args):
+    """BM25 top-k vs linear substring scan and full knowledge-base dump: lookup time and prompt size."""
+    with open(os.path.join("data", "bct_knowledge_base.json"), "r", encoding="utf-8") as f:
+        base = json.load(f)
+    snapshot, _ = normalize_client_snapshot(args.client_id, get_client_data(args.client_id))
+    query = extract_regulation_query(snapshot)
+    print(f"query: {query}")
+
+    for size in args.sizes:
+        corpus = _synthetic_circulars(base, size)
+        start = time.perf_counter()
+        index = BM25Index(corpus)
+        build = time.perf_counter() - start
+
+        def linear_scan():
+            return [item for item in corpus
+                    if any(k.lower() in (item["title"] + " " + item["summary"]).lower() for k in query)]
+
+        bm25 = statistics.mean(_time_runs(lambda: index.search(query, args.top_k), args.runs))
+        linear = statistics.mean(_time_runs(linear_scan, args.runs))
+        top = [item for _, item in index.search(query, args.top_k)]
+        # ~4 characters per token is close enough to compare prompt sizes
+        full_tokens = len(json.dumps(corpus, indent=2)) // 4
+        top_tokens = len(json.dumps(top, indent=2)) // 4
+
+        print(f"circulars={size}")
+        print(f"  index build      {build * 1000:10.3f}ms")
+        print(f"  bm25 top-{args.top_k:<6} {bm25 * 1000:10.3f}ms  -> {[item['id'] for item in top]}")
+        print(f"  linear scan      {linear * 1000:10.3f}ms")
+        print(f"  prompt tokens    {full_tokens:>10} full dump vs {top_tokens} top-k "
+              f"({100 * (1 - top_tokens / max(full_tokens, 1)):.1f}% saved)")
+
+def bench_prompts(args):
+    """Per-agent prompt tokens: legacy indent=2 dumps + full schema vs the prompting layer."""
+    if args.budget:
+        Config.PROMPT_TOKEN_BUDGET = args.budget
+    orchestrator = Orchestrator(parallel=False)
+    fakes = install_fake_models(orchestrator)
+    result = orchestrator.build_prep_pack(args.client_id)
+    snapshot = result["prep_pack"]["snapshot"]
+    brief = result["prep_pack"]["fiche_visite"]
+    Config.FAST_NORMALIZER = False  # capture the data retriever's LLM prompt as well
+    orchestrator.data_agent.run(args.client_id)
+
+    def legacy(name, schema, *context):
+        # Same intro/instructions as today, with the old schema text and indent=2 context
+        instructions = fakes[name].last_prompt.split("Instructions:\n", 1)[1]
+        text = (f"You are the {name}. \nYour output must be strict JSON adhering to the following schema:\n"
+                f"{schema.model_json_schema()}\n" + "".join(json.dumps(c, indent=2) for c in context) + instructions)
+        return estimate_tokens(text)
+
+    legacy_tokens = {
+        "data_retriever_agent": legacy("data_retriever_agent", NormalizedClientSnapshot, get_client_data(args.client_id)),
+        "client_brief_agent": legacy("client_brief_agent", FicheDeVisiteResult, snapshot),
+        "risk_compliance_agent": legacy("risk_compliance_agent", RiskComplianceResult, snapshot, brief,
+                                        search_bct_regulations([])),
+        "opportunity_agent": legacy("opportunity_agent", OpportunityPlanResult, snapshot, get_product_catalog(),
+                                    get_standard_simulations()),
+    }
+    print(f"{'agent':<24}{'legacy':>8}{'now':>8}")
+    for name, before in legacy_tokens.items():
+        after = estimate_tokens(fakes[name].last_prompt)
+        print(f"{name:<24}{before:>8}{after:>8}  ({100 * (1 - after / before):.0f}% fewer)")
+
+def bench_structured(args):
+    """Schema overhead per agent (text schema vs response_schema) and response validation cost."""
+    agents = {
+        "data_retriever_agent": NormalizedClientSnapshot, "client_brief_agent": FicheDeVisiteResult,
+        "risk_compliance_agent": RiskComplianceResult, "opportunity_agent": OpportunityPlanResult,
+        "after_meeting_agent": AfterMeetingResult,
+    }
+    print(f"{'agent':<24}{'mode':<12}{'schema tokens':>14}{'legacy parse':>14}{'fast parse':>12}")
+    for name, schema_class in agents.items():
+        text = json.dumps(CANNED_RESPONSES[name], ensure_ascii=False)
+        native = response_schema(schema_class) is not None
+        # Constrained decoding removes the schema from the prompt entirely
+        schema_tokens = 0 if native else estimate_tokens(DataRetrieverAgent()._build_full_prompt("", schema_class, False))
+        legacy = statistics.mean(_time_runs(lambda: schema_class(**json.loads(text)).model_dump(), args.runs))
+        fast = statistics.mean(_time_runs(lambda: DataRetrieverAgent._parse_response(text, schema_class), args.runs))
+        print(f"{name:<24}{'native' if native else 'text':<12}{schema_tokens:>14}"
+              f"{legacy * 1e6:>12.1f}us{fast * 1e6:>10.1f}us")
+
+def bench_clients(args):
+    """Per-request genai.configure + GenerativeModel (old /chat) vs the shared client registry."""
+    from conversation_agent import ConversationAgent
+
+    def per_request():
+        genai.configure(api_key=Config.GEMINI_API_KEY)
+        return genai.GenerativeModel(Config.GEMINI_MODEL)
+
+    before = llm_clients.stats()["model_constructions"]
+    legacy = statistics.mean(_time_runs(per_request, args.requests))
+    shared = statistics.mean(_time_runs(ConversationAgent, args.requests))
+    print(f"per-request client  {legacy * 1e6:10.1f}us  ({args.requests} constructions)")
+    print(f"shared registry     {shared * 1e6:10.1f}us  "
+          f"({llm_clients.stats()['model_constructions'] - before} constructions)")
+
+
+def bench_sessions(args):
+    """Memory and per-turn cost of /chat sessions: unbounded dict (old app.py) vs the bounded session stores."""
+    import tracemalloc
+    from session_store import SessionStore, SqliteSessionStore, new_session
+
+    def run(get, save):
+        tracemalloc.start()
+        start = time.perf_counter()
+        for turn in range(args.turns):
+            for i in range(args.sessions):
+                session = get(f"telegram_{i}")
+                session["history"].append({"role": "user", "content": f"Message {turn} " + "x" * 80})
+                session["history"].append({"role": "assistant", "content": f"Reply {turn} " + "y" * 200})
+                save(f"telegram_{i}", session)
+        elapsed = time.perf_counter() - start
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return elapsed / (args.turns * args.sessions), current
+
+    legacy = {}
+    stores = [("unbounded dict", lambda sid: legacy.setdefault(sid, new_session()), lambda sid, session: None)]
+    memory = SessionStore(max_sessions=args.max_sessions, history_limit=args.history_limit)
+    stores.append(("memory store", memory.get, memory.save))
+    with tempfile.TemporaryDirectory() as tmp:
+        sqlite = SqliteSessionStore(os.path.join(tmp, "sessions.sqlite"), max_sessions=args.max_sessions,
+                                    history_limit=args.history_limit)
+        stores.append(("sqlite store", sqlite.get, sqlite.save))
+        print(f"{args.sessions} sessions x {args.turns} turns, max_sessions={args.max_sessions} "
+              f"history_limit={args.history_limit}")
+        for label, get, save in stores:
+            per_turn, memory_bytes = run(get, save)
+            print(f"{label:<16} {per_turn * 1e6:10.1f}us/turn  {memory_bytes / 1e6:8.1f} MB retained")
+
+
+def bench_intents(args):
+    """Coverage, accuracy and latency of the rule-based intent fast path on the labeled /chat corpus."""
+    import datetime
+    import intent_rules
+
+    with open(args.corpus, encoding="utf-8") as f:
+        corpus = json.load(f)
+    today = datetime.date.fromisoformat(corpus["today"])
+    answered = correct = 0
+    durations, leaked = [], []
+    for case in corpus["messages"]:
+        start = time.perf_counter()
+        result = intent_rules.classify(case["message"], {}, today)
+        durations.append(time.perf_counter() - start)
+        if case.get("fallback") and result is not None:
+            leaked.append(case["message"])
+        if result is None:
+            if args.verbose:
+                print(f"  llm      [{case['intent']}] {case['message']}")
+            continue
+        answered += 1
+        params = result["extracted_params"]
+        expected = {k: v.lower() if isinstance(v, str) else v for k, v in case["params"].items()}
+        got = {k: params.get(k).lower() if isinstance(params.get(k), str) else params.get(k) for k in expected}
+        ok = result["intent"] == case["intent"] and got == expected
+        correct += ok
+        if args.verbose or not ok:
+            print(f"  {'ok' if ok else 'WRONG':<8} [{case['intent']}] {case['message']}\n           -> {result['intent']} {params}")
+
+    total = len(corpus["messages"])
+    print(f"{total} messages: {answered} answered by rules ({answered / total:.0%} LLM calls avoided), "
+          f"{correct}/{answered} correct, {answered - correct} wrong")
+    fallbacks = sum(1 for case in corpus["messages"] if case.get("fallback"))
+    print(f"required fallbacks: {fallbacks - len(leaked)}/{fallbacks} left to the LLM"
+          + "".join(f"\n  ANSWERED {message}" for message in leaked))
+    print(f"rule latency p50={_percentile(durations, 0.5) * 1e6:.0f}us p95={_percentile(durations, 0.95) * 1e6:.0f}us "
+          f"(first call includes loading the client names)")
+
+
+def bench_client_directory(args):
+    """Client name resolution over a generated portfolio: directory index vs a linear scan of every name."""
+    from client_directory import ClientDirectory, name_key, trigrams
+    from generate_portfolio import generate_portfolio
+    from repository import JsonClientRepository
+
+    with tempfile.TemporaryDirectory() as tmp:
+        generate_portfolio(args.clients, tmp, seed=args.seed, start=1)
+        repository = JsonClientRepository(tmp)
+        directory = ClientDirectory(repository, refresh_seconds=0)
+        start = time.perf_counter()
+        directory.refresh()
+        print(f"{args.clients} clients indexed in {time.perf_counter() - start:.2f}s {directory.stats()}")
+
+        rng = random.Random(args.seed)
+        names = [repository.get_profile(cid)["name"] for cid in rng.sample(repository.list_clients(), 50)]
+        # Last two letters of the first word swapped: "SOTUPLAST" -> "SOTUPLATS"
+        typos = [name.split()[0][:-2] + name.split()[0][-1:-3:-1] + name[len(name.split()[0]):] for name in names]
+        profiles = [repository.get_profile(cid) for cid in repository.list_clients()]
+        all_keys = [name_key(p["name"]) for p in profiles]
+
+        def linear(query):
+            grams = trigrams(name_key(query))
+            return max(all_keys, key=lambda key: len(grams & trigrams(key)))
+
+        for label, queries in (("exact", names), ("typo", typos)):
+            indexed = _time_runs(lambda: [directory.search(q) for q in queries], args.runs)
+            scan = _time_runs(lambda: [linear(q) for q in queries[:5]], 1)
+            hits = sum(1 for q, n in zip(queries, names) if directory.search(q) and
+                       directory.search(q)[0]["matched"] == name_key(n))
+            print(f"{label:<6} directory {statistics.mean(indexed) / len(queries) * 1e6:8.1f}us/lookup  "
+                  f"linear scan {statistics.mean(scan) / 5 * 1e6:10.1f}us/lookup  top-1 {hits}/{len(queries)}")
+        # The /chat path: the client named (with a typo) somewhere in a banker's sentence
+        ids = {name: cid for cid, name in ((cid, repository.get_profile(cid)["name"]) for cid in directory._clients)}
+        sentences = [(f"Prépare le prep pack pour {typo} demain", ids[name]) for typo, name in zip(typos, names)]
+        timings, found = [], 0
+        for sentence, client_id in sentences:
+            timings += _time_runs(lambda: directory.resolve(sentence), args.runs)
+            found += (directory.resolve(sentence) or (None,))[0] == client_id
+        no_client = "Rappelle-moi de relancer le dossier la semaine prochaine"
+        missing = _time_runs(lambda: directory.resolve(no_client), args.runs)
+        print(f"resolve in a sentence p50 {_percentile(timings, 0.5) * 1e6:8.1f}us  "
+              f"p95 {_percentile(timings, 0.95) * 1e6:8.1f}us  right client {found}/{len(sentences)}  "
+              f"(no client named: {statistics.mean(missing) * 1e6:.1f}us)")
+
+        start = time.perf_counter()
+        directory.refresh()
+        unchanged = time.perf_counter() - start
+        for client_id in repository.list_clients()[:10]:
+            profile = repository.get_profile(client_id)
+            profile["aliases"] = [f"Alias {client_id}"]
+            repository._save(client_id, "crm_profile", profile)
+        start = time.perf_counter()
+        changes = directory.refresh()
+        print(f"refresh: unchanged {unchanged:.3f}s, 10 edited profiles {time.perf_counter() - start:.3f}s {changes}")
+
+
+def _percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))] if ordered else 0.0
+
+
+def bench_telegram(args):
+    """Prep pack notification cost seen by /prep-pack: blocking send (old notifier) vs the background dispatcher."""
+    import asyncio
+    from telegram.error import NetworkError
+    from telegram_notifier import TelegramDispatcher, TelegramNotifier
+
+    with open(args.report, encoding="utf-8") as f:
+        report = f.read()
+    rng = random.Random(args.seed)
+    sent = []
+
+    async def fake_send(chat_id, text, parse_mode):
+        await asyncio.sleep(args.latency)
+        if rng.random() < args.error_rate:
+            raise NetworkError("injected failure")
+        sent.append((chat_id, text, time.monotonic()))
+
+    # Old notifier: a new event loop per message, /prep-pack waits for Telegram to answer
+    def blocking_send():
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(asyncio.sleep(args.latency))
+        loop.close()
+    blocking = _time_runs(blocking_send, min(args.notifications, 5))
+
+    dispatcher = TelegramDispatcher(send=fake_send, chat_interval=args.chat_interval)
+    notifier = TelegramNotifier(dispatcher)
+    notifier.enabled = True
+    chats = [f"chat-{i % args.chats}" for i in range(args.notifications)]
+    start = time.perf_counter()
+    submits = _time_runs(lambda: notifier.send_prep_pack("SOTUPLAST", report, chat_id=chats.pop()), args.notifications)
+    dispatcher.flush()
+    drained = time.perf_counter() - start
+    dispatcher.close()
+
+    gaps = []
+    for chat in {chat_id for chat_id, _, _ in sent}:
+        times = [at for chat_id, _, at in sent if chat_id == chat]
+        gaps += [b - a for a, b in zip(times, times[1:])]
+    stats = dispatcher.stats()
+    print(f"report {len(report)} chars -> {stats['queued'] // args.notifications} messages per notification "
+          f"(the old notifier truncated it to one)")
+    print(f"blocking send     {statistics.mean(blocking) * 1e3:8.2f}ms added to each /prep-pack")
+    print(f"dispatcher submit {statistics.mean(submits) * 1e3:8.3f}ms added to each /prep-pack")
+    print(f"drained {args.notifications} notifications to {args.chats} chats in {drained:.2f}s, "
+          f"min gap between messages to a chat {min(gaps, default=0):.2f}s")
+    print(stats)
+
+
+def bench_telegram_bot(args):
+    """Banker reply latency when some /chat calls are slow: blocking handler (old bot) vs concurrent per-chat-ordered updates."""
+    import asyncio
+    from types import SimpleNamespace
+    import httpx
+    from telegram_bot import ChatOrderedUpdateProcessor, DONNATelegramBot
+
+    rng = random.Random(args.seed)
+    updates = [(f"chat-{chat}", f"message {n}", args.slow_latency if rng.random() < args.slow_share else args.latency)
+               for n in range(args.messages) for chat in range(args.chats)]
+    latency_of = {(chat, text): latency for chat, text, latency in updates}
+
+    def report(label, started, replies):
+        waits = sorted(at - started for _, _, at in replies)
+        print(f"{label:<22} total {waits[-1]:6.2f}s  reply p50 {waits[len(waits) // 2]:6.2f}s  "
+              f"p95 {waits[int(len(waits) * 0.95)]:6.2f}s")
+
+    print(f"{len(updates)} messages from {args.chats} chats, {sum(1 for u in updates if u[2] == args.slow_latency)} "
+          f"slow ({args.slow_latency}s), others {args.latency}s")
+    # Old bot: requests.post blocks the event loop, so updates are answered one after another
+    started, replies = time.monotonic(), []
+    for chat, text, latency in updates:
+        time.sleep(latency)
+        replies.append((chat, text, time.monotonic()))
+    report("blocking handler", started, replies)
+
+    async def chat_api(request):
+        body = json.loads(request.content)
+        await asyncio.sleep(latency_of[(body["session_id"].removeprefix("telegram_"), body["message"])])
+        return httpx.Response(200, json={"response": f"ok {body['message']}", "action_executed": False})
+
+    async def run():
+        bot = DONNATelegramBot("benchmark", max_concurrent_updates=args.concurrency, progress_after=1.0)
+        bot._http = httpx.AsyncClient(base_url="http://api", transport=httpx.MockTransport(chat_api))
+        processor = ChatOrderedUpdateProcessor(args.concurrency)
+        replies, progress = [], []
+
+        def fake_update(chat, text):
+            async def reply_text(reply, **kwargs):
+                if reply.startswith("⏳"):
+                    progress.append(chat)
+                    return SimpleNamespace(edit_text=lambda final: reply_text(final))
+                replies.append((chat, reply.removeprefix("ok "), time.monotonic()))
+
+            async def send_action(action):
+                pass
+            message = SimpleNamespace(text=text, chat_id=chat, reply_text=reply_text,
+                                      chat=SimpleNamespace(send_action=send_action))
+            return SimpleNamespace(message=message, effective_chat=SimpleNamespace(id=chat))
+
+        started = time.monotonic()
+        await asyncio.gather(*(processor.process_update(update, bot.handle_message(update, None))
+                               for update in (fake_update(chat, text) for chat, text, _ in updates)))
+        await bot.close()
+        report(f"concurrent (limit {args.concurrency})", started, replies)
+        ordered = all([text for c, text, _ in replies if c == chat] == [text for c, text, _ in updates if c == chat]
+                      for chat in {chat for chat, _, _ in updates})
+        print(f"per-chat order kept: {ordered}, progress messages: {len(progress)}")
+
+    asyncio.run(run())
+
+
+def bench_resilience(args):
+    """Prep packs against a fake LLM with transient errors and a slow tail, under several call policies."""
+    scenarios = [
+        ("single attempt", {"LLM_MAX_ATTEMPTS": 1, "LLM_HEDGE": "off"}),
+        ("retry", {"LLM_MAX_ATTEMPTS": 4, "LLM_HEDGE": "off"}),
+        ("retry + hedge p95", {"LLM_MAX_ATTEMPTS": 4, "LLM_HEDGE": "p95"}),
+    ]
+    Config.LLM_RETRY_BASE_SECONDS = args.latency
+    Config.LLM_HEDGE_MIN_SAMPLES = 10
+    Config.CIRCUIT_FAILURE_THRESHOLD = 10 ** 6  # measured separately below
+    print(f"error_rate={args.error_rate} slow_rate={args.slow_rate} "
+          f"latency={args.latency}s slow_latency={args.slow_latency}s packs={args.packs}")
+    for label, settings in scenarios:
+        for key, value in settings.items():
+            setattr(Config, key, value)
+        call_policy.reset()
+        orchestrator = Orchestrator()
+        install_fake_models(orchestrator, args.latency, error_rate=args.error_rate, slow_rate=args.slow_rate,
+                            slow_latency=args.slow_latency, seed=42)
+        durations, ok = [], 0
+        for _ in range(args.packs):
+            start = time.perf_counter()
+            try:
+                orchestrator.build_prep_pack(args.client_id)
+                ok += 1
+            except Exception:
+                pass
+            durations.append(time.perf_counter() - start)
+        stats = call_policy.stats()
+        tail = sum(1 for d in durations if d >= args.slow_latency)
+        print(f"  {label:<18} success={ok}/{args.packs}  p50={_percentile(durations, 0.5):.3f}s  "
+              f"p95={_percentile(durations, 0.95):.3f}s  p99={_percentile(durations, 0.99):.3f}s  "
+              f"packs>={args.slow_latency}s: {tail}  "
+              f"retries={stats['retries']} hedges={stats['hedges']} hedge_wins={stats['hedge_wins']}")
+
+    # Outage: every call fails; the breaker stops sending requests after the threshold
+    Config.LLM_MAX_ATTEMPTS, Config.LLM_HEDGE, Config.LLM_RETRY_BASE_SECONDS = 2, "off", 0.01
+    Config.CIRCUIT_FAILURE_THRESHOLD = 5
+    call_policy.reset()
+    orchestrator = Orchestrator()
+    fakes = install_fake_models(orchestrator, args.latency, error_rate=1.0)
+    start = time.perf_counter()
+    for _ in range(args.packs):
+        try:
+            orchestrator.build_prep_pack(args.client_id)
+        except Exception:
+            pass
+    sent = sum(fake.calls for fake in fakes.values())
+    breaker = next(iter(call_policy.stats()["breakers"].values()))
+    print(f"  outage (breaker)   {time.perf_counter() - start:.3f}s for {args.packs} packs, "
+          f"{sent} requests sent, {breaker['rejected']} rejected fast, state={breaker['state']}")
+
+LOAD_TARGETS = ("prep_pack", "after_meeting", "chat", "a2a")
+
+
+def _load_requests(client_id: str):
+    """One callable per load target, going through the same entry points as production."""
+    import a2a_server
+    import app as copilot_app
+
+    after_meeting = {"meeting_date": "2026-10-18", "meeting_type": "Visite",
+                     "banker_notes": ["Client souhaite financer une nouvelle machine."]}
+    snapshot = copilot_app.orchestrator.data_agent.run(client_id)
+    payload = {"snapshot": snapshot, "brief": {"synthese_situation": "Client sain."}}
+
+    def check(response):
+        if response.status_code != 200 or (response.json or {}).get("status") == "error":
+            raise RuntimeError(f"HTTP {response.status_code}: {response.get_data(as_text=True)[:200]}")
+
+    return {
+        "prep_pack": lambda: copilot_app.orchestrator.build_prep_pack(client_id),
+        "after_meeting": lambda: copilot_app.orchestrator.update_case_after_meeting(client_id, after_meeting),
+        "chat": lambda: check(copilot_app.app.test_client().post(
+            "/chat", json={"message": "Bonjour", "session_id": f"load-{random.random()}"})),
+        # A fresh message_id per request: a reused one would be answered from the idempotency cache
+        "a2a": lambda: check(a2a_server.app.test_client().post("/a2a/message", json={
+            "message_id": f"load-{random.random()}", "from_agent": "benchmark",
+            "to_agent": "risk_compliance_agent", "payload": payload})),
+    }
+
+
+def _run_level(fn, concurrency: int, requests: int) -> dict:
+    durations, errors = [], 0
+
+    def one():
+        start = time.perf_counter()
+        try:
+            fn()
+            return time.perf_counter() - start, None
+        except Exception as e:
+            return time.perf_counter() - start, e
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for seconds, error in pool.map(lambda _: one(), range(requests)):
+            durations.append(seconds)
+            errors += error is not None
+    wall = time.perf_counter() - started
+    return {
+        "concurrency": concurrency, "requests": requests, "errors": errors,
+        "throughput_rps": round(requests / wall, 3),
+        "p50_s": round(_percentile(durations, 0.50), 4), "p95_s": round(_percentile(durations, 0.95), 4),
+        "p99_s": round(_percentile(durations, 0.99), 4), "mean_s": round(statistics.mean(durations), 4),
+    }
+
+
+def bench_load(args):
+    """Throughput and p50/p95/p99 per entry point and concurrency level, against the fake LLM provider."""
+    out_path = os.path.abspath(args.out or os.path.join(
+        "outputs", "benchmarks", f"load_{time.strftime('%Y%m%d_%H%M%S')}.json"))
+    # Work on a scratch copy of the fixtures: after-meeting updates write to the client case
+    workdir = tempfile.mkdtemp(prefix="copilot_load_")
+    shutil.copytree("data", os.path.join(workdir, "data"))
+    os.makedirs(os.path.join(workdir, "outputs"))
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        Config.LLM_PROVIDER = "fake"
+        llm_providers.set_provider(llm_providers.FakeProvider(
+            mode=args.mode, latency=args.latency_spec, error_rate=args.error_rate, seed=args.seed))
+        requests = _load_requests(args.client_id)
+        results = []
+        for target in args.targets:
+            for concurrency in args.concurrency:
+                level = _run_level(requests[target], concurrency, args.requests or concurrency * 10)
+                level["target"] = target
+                results.append(level)
+                print(f"{target:<14} c={concurrency:<3} n={level['requests']:<4} err={level['errors']:<3} "
+                      f"{level['throughput_rps']:>8.2f} req/s  p50={level['p50_s']:.3f}s  "
+                      f"p95={level['p95_s']:.3f}s  p99={level['p99_s']:.3f}s")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {"latency_spec": args.latency_spec, "mode": args.mode, "error_rate": args.error_rate,
+                   "seed": args.seed, "client_id": args.client_id, "parallel_agents": Config.PARALLEL_AGENTS,
+                   "agent_max_workers": Config.AGENT_MAX_WORKERS},
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {out_path}")
+
+
+def bench_a2a(args):
+    """A2A message cost: one envelope per request vs /a2a/message/batch, and agent runs under peer retries."""
+    Config.LLM_PROVIDER = "fake"
+    provider = llm_providers.FakeProvider(latency=args.latency_spec, seed=args.seed)
+    llm_providers.set_provider(provider)
+    import a2a_server
+    client = a2a_server.app.test_client()
+    payload = {"snapshot": DataRetrieverAgent().run(args.client_id),
+               "brief": {"synthese_situation": "Client sain."}}
+
+    def envelopes(run: str, count: int) -> list:
+        return [{"message_id": f"{run}-{i}", "from_agent": "benchmark", "to_agent": "risk_compliance_agent",
+                 "payload": payload} for i in range(count)]
+
+    def llm_calls() -> int:
+        return sum(model.calls for model in provider.models.values())
+
+    start = time.perf_counter()
+    for envelope in envelopes("single", args.messages):
+        client.post("/a2a/message", json=envelope)
+    sequential = time.perf_counter() - start
+    calls_per_message = llm_calls() / args.messages
+
+    start = time.perf_counter()
+    response = client.post("/a2a/message/batch", json=envelopes("batch", args.messages))
+    batch = time.perf_counter() - start
+    body = response.get_json()
+    print(f"{args.messages} messages, fake LLM {args.latency_spec}, A2A_BATCH_MAX_WORKERS={Config.A2A_BATCH_MAX_WORKERS}")
+    print(f"  one per request    {sequential:.3f}s")
+    print(f"  batch              {batch:.3f}s  ({sequential / batch:.1f}x, {body['succeeded']} succeeded)")
+
+    # A peer that times out and retries: concurrent duplicates while the first run is in flight, then late retries
+    before = llm_calls()
+    duplicate = envelopes("retry", 1)[0]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.duplicates) as pool:
+        statuses = list(pool.map(lambda _: client.post("/a2a/message", json=duplicate).status_code,
+                                 range(args.duplicates)))
+    concurrent_wall = time.perf_counter() - start
+    for _ in range(args.duplicates):
+        statuses.append(client.post("/a2a/message", json=duplicate).status_code)
+    sent = len(statuses)
+    print(f"  {sent} deliveries of one message_id ({args.duplicates} concurrent, then {args.duplicates} late retries): "
+          f"{llm_calls() - before} LLM calls instead of {round(sent * calls_per_message)}, "
+          f"concurrent ones answered in {concurrent_wall:.3f}s, HTTP {sorted(set(statuses))}")
+    print(f"  idempotency cache  {a2a_server.get_a2a_idempotency_cache().stats()}")
+
+
+def _start_server(command: list, port: int, cwd: str, env: dict):
+    import httpx
+    process = subprocess.Popen(command, cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                               start_new_session=True)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    _stop_server(process)
+    raise RuntimeError(f"{' '.join(command)} did not start on port {port}")
+
+
+def _stop_server(process):
+    os.killpg(process.pid, signal.SIGTERM)  # the dev server's reloader runs the app in a child process
+    try:
+        process.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+
+
+def bench_serve(args):
+    """HTTP throughput and p50/p95/p99 over real sockets: Flask dev server (python app.py) vs serve.py."""
+    import threading
+    import httpx
+
+    repo = os.path.dirname(os.path.abspath(__file__))
+    workdir = tempfile.mkdtemp(prefix="copilot_serve_")
+    shutil.copytree("data", os.path.join(workdir, "data"))
+    os.makedirs(os.path.join(workdir, "outputs"))
+    env = dict(os.environ, LLM_PROVIDER="fake", FAKE_LLM_LATENCY=args.latency_spec, FAKE_LLM_SEED=str(args.seed),
+               LLM_CACHE_ENABLED="false", PREP_PACK_CACHE_ENABLED="false")
+    servers = [
+        ("dev server", [sys.executable, os.path.join(repo, "app.py")], 5000),
+        (f"serve.py {args.workers}x{args.threads}", [sys.executable, os.path.join(repo, "serve.py"), "--port",
+         str(args.port), "--workers", str(args.workers), "--threads", str(args.threads)], args.port),
+    ]
+    local = threading.local()
+
+    def post(port, path, body):
+        if getattr(local, "client", None) is None:
+            local.client = httpx.Client(timeout=120)
+        response = local.client.post(f"http://127.0.0.1:{port}{path}", json=body)
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code}: {response.text[:200]}")
+
+    targets = {
+        "prep_pack": ("/prep-pack", lambda: {"client_id": args.client_id}),
+        "chat": ("/chat", lambda: {"message": "Bonjour", "session_id": f"serve-{random.random()}"}),
+    }
+    try:
+        for label, command, port in servers:
+            process = _start_server(command, port, workdir, env)
+            try:
+                for target in args.targets:
+                    path, body = targets[target]
+                    for concurrency in args.concurrency:
+                        level = _run_level(lambda: post(port, path, body()), concurrency,
+                                           args.requests or concurrency * 10)
+                        print(f"{label:<16} {target:<10} c={concurrency:<3} err={level['errors']:<3} "
+                              f"{level['throughput_rps']:>8.2f} req/s  p50={level['p50_s']:.3f}s  "
+                              f"p95={level['p95_s']:.3f}s  p99={level['p99_s']:.3f}s")
+            finally:
+                _stop_server(process)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("parallel", help="prep pack wall-clock, sequential vs parallel agents")
+    p.add_argument("--client-id", default=DEFAULT_CLIENT)
+    p.add_argument("--latency", type=float, default=0.5, help="mocked LLM latency per call (s)")
+    p.add_argument("--runs", type=int, default=3)
+    p.add_argument("--max-workers", type=int, default=2)
+    p.set_defaults(func=bench_parallel)
+
+    p = sub.add_parser("cache", help="prep pack wall-clock, cold vs warm LLM response cache")
+    p.add_argument("--client-id", default=DEFAULT_CLIENT)
+    p.add_argument("--latency", type=float, default=0.5, help="mocked LLM latency per call (s)")
+    p.set_defaults(func=bench_cache)
+
+    p = sub.add_parser("prep-cache", help="prep pack wall-clock, rebuild vs memoized pack")
+    p.add_argument("--client-id", default=DEFAULT_CLIENT)
+    p.add_argument("--latency", type=float, default=0.5, help="mocked LLM latency per call (s)")
+    p.set_defaults(func=bench_prep_cache)
+
+    p = sub.add_parser("normalizer", help="DataRetrieverAgent fast path vs LLM: latency and parity")
+    p.add_argument("--client-id", default=DEFAULT_CLIENT)
+    p.add_argument("--latency", type=float, default=1.5, help="mocked LLM latency per call (s)")
+    p.add_argument("--runs", type=int, default=3)
+    p.add_argument("--live", action="store_true", help="compare against real Gemini output (needs GEMINI_API_KEY)")
+    p.add_argument("--record", help="with --live: save the Gemini snapshot to this JSON file")
+    p.add_argument("--reference", help="compare against a Gemini snapshot saved with --record")
+    p.set_defaults(func=bench_normalizer)
+
+    p = sub.add_parser("interactions", help="interaction log append/read cost vs history size")
+    p.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    p.add_argument("--recent", type=int, default=5, help="entries read for the recent view")
+    p.add_argument("--runs", type=int, default=5)
+    p.set_defaults(func=bench_interactions)
+
+    p = sub.add_parser("bct-index", help="BCT circular lookup time and prompt tokens, BM25 top-k vs full dump")
+    p.add_argument("--client-id", default=DEFAULT_CLIENT)
+    p.add_argument("--sizes", type=int, nargs="+", default=[100, 1000])
+    p.add_argument("--top-k", type=int, default=Config.BCT_TOP_K)
+    p.add_argument("--runs", type=int, default=20)
+    p.set_defaults(func=bench_bct_index)
+
+    p = sub.add_parser("prompts", help="estimated prompt tokens per agent, legacy vs compact/projected")
+    p.add_argument("--client-id", default=DEFAULT_CLIENT)
+    p.add_argument("--budget", type=int, help="override PROMPT_TOKEN_BUDGET to exercise trimming")
+    p.set_defaults(func=bench_prompts)
+
+    p = sub.add_parser("structured", help="schema prompt overhead and response validation, text vs native")
+    p.add_argument("--runs", type=int, default=200)
+    p.set_defaults(func=bench_structured)
+
+    p = sub.add_parser("clients", help="model client construction cost, per request vs shared registry")
+    p.add_argument("--requests", type=int, default=200)
+    p.set_defaults(func=bench_clients)
+
+    p = sub.add_parser("sessions", help="memory and per-turn cost of /chat session storage")
+    p.add_argument("--sessions", type=int, default=5000)
+    p.add_argument("--turns", type=int, default=20)
+    p.add_argument("--max-sessions", type=int, default=1000)
+    p.add_argument("--history-limit", type=int, default=20)
+    p.set_defaults(func=bench_sessions)
+
+    p = sub.add_parser("intents", help="coverage and accuracy of the /chat intent fast path")
+    p.add_argument("--corpus", default="data/intent_corpus.json")
+    p.add_argument("--verbose", action="store_true")
+    p.set_defaults(func=bench_intents)
+
+    p = sub.add_parser("client-directory", help="client name resolution: trigram index vs linear scan")
+    p.add_argument("--clients", type=int, default=5000)
+    p.add_argument("--runs", type=int, default=20)
+    p.add_argument("--seed", type=int, default=42)
+    p.set_defaults(func=bench_client_directory)
+
+    p = sub.add_parser("telegram", help="prep pack notification cost, blocking send vs background dispatcher")
+    p.add_argument("--report", default="outputs/prep_pack_ATB-SME-001_20260131.md")
+    p.add_argument("--notifications", type=int, default=20)
+    p.add_argument("--chats", type=int, default=5)
+    p.add_argument("--latency", type=float, default=0.3, help="simulated Telegram API latency (s)")
+    p.add_argument("--chat-interval", type=float, default=Config.TELEGRAM_CHAT_INTERVAL_SECONDS)
+    p.add_argument("--error-rate", type=float, default=0.0, help="share of sends failing with a network error")
+    p.add_argument("--seed", type=int, default=7)
+    p.set_defaults(func=bench_telegram)
+
+    p = sub.add_parser("telegram-bot", help="banker reply latency, blocking bot handler vs concurrent updates")
+    p.add_argument("--chats", type=int, default=20)
+    p.add_argument("--messages", type=int, default=5, help="messages per chat")
+    p.add_argument("--latency", type=float, default=0.2, help="simulated /chat latency (s)")
+    p.add_argument("--slow-latency", type=float, default=3.0, help="simulated latency of a prep pack via /chat (s)")
+    p.add_argument("--slow-share", type=float, default=0.1)
+    p.add_argument("--concurrency", type=int, default=Config.TELEGRAM_MAX_CONCURRENT_UPDATES)
+    p.add_argument("--seed", type=int, default=7)
+    p.set_defaults(func=bench_telegram_bot)
+
+    p = sub.add_parser("resilience", help="prep pack success rate and tail latency with injected LLM faults")
+    p.add_argument("--client-id", default=DEFAULT_CLIENT)
+    p.add_argument("--packs", type=int, default=100)
+    p.add_argument("--latency", type=float, default=0.05, help="mocked LLM latency per call (s)")
+    p.add_argument("--error-rate", type=float, default=0.2, help="share of calls failing with a 503")
+    p.add_argument("--slow-rate", type=float, default=0.02, help="share of calls hitting the slow tail")
+    p.add_argument("--slow-latency", type=float, default=1.0)
+    p.set_defaults(func=bench_resilience)
+
+    p = sub.add_parser("load", help="throughput and p50/p95/p99 per entry point at several concurrency levels")
+    p.add_argument("--client-id", default=DEFAULT_CLIENT)
+    p.add_argument("--targets", nargs="+", choices=LOAD_TARGETS, default=list(LOAD_TARGETS))
+    p.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    p.add_argument("--requests", type=int, help="requests per level (default: 10 x concurrency)")
+    p.add_argument("--latency-spec", default="lognormal:0.3:0.5", help="fake LLM latency distribution")
+    p.add_argument("--mode", choices=["canned", "generated"], default="canned")
+    p.add_argument("--error-rate", type=float, default=0.0)
+    p.add_argument("--seed", type=int, default=7)
+    p.add_argument("--out", help="JSON results path (default: outputs/benchmarks/load_<timestamp>.json)")
+    p.set_defaults(func=bench_load)
+
+    p = sub.add_parser("a2a", help="A2A messages: one per request vs batch endpoint, agent runs under retries")
+    p.add_argument("--client-id", default=DEFAULT_CLIENT)
+    p.add_argument("--messages", type=int, default=16)
+    p.add_argument("--duplicates", type=int, default=8, help="concurrent deliveries of the same message_id")
+    p.add_argument("--latency-spec", default="lognormal:0.3:0.5", help="fake LLM latency distribution")
+    p.add_argument("--seed", type=int, default=7)
+    p.set_defaults(func=bench_a2a)
+
+    p = sub.add_parser("serve", help="HTTP throughput and latency, Flask dev server vs serve.py workers")
+    p.add_argument("--client-id", default=DEFAULT_CLIENT)
+    p.add_argument("--targets", nargs="+", choices=["prep_pack", "chat"], default=["prep_pack", "chat"])
+    p.add_argument("--concurrency", type=int, nargs="+", default=[4, 16])
+    p.add_argument("--requests", type=int, help="requests per level (default: 10 x concurrency)")
+    p.add_argument("--latency-spec", default="lognormal:0.3:0.5", help="fake LLM latency distribution")
+    p.add_argument("--workers", type=int, default=Config.SERVE_WORKERS)
+    p.add_argument("--threads", type=int, default=Config.SERVE_THREADS)
+    p.add_argument("--port", type=int, default=5001)
+    p.add_argument("--seed", type=int, default=7)
+    p.set_defaults(func=bench_serve)
+
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+    # Benchmarks measure the pipeline itself unless they opt into caching explicitly
+    Config.LLM_CACHE_ENABLED = False
+    Config.PREP_PACK_CACHE_ENABLED = False
+    # The fake LLM has no quota: the Gemini token bucket would only add waits
+    rate_limit.gemini_rate_limiter = None
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
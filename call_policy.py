@@ -0,0 +1,236 @@
+"""
+Call policy for LLM requests: jittered exponential retry on transient errors, a circuit breaker
+per backend that fails fast while Gemini is unhealthy, and optional hedging (a duplicate request
+once the first one is slower than a fixed threshold or the agent's observed p95).
+
+Policies are configured globally (LLM_MAX_ATTEMPTS, LLM_HEDGE, ...) and per agent, e.g.
+RISK_COMPLIANCE_AGENT_MAX_ATTEMPTS=5 or CONVERSATION_AGENT_HEDGE=p95.
+"""
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from google.api_core import exceptions as api_exceptions
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_ERRORS = (
+    api_exceptions.TooManyRequests,      # 429 (ResourceExhausted)
+    api_exceptions.InternalServerError,  # 500
+    api_exceptions.BadGateway,           # 502
+    api_exceptions.ServiceUnavailable,   # 503
+    api_exceptions.GatewayTimeout,       # 504 (DeadlineExceeded)
+    api_exceptions.ResourceExhausted,
+    api_exceptions.DeadlineExceeded,
+    ConnectionError,
+    TimeoutError,
+)
+
+
+class CircuitOpenError(RuntimeError):
+    def __init__(self, backend: str, retry_in: float):
+        super().__init__(f"Circuit open for {backend}, retry in {retry_in:.0f}s")
+        self.backend = backend
+
+
+def is_retryable(error: Exception) -> bool:
+    return isinstance(error, RETRYABLE_ERRORS) and not isinstance(error, CircuitOpenError)
+
+
+class CircuitBreaker:
+    """closed -> open after `threshold` consecutive transient failures -> half-open after `reset_seconds`."""
+
+    def __init__(self, name: str, threshold: int, reset_seconds: float):
+        self.name = name
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raises CircuitOpenError instead of letting a call through to an unhealthy backend."""
+        with self._lock:
+            if self.state == "closed":
+                return
+            elapsed = time.monotonic() - self.opened_at
+            if self.state == "open" and elapsed >= self.reset_seconds:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True  # a single trial request probes the backend
+                return
+            self.rejected += 1
+            raise CircuitOpenError(self.name, max(0.0, self.reset_seconds - elapsed))
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                logger.info(f"Circuit {self.name} closed")
+            self.state = "closed"
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == "half_open" or self.failures >= self.threshold:
+                if self.state != "open":
+                    logger.warning(f"Circuit {self.name} opened after {self.failures} failures")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"state": self.state, "failures": self.failures, "rejected": self.rejected}
+
+
+class LatencyTracker:
+    """Recent successful call latencies of one agent, for the p95 hedging threshold."""
+
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float, min_samples: int):
+        with self._lock:
+            if len(self._samples) < min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+class CallPolicy:
+    """Retry/hedging settings of one agent."""
+
+    def __init__(self, agent_name: str):
+        self.agent_name = agent_name
+        self.max_attempts = max(1, int(Config.agent_setting(agent_name, "MAX_ATTEMPTS", Config.LLM_MAX_ATTEMPTS)))
+        self.base_delay = float(Config.agent_setting(agent_name, "RETRY_BASE_SECONDS", Config.LLM_RETRY_BASE_SECONDS))
+        self.max_delay = Config.LLM_RETRY_MAX_SECONDS
+        # "off", "p95" (observed latency) or a fixed number of seconds
+        self.hedge = str(Config.agent_setting(agent_name, "HEDGE", Config.LLM_HEDGE)).lower()
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff before retry number `attempt` (1-based)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+
+_breakers = {}
+_trackers = {}
+_policies = {}
+_registry_lock = threading.Lock()
+_hedge_executor = ThreadPoolExecutor(max_workers=Config.LLM_HEDGE_MAX_WORKERS, thread_name_prefix="llm-hedge")
+_stats = {"calls": 0, "retries": 0, "hedges": 0, "hedge_wins": 0, "failures": 0}
+
+
+def get_breaker(backend: str) -> CircuitBreaker:
+    with _registry_lock:
+        if backend not in _breakers:
+            _breakers[backend] = CircuitBreaker(backend, Config.CIRCUIT_FAILURE_THRESHOLD, Config.CIRCUIT_RESET_SECONDS)
+        return _breakers[backend]
+
+
+def get_policy(agent_name: str) -> CallPolicy:
+    with _registry_lock:
+        if agent_name not in _policies:
+            _policies[agent_name] = CallPolicy(agent_name)
+            _trackers[agent_name] = LatencyTracker()
+        return _policies[agent_name]
+
+
+def reset():
+    """Forgets breakers, policies and latency history (settings are re-read from Config)."""
+    with _registry_lock:
+        _breakers.clear()
+        _policies.clear()
+        _trackers.clear()
+        for key in _stats:
+            _stats[key] = 0
+
+
+def _count(key: str):
+    with _registry_lock:
+        _stats[key] += 1
+
+
+def _hedge_threshold(policy: CallPolicy):
+    if policy.hedge in ("", "off", "false", "0"):
+        return None
+    if policy.hedge == "p95":
+        return _trackers[policy.agent_name].percentile(0.95, Config.LLM_HEDGE_MIN_SAMPLES)
+    return float(policy.hedge)
+
+
+def _call_hedged(fn, hedge_after: float):
+    """Runs fn; if it has not answered after `hedge_after` seconds, races a duplicate against it."""
+    first = _hedge_executor.submit(fn)
+    done, _ = wait([first], timeout=hedge_after)
+    if done:
+        return first.result()
+
+    _count("hedges")
+    second = _hedge_executor.submit(fn)
+    pending = {first, second}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if future is second:
+                    _count("hedge_wins")
+                return future.result()  # the slower request keeps running in the background
+            error = future.exception()
+    raise error
+
+
+def call_with_policy(agent_name: str, fn, backend: str = None):
+    """Calls fn() (one LLM request) under the agent's retry, circuit breaker and hedging policy."""
+    policy = get_policy(agent_name)
+    breaker = get_breaker(backend or f"gemini:{Config.GEMINI_MODEL}")
+    tracker = _trackers[agent_name]
+    _count("calls")
+
+    for attempt in range(1, policy.max_attempts + 1):
+        breaker.before_call()
+        start = time.monotonic()
+        try:
+            hedge_after = _hedge_threshold(policy)
+            result = _call_hedged(fn, hedge_after) if hedge_after else fn()
+        except Exception as e:
+            if not is_retryable(e):
+                breaker.record_success()  # the backend answered; the request itself was bad
+                raise
+            breaker.record_failure()
+            if attempt == policy.max_attempts:
+                _count("failures")
+                raise
+            delay = policy.backoff(attempt)
+            _count("retries")
+            logger.warning(
+                f"Agent {agent_name} attempt {attempt}/{policy.max_attempts} failed ({type(e).__name__}: {e}), "
+                f"retrying in {delay:.2f}s"
+            )
+            time.sleep(delay)
+            continue
+        breaker.record_success()
+        tracker.add(time.monotonic() - start)
+        return result
+
+
+def stats() -> dict:
+    with _registry_lock:
+        breakers = list(_breakers.values())
+        result = dict(_stats)
+    result["breakers"] = {b.name: b.stats() for b in breakers}
+    return result
@@ -0,0 +1,387 @@
+"""
+Client directory: resolves what a banker types ("sotuplast", "Sotuplst", "1234567M", "Ahmed Tounsi")
+to a client_id. Indexed from every CRM profile: company name, trade name and aliases, tax id, client id
+and stakeholder names. Exact keys are a dict lookup. Fuzzy candidates are the keys containing a token
+one edit away from a query token (symmetric deletion index over name tokens), scored by trigram Dice
+similarity; /clients/search falls back to a trigram inverted-index scan when no token is that close.
+
+The index refreshes itself every CLIENT_DIRECTORY_REFRESH_SECONDS in the background, re-reading
+only the profiles whose fingerprint changed.
+"""
+import logging
+import math
+import re
+import threading
+import time
+import unicodedata
+from typing import Optional
+from bct_index import STOPWORDS
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+CLIENT_ID_PATTERN = re.compile(r"\b[a-z]{2,5}-[a-z]{2,5}-\d{3,}\b")
+TAX_ID_PATTERN = re.compile(r"\b\d{7}[a-z]\b")
+LEGAL_FORMS = {"sarl", "s.a.r.l", "sa", "s.a", "suarl", "sas", "snc", "ste", "societe"}
+TOKEN_PATTERN = re.compile(r"[\w.'-]+")
+EXACT_ONLY_KINDS = {"client_id", "tax_id"}  # identifiers: no fuzzy matching (and no huge trigram postings)
+MIN_FUZZY_CHARS = 4
+MAX_TOKEN_CANDIDATES = 256  # keys sharing a more common query token are only scored if they also share a rarer one
+AMBIGUITY_MARGIN = 0.1  # a fuzzy match must beat the next client by this much
+
+
+def fold(text: str) -> str:
+    """Lowercase without accents, same length as `text` (so match offsets apply to the original)."""
+    return "".join((unicodedata.normalize("NFKD", ch)[:1] or ch).lower()[:1] for ch in text)
+
+
+def name_key(name: str) -> str:
+    """Folded name without legal forms or punctuation: "SOTUPLAST S.A.R.L" -> "sotuplast"."""
+    tokens = (t.strip(".-'") for t in re.split(r"[\s,]+", fold(str(name))))
+    return " ".join(t for t in tokens if t and t not in LEGAL_FORMS)
+
+
+def trigrams(key: str) -> set:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def deletions(token: str) -> set:
+    """The token and its one-character deletions: two tokens one edit (or one swap) apart share one of these."""
+    if len(token) < MIN_FUZZY_CHARS:
+        return {token}
+    return {token} | {token[:i] + token[i + 1:] for i in range(len(token))}
+
+
+def profile_keys(client_id: str, profile: dict) -> list:
+    """(key, kind) pairs under which a client can be found."""
+    names = [(profile.get("name") or profile.get("company_name"), "name"),
+             (profile.get("trade_name"), "trade_name"), (client_id, "client_id")]
+    names += [(alias, "alias") for alias in profile.get("aliases") or []]
+    names += [(s.get("name"), "stakeholder") for s in profile.get("stakeholders") or [] if isinstance(s, dict)]
+    tax_id = str(profile.get("tax_id") or "")
+    if tax_id:
+        names.append((tax_id.split("/")[0], "tax_id"))
+    keys = []
+    for name, kind in names:
+        key = name_key(name) if name else ""
+        if key and (key, kind) not in keys:
+            keys.append((key, kind))
+    return keys
+
+
+class ClientDirectory:
+    """In-memory name index over the repository's CRM profiles."""
+
+    def __init__(self, repository=None, refresh_seconds: float = None, threshold: float = None):
+        self._repository = repository
+        self.refresh_seconds = Config.CLIENT_DIRECTORY_REFRESH_SECONDS if refresh_seconds is None else refresh_seconds
+        self.threshold = Config.CLIENT_MATCH_THRESHOLD if threshold is None else threshold
+        self._clients = {}  # client_id -> {"name", "keys", "fingerprint"}
+        self._keys = {}  # key -> set of client ids
+        self._trigrams = {}  # trigram -> set of fuzzy-searchable keys
+        self._fuzzy_keys = {}  # fuzzy-searchable key -> its trigrams
+        self._token_keys = {}  # token -> set of fuzzy-searchable keys containing it
+        self._deletions = {}  # deletion variant -> set of tokens (see deletions())
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+        self._refreshed_at = None
+        self._stats = {"lookups": 0, "refreshes": 0, "reindexed": 0, "last_refresh_seconds": 0.0}
+
+    @property
+    def repository(self):
+        if self._repository is None:
+            from repository import get_repository
+            self._repository = get_repository()
+        return self._repository
+
+    # --- Index maintenance ---
+
+    def _add(self, client_id: str, profile: dict, fingerprint):
+        keys = profile_keys(client_id, profile)
+        self._clients[client_id] = {"name": profile.get("name") or client_id, "keys": keys, "fingerprint": fingerprint}
+        for key, kind in keys:
+            self._keys.setdefault(key, set()).add(client_id)
+            if kind not in EXACT_ONLY_KINDS and key not in self._fuzzy_keys:
+                self._fuzzy_keys[key] = trigrams(key)
+                for gram in self._fuzzy_keys[key]:
+                    self._trigrams.setdefault(gram, set()).add(key)
+                for token in set(key.split()):
+                    if token not in self._token_keys:
+                        self._token_keys[token] = set()
+                        for variant in deletions(token):
+                            self._deletions.setdefault(variant, set()).add(token)
+                    self._token_keys[token].add(key)
+
+    def _remove(self, client_id: str):
+        entry = self._clients.pop(client_id, None)
+        for key, _ in (entry or {}).get("keys", []):
+            ids = self._keys.get(key)
+            if ids is None:
+                continue
+            ids.discard(client_id)
+            if not ids:
+                del self._keys[key]
+                if key not in self._fuzzy_keys:
+                    continue
+                for gram in self._fuzzy_keys.pop(key):
+                    postings = self._trigrams.get(gram)
+                    if postings is not None:
+                        postings.discard(key)
+                        if not postings:
+                            del self._trigrams[gram]
+                for token in set(key.split()):
+                    keys = self._token_keys.get(token)
+                    if keys is None:
+                        continue
+                    keys.discard(key)
+                    if not keys:
+                        del self._token_keys[token]
+                        for variant in deletions(token):
+                            self._deletions[variant].discard(token)
+                            if not self._deletions[variant]:
+                                del self._deletions[variant]
+
+    def refresh(self) -> dict:
+        """Re-reads new and changed profiles and drops deleted clients. Returns the counts."""
+        with self._refresh_lock:
+            start = time.perf_counter()
+            repository = self.repository
+            client_ids = set(repository.list_clients())
+            with self._lock:
+                known = {cid: entry["fingerprint"] for cid, entry in self._clients.items()}
+            changes = {"added": 0, "updated": 0, "removed": 0}
+            # Profiles are read outside the index lock: lookups keep using the current index meanwhile
+            updates = []
+            for client_id in client_ids:
+                fingerprint = repository.profile_fingerprint(client_id)
+                if client_id not in known or known[client_id] != fingerprint:
+                    updates.append((client_id, repository.get_profile(client_id), fingerprint))
+            with self._lock:
+                for client_id in set(known) - client_ids:
+                    self._remove(client_id)
+                    changes["removed"] += 1
+                for client_id, profile, fingerprint in updates:
+                    changes["updated" if client_id in self._clients else "added"] += 1
+                    self._remove(client_id)
+                    self._add(client_id, profile, fingerprint)
+                self._refreshed_at = time.monotonic()
+                self._stats["refreshes"] += 1
+                self._stats["reindexed"] += len(updates)
+                self._stats["last_refresh_seconds"] = round(time.perf_counter() - start, 4)
+            if updates or changes["removed"]:
+                logger.info(f"Client directory refreshed: {changes} in {time.perf_counter() - start:.2f}s")
+            return changes
+
+    def _ensure_fresh(self):
+        if self._refreshed_at is None:
+            self.refresh()  # first lookup builds the index
+        elif self.refresh_seconds and time.monotonic() - self._refreshed_at > self.refresh_seconds:
+            if not self._refresh_lock.locked():
+                self._refreshed_at = time.monotonic()  # one background refresh at a time
+                threading.Thread(target=self.refresh, name="client-directory-refresh", daemon=True).start()
+
+    def invalidate(self, client_id: str = None):
+        """Re-indexes one client now, or marks every profile for re-reading on the next lookup."""
+        if client_id is None:
+            with self._lock:
+                for entry in self._clients.values():
+                    entry["fingerprint"] = None
+                self._refreshed_at = None
+            return
+        repository = self.repository
+        exists = repository.exists(client_id)
+        profile = repository.get_profile(client_id) if exists else None
+        fingerprint = repository.profile_fingerprint(client_id) if exists else None
+        with self._lock:
+            self._remove(client_id)
+            if exists:
+                self._add(client_id, profile, fingerprint)
+
+    # --- Lookups ---
+
+    def _near(self, token: str) -> tuple:
+        """(indexed tokens one edit away from `token`, or equal to it; fuzzy-searchable keys containing one)."""
+        tokens, keys = set(), set()
+        for variant in deletions(token):
+            tokens |= self._deletions.get(variant, set())
+        for near in tokens:
+            keys |= self._token_keys[near]
+        return tokens, keys
+
+    def _score(self, key: str, candidates, limit: int) -> list:
+        """[(score, candidate)] with trigram Dice similarity >= threshold, best first."""
+        grams = trigrams(key)
+        scored = []
+        for candidate in candidates:
+            other = self._fuzzy_keys[candidate]
+            score = 2 * len(grams & other) / (len(grams) + len(other))
+            if score >= self.threshold:
+                scored.append((score, candidate))
+        scored.sort(reverse=True)
+        return scored[:limit]
+
+    def _fuzzy(self, key: str, limit: int, near: dict = None) -> list:
+        """
+        [(score, key)] for the keys sharing a token (give or take one edit) with `key`, best first.
+        `near` caches token -> _near() across the windows of one message.
+        """
+        near = {} if near is None else near
+        matched, tokens = [], key.split()
+        if len(tokens) > 1:
+            tokens.append("".join(tokens))  # a name typed in two pieces: "sotu plast"
+        for token in tokens:
+            if token not in near:
+                near[token] = self._near(token)
+            if near[token][1]:
+                matched.append(near[token])
+        if not matched:
+            return []
+        # Rare tokens (a company name) pick the candidates; common ones ("ahmed", "tunisie") only narrow them
+        # down, and a lone common token can only be close to a key made of that one token
+        rare = [keys for _, keys in matched if len(keys) <= MAX_TOKEN_CANDIDATES]
+        if rare:
+            candidates = set().union(*rare)
+        elif len(matched) > 1:
+            candidates = set.intersection(*(keys for _, keys in matched))
+        else:
+            candidates = matched[0][0] & self._fuzzy_keys.keys()
+        return self._score(key, candidates, limit)
+
+    def _trigram_scan(self, key: str, limit: int) -> list:
+        """[(score, key)] with trigram Dice similarity >= threshold over the whole index, best first."""
+        grams = trigrams(key)
+        # Dice >= t needs at least t*|q|/(2-t) shared trigrams, so every match contains one of the
+        # |q| - min_shared + 1 rarest query trigrams: only their postings are scanned
+        min_shared = max(1, math.ceil(self.threshold * len(grams) / (2 - self.threshold)))
+        rarest = sorted(grams, key=lambda gram: len(self._trigrams.get(gram, ())))[:len(grams) - min_shared + 1]
+        candidates = set()
+        for gram in rarest:
+            candidates.update(self._trigrams.get(gram, ()))
+        return self._score(key, candidates, limit)
+
+    def search(self, query: str, limit: int = 5) -> list:
+        """Best matching clients: [{"client_id", "name", "score", "matched"}], exact matches or else fuzzy ones."""
+        self._ensure_fresh()
+        key = name_key(query)
+        if not key:
+            return []
+        with self._lock:
+            self._stats["lookups"] += 1
+            results = {cid: (1.0, key) for cid in self._keys.get(key, ())}
+            # An exact name, id or tax id is the answer; near-misses are only searched for when nothing matched,
+            # and the whole trigram index only when no indexed token is within one edit of the query's
+            fuzzy = self._fuzzy(key, limit * 4) if not results else []
+            if not results and not fuzzy:
+                fuzzy = self._trigram_scan(key, limit * 4)
+            for score, candidate in fuzzy:
+                for cid in self._keys.get(candidate, ()):
+                    if cid not in results:
+                        results[cid] = (round(score, 3), candidate)
+            ranked = sorted(results.items(), key=lambda item: (-item[1][0], item[0]))[:limit]
+            return [{"client_id": cid, "name": self._clients[cid]["name"], "score": score, "matched": matched}
+                    for cid, (score, matched) in ranked]
+
+    def _fuzzy_window(self, key: str, near: dict) -> Optional[tuple]:
+        """(best score, ids of every client within AMBIGUITY_MARGIN of it), or None."""
+        if len(key) < MIN_FUZZY_CHARS:
+            return None
+        best = self._fuzzy(key, 8, near)
+        if not best:
+            return None
+        ids = set()
+        for score, candidate in best:
+            if best[0][0] - score >= AMBIGUITY_MARGIN:
+                break
+            ids |= self._keys[candidate]
+        return best[0][0], ids
+
+    def resolve(self, text: str) -> Optional[tuple]:
+        """(client_id, (start, end)) for the single client mentioned in free text, None if none or ambiguous."""
+        self._ensure_fresh()
+        folded = fold(text)
+        with self._lock:
+            self._stats["lookups"] += 1
+            matches = {}
+            for pattern in (CLIENT_ID_PATTERN, TAX_ID_PATTERN):
+                for match in pattern.finditer(folded):
+                    for cid in self._keys.get(match.group(0), ()):
+                        matches.setdefault(cid, match.span())
+            if matches:
+                return next(iter(matches.items())) if len(matches) == 1 else None
+            tokens = list(TOKEN_PATTERN.finditer(folded))
+            windows = [(size, i, name_key(" ".join(t.group(0) for t in tokens[i:i + size])))
+                       for size in (3, 2, 1) for i in range(len(tokens) - size + 1)]
+            # Exact names first, longest first; a window inside a longer matched name is skipped
+            candidates, covered = [], set()
+            for size, i, key in windows:
+                ids = self._keys.get(key)
+                if ids and not covered & set(range(i, i + size)):
+                    candidates.append((set(ids), (tokens[i].start(), tokens[i + size - 1].end())))
+                    covered |= set(range(i, i + size))
+            if candidates:
+                return self._pick(candidates)
+            # Otherwise the best-scoring fuzzy windows, so "pour sotuplst" loses to "sotuplst" itself.
+            # Windows starting or ending on a stopword are never names and are not scored; each token's
+            # near keys are looked up once and shared by the windows containing it
+            scored, near = [], {}
+            for size, i, key in windows:
+                if {tokens[i].group(0), tokens[i + size - 1].group(0)} & STOPWORDS:
+                    continue
+                match = self._fuzzy_window(key, near)
+                if match:
+                    scored.append((match[0], size, i, match[1]))
+            scored.sort(key=lambda item: (-item[0], -item[1], item[2]))
+            for _, size, i, ids in scored:
+                if not covered & set(range(i, i + size)):
+                    candidates.append((ids, (tokens[i].start(), tokens[i + size - 1].end())))
+                    covered |= set(range(i, i + size))
+            return self._pick(candidates) if candidates else None
+
+    @staticmethod
+    def _pick(candidates: list) -> Optional[tuple]:
+        """One client named unambiguously ("SOTUPLAST"), or the single client every shared name points to."""
+        unique = {}
+        for ids, span in candidates:
+            if len(ids) == 1:
+                unique.setdefault(next(iter(ids)), span)
+        if unique:
+            return next(iter(unique.items())) if len(unique) == 1 else None
+        common = set.intersection(*(ids for ids, _ in candidates))
+        return (common.pop(), candidates[0][1]) if len(common) == 1 else None
+
+    def display_name(self, client_id: str) -> str:
+        self._ensure_fresh()
+        with self._lock:
+            entry = self._clients.get(client_id)
+        return entry["name"] if entry else client_id
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["clients"] = len(self._clients)
+            stats["keys"] = len(self._keys)
+            stats["trigrams"] = len(self._trigrams)
+            stats["tokens"] = len(self._token_keys)
+        return stats
+
+
+_directory = None
+_directory_lock = threading.Lock()
+
+
+def get_client_directory() -> ClientDirectory:
+    """Process-wide directory over get_repository()."""
+    global _directory
+    if _directory is None:
+        with _directory_lock:
+            if _directory is None:
+                _directory = ClientDirectory()
+    return _directory
+
+
+def set_client_directory(directory: Optional[ClientDirectory]):
+    """Plugs in another directory (benchmarks, another repository). None resets to the default."""
+    global _directory
+    with _directory_lock:
+        _directory = directory
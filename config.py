@@ -8,14 +8,144 @@ class Config:
     GEMINI_MODEL = "gemini-2.5-flash"  # Or your preferred model
     DATA_MODE = os.getenv("DATA_MODE", "fake")
     FAKE_DATA_PATH = "data/fake_clients"
+    CLIENT_STORE = os.getenv("CLIENT_STORE", "json")  # "json" (fake_clients files) or "sqlite"
+    CLIENT_DB_PATH = os.getenv("CLIENT_DB_PATH", "data/clients.sqlite")
+    FIXTURE_CACHE_ENABLED = os.getenv("FIXTURE_CACHE_ENABLED", "true").lower() == "true"
+    FIXTURE_CACHE_MAX_CLIENTS = int(os.getenv("FIXTURE_CACHE_MAX_CLIENTS", 256))  # LRU bound on cached clients
+    INTERACTIONS_HISTORY_LIMIT = int(os.getenv("INTERACTIONS_HISTORY_LIMIT", 50))  # most recent entries loaded per client
     PRODUCT_CATALOG_PATH = os.getenv("PRODUCT_CATALOG_PATH", "./data/product_catalog.json")
     A2A_HOST = os.getenv("A2A_HOST", "0.0.0.0")
     A2A_PORT = int(os.getenv("A2A_PORT", 8000))
 
+    # A2A server: /a2a/message/batch runs envelopes on one bounded pool shared by all batches; a retried message_id (same sender)
+    # is answered from the idempotency cache, or waits for the first execution if it is still running
+    A2A_BATCH_MAX_MESSAGES = int(os.getenv("A2A_BATCH_MAX_MESSAGES", 100))
+    A2A_BATCH_MAX_WORKERS = int(os.getenv("A2A_BATCH_MAX_WORKERS", 4))
+    A2A_IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("A2A_IDEMPOTENCY_MAX_ENTRIES", 1000))
+    A2A_IDEMPOTENCY_TTL_SECONDS = float(os.getenv("A2A_IDEMPOTENCY_TTL_SECONDS", 3600))
+    A2A_IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("A2A_IDEMPOTENCY_WAIT_SECONDS", 120))  # 0 = wait indefinitely
+
+    # Prep Pack orchestration (risk & opportunity agents fan out in parallel)
+    PARALLEL_AGENTS = os.getenv("PARALLEL_AGENTS", "true").lower() == "true"
+    AGENT_MAX_WORKERS = int(os.getenv("AGENT_MAX_WORKERS", 2))
+    AGENT_TIMEOUT_SECONDS = float(os.getenv("AGENT_TIMEOUT_SECONDS", 90))
+
+    # Portfolio batches (/prep-pack/batch) and the global Gemini request budget (0 = unlimited)
+    BATCH_MAX_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", 4))
+    GEMINI_REQUESTS_PER_MINUTE = float(os.getenv("GEMINI_REQUESTS_PER_MINUTE", 60))
+    GEMINI_BURST = int(os.getenv("GEMINI_BURST", 5))
+
+    # Background jobs (/jobs/*), persisted so they survive restarts
+    JOB_DB_PATH = os.getenv("JOB_DB_PATH", "outputs/jobs.sqlite")
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+    # A running job's lease is renewed every third of this; a job whose process died is re-queued once it expires
+    JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", 60))
+
+    # Production server (serve.py): gunicorn gthread workers forked from a preloaded app, or a threaded
+    # Werkzeug server where gunicorn is unavailable. In-flight requests get SERVE_GRACEFUL_TIMEOUT to finish.
+    SERVE_HOST = os.getenv("SERVE_HOST", "0.0.0.0")
+    SERVE_PORT = int(os.getenv("SERVE_PORT", 5000))
+    SERVE_WORKERS = int(os.getenv("SERVE_WORKERS", min(4, os.cpu_count() or 1)))
+    SERVE_THREADS = int(os.getenv("SERVE_THREADS", 8))
+    SERVE_GRACEFUL_TIMEOUT = float(os.getenv("SERVE_GRACEFUL_TIMEOUT", 120))
+    SERVE_TIMEOUT = float(os.getenv("SERVE_TIMEOUT", 300))
+    # Set by serve.py when app.py is imported in the gunicorn master: per-process resources (job worker
+    # threads, gRPC clients, SQLite connections) are then opened in each worker by app.start_worker_process
+    PRELOAD_APP = os.getenv("PRELOAD_APP", "false").lower() == "true"
+
+    # DataRetrieverAgent maps known fixtures in Python and only asks the LLM for unmapped fields
+    FAST_NORMALIZER = os.getenv("FAST_NORMALIZER", "true").lower() == "true"
+
+    # LLM response cache (memory LRU, optional SQLite tier)
+    LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 256))
+    LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", 3600))
+    LLM_CACHE_SQLITE_PATH = os.getenv("LLM_CACHE_SQLITE_PATH", "")  # e.g. outputs/llm_cache.sqlite
+    LLM_CACHE_MAX_DISK_ENTRIES = int(os.getenv("LLM_CACHE_MAX_DISK_ENTRIES", 5000))
+
+    # Prep Pack memoization (keyed by a fingerprint of the client fixtures, catalog, KB and model)
+    PREP_PACK_CACHE_ENABLED = os.getenv("PREP_PACK_CACHE_ENABLED", "true").lower() == "true"
+    PREP_PACK_CACHE_DIR = os.getenv("PREP_PACK_CACHE_DIR", "outputs/.prep_pack_cache")
+
+    # Client name resolution for /chat and Telegram (client_directory.py): trigram similarity needed for a fuzzy match
+    CLIENT_MATCH_THRESHOLD = float(os.getenv("CLIENT_MATCH_THRESHOLD", 0.6))
+    CLIENT_DIRECTORY_REFRESH_SECONDS = float(os.getenv("CLIENT_DIRECTORY_REFRESH_SECONDS", 30))
+
+    # /chat intents: rule-based fast path (intent_rules.py) before the LLM, which handles anything ambiguous
+    INTENT_FAST_PATH = os.getenv("INTENT_FAST_PATH", "true").lower() == "true"
+
+    # /chat conversation sessions (see session_store.py): "memory", or "sqlite" to share them across workers
+    SESSION_STORE = os.getenv("SESSION_STORE", "memory")
+    SESSION_SQLITE_PATH = os.getenv("SESSION_SQLITE_PATH", "outputs/sessions.sqlite")
+    SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", 1000))
+    SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", 3600))  # idle time before a session is dropped
+    SESSION_HISTORY_LIMIT = int(os.getenv("SESSION_HISTORY_LIMIT", 20))  # messages kept; older ones are summarized
+
+    # LLM backend (see llm_providers.py): "gemini", or "fake" for offline load tests
+    LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini")
+    FAKE_LLM_MODE = os.getenv("FAKE_LLM_MODE", "canned")  # canned | generated
+    FAKE_LLM_LATENCY = os.getenv("FAKE_LLM_LATENCY", "0")  # e.g. 0.5, uniform:0.2:0.8, lognormal:0.8:0.5
+    FAKE_LLM_ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", 0))
+    FAKE_LLM_SEED = int(os.getenv("FAKE_LLM_SEED")) if os.getenv("FAKE_LLM_SEED") else None
+
+    # LLM call policy (see call_policy.py); per agent: <AGENT>_MAX_ATTEMPTS, <AGENT>_RETRY_BASE_SECONDS, <AGENT>_HEDGE
+    LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", 3))
+    LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", 0.5))
+    LLM_RETRY_MAX_SECONDS = float(os.getenv("LLM_RETRY_MAX_SECONDS", 8))
+    LLM_HEDGE = os.getenv("LLM_HEDGE", "off")  # off | p95 | seconds before sending a duplicate request
+    LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", 20))
+    LLM_HEDGE_MAX_WORKERS = int(os.getenv("LLM_HEDGE_MAX_WORKERS", 8))
+    CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", 5))
+    CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", 30))
+
+    # Pass output schemas to Gemini's constrained decoding (falls back to the schema text in the prompt)
+    STRUCTURED_OUTPUT = os.getenv("STRUCTURED_OUTPUT", "true").lower() == "true"
+
+    # Number of BCT circulars (BM25-ranked against the client snapshot) injected into the risk prompt
+    BCT_TOP_K = int(os.getenv("BCT_TOP_K", 5))
+
+    # Estimated tokens of the task prompt (context + instructions, not the schema header) per agent call;
+    # low-priority context is trimmed beyond this
+    PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", 8000))
+
     # Telegram Bot Configuration
     TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")  # Get from @BotFather
     TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")  # Your Telegram user ID
 
+    # Outbound Telegram messages (telegram_notifier.TelegramDispatcher): bounded queue, paced under
+    # Telegram's flood limits (~1 msg/s per chat, 20/min per group, 30/s per bot), retried with backoff
+    TELEGRAM_QUEUE_SIZE = int(os.getenv("TELEGRAM_QUEUE_SIZE", 1000))
+    TELEGRAM_CHAT_INTERVAL_SECONDS = float(os.getenv("TELEGRAM_CHAT_INTERVAL_SECONDS", 1.0))
+    TELEGRAM_GROUP_INTERVAL_SECONDS = float(os.getenv("TELEGRAM_GROUP_INTERVAL_SECONDS", 3.0))
+    TELEGRAM_MESSAGES_PER_SECOND = float(os.getenv("TELEGRAM_MESSAGES_PER_SECOND", 30))
+    TELEGRAM_MAX_ATTEMPTS = int(os.getenv("TELEGRAM_MAX_ATTEMPTS", 4))
+
+    # Incoming Telegram updates (telegram_bot.DONNATelegramBot): handled concurrently, in order per chat;
+    # a progress message is posted when /chat takes longer than TELEGRAM_PROGRESS_AFTER_SECONDS
+    TELEGRAM_MAX_CONCURRENT_UPDATES = int(os.getenv("TELEGRAM_MAX_CONCURRENT_UPDATES", 32))
+    TELEGRAM_API_TIMEOUT_SECONDS = float(os.getenv("TELEGRAM_API_TIMEOUT_SECONDS", 120))
+    TELEGRAM_PROGRESS_AFTER_SECONDS = float(os.getenv("TELEGRAM_PROGRESS_AFTER_SECONDS", 5))
+    # Webhook mode (run_telegram_bot.py) when TELEGRAM_WEBHOOK_URL is set, e.g. https://bot.example.com/telegram
+    TELEGRAM_WEBHOOK_URL = os.getenv("TELEGRAM_WEBHOOK_URL")
+    TELEGRAM_WEBHOOK_LISTEN = os.getenv("TELEGRAM_WEBHOOK_LISTEN", "0.0.0.0")
+    TELEGRAM_WEBHOOK_PORT = int(os.getenv("TELEGRAM_WEBHOOK_PORT", 8443))
+    TELEGRAM_WEBHOOK_SECRET = os.getenv("TELEGRAM_WEBHOOK_SECRET")
+
+    @staticmethod
+    def agent_timeout(agent_name: str) -> float:
+        """Per-agent timeout, e.g. RISK_COMPLIANCE_AGENT_TIMEOUT_SECONDS=60 overrides the default."""
+        return float(os.getenv(f"{agent_name.upper()}_TIMEOUT_SECONDS", Config.AGENT_TIMEOUT_SECONDS))
+
+    @staticmethod
+    def prompt_token_budget(agent_name: str) -> int:
+        """Per-agent prompt budget, e.g. OPPORTUNITY_AGENT_TOKEN_BUDGET=4000 overrides the default."""
+        return int(os.getenv(f"{agent_name.upper()}_TOKEN_BUDGET", Config.PROMPT_TOKEN_BUDGET))
+
+    @staticmethod
+    def agent_setting(agent_name: str, key: str, default):
+        """Per-agent override of a global setting, e.g. agent_setting("opportunity_agent", "HEDGE", "off")."""
+        return os.getenv(f"{agent_name.upper()}_{key}", default)
+
     @staticmethod
     def check_api_key():
         if not Config.GEMINI_API_KEY:
@@ -6,20 +6,29 @@ import json
 import logging
 from typing import Dict, Any, Optional
 from config import Config
-import google.generativeai as genai
+from llm_providers import get_provider
+from rate_limit import acquire_gemini_slot
+from call_policy import CircuitOpenError, call_with_policy
+from metrics import INTENT_FAST_PATH, LLM_CALL_SECONDS, LLM_ERRORS, LLM_OUTPUT_TOKENS, LLM_PROMPT_TOKENS
+import intent_rules
+from client_directory import get_client_directory
+from prompting import estimate_tokens
 
 logger = logging.getLogger(__name__)
 
+SUMMARY_PROMPT_CHARS = 600  # most recent part of the folded-history summary sent with each intent prompt
+
 class ConversationAgent:
     """Smart agent that understands banker commands and executes actions through dialog."""
     
     def __init__(self):
-        genai.configure(api_key=Config.GEMINI_API_KEY)
-        self.model = genai.GenerativeModel(Config.GEMINI_MODEL)
+        self.model = get_provider().get_model(Config.GEMINI_MODEL, "conversation_agent")
         
-    def process_message(self, user_message: str, conversation_history: list, conversation_state: dict) -> dict:
+    def process_message(self, user_message: str, conversation_history: list, conversation_state: dict,
+                        summary: str = "") -> dict:
         """
         Process user message and determine next action.
+        `summary` holds the turns already folded out of `conversation_history` (session_store.compact_history).
         Returns: {
             "response": "Agent's reply to user",
             "action": "generate_prep_pack|create_reminder|log_update|submit_notes|none",
@@ -30,43 +39,13 @@ class ConversationAgent:
         """
         logger.info(f"Processing message: {user_message[:100]}...")
         
-        # Build conversation context
-        context = self._build_context(conversation_history, conversation_state)
-        
-        # Create prompt for intent detection and slot filling
-        prompt = f"""You are an AI assistant for a Tunisian banker. Analyze the user's message and determine their intent.
-
-Available actions:
-1. generate_prep_pack: Generate a client briefing (needs: client_id)
-2. create_reminder: Set a future reminder (needs: client_id, reminder_text, due_date, priority)
-3. log_update: Log informal client update (needs: client_id, update_type, message)
-4. submit_notes: Submit formal meeting notes (needs: client_id, meeting_date, meeting_type, notes)
-
-Current conversation state: {json.dumps(conversation_state, indent=2)}
-Recent messages: {json.dumps(conversation_history[-3:], indent=2)}
-
-User's message: "{user_message}"
-
-Instructions:
-1. Detect the user's intent (which action they want)
-2. Extract any mentioned parameters (client name/ID, dates, priorities, etc.)
-3. Identify missing required parameters
-4. Generate a natural, helpful response in English
-
-If client name is mentioned (e.g., "SOTUPLAST"), map it to client_id: "ATB-SME-001".
-
-Respond ONLY with valid JSON:
-{{
-    "intent": "action_name or none",
-    "extracted_params": {{}},
-    "missing_slots": [],
-    "response": "Your natural language response to the user in English",
-    "reasoning": "Brief explanation of your analysis"
-}}"""
-
         try:
-            response = self.model.generate_content(prompt)
-            result = json.loads(response.text.strip().replace("```json", "").replace("```", ""))
+            result = intent_rules.classify(user_message, conversation_state) if Config.INTENT_FAST_PATH else None
+            INTENT_FAST_PATH.inc(result="hit" if result else "llm")
+            if result is None:
+                result = self._detect_intent(user_message, conversation_history, conversation_state, summary)
+            else:
+                logger.info(f"Intent fast path: {result['intent']} {result['extracted_params']}")
             
             # Update conversation state
             if result.get("intent") != "none":
@@ -90,7 +69,18 @@ Respond ONLY with valid JSON:
                 "reasoning": result.get("reasoning", "")
             }
             
+        except CircuitOpenError as e:
+            LLM_ERRORS.inc(agent="conversation_agent", error=type(e).__name__)
+            logger.warning(f"Conversation agent unavailable: {e}")
+            return {
+                "response": "The assistant is temporarily unavailable. Please try again in a moment.",
+                "action": "none",
+                "params": {},
+                "missing_slots": [],
+                "state": conversation_state
+            }
         except Exception as e:
+            LLM_ERRORS.inc(agent="conversation_agent", error=type(e).__name__)
             logger.error(f"Error processing message: {e}", exc_info=True)
             return {
                 "response": "Sorry, I didn't understand. Could you rephrase your request?",
@@ -100,6 +90,64 @@ Respond ONLY with valid JSON:
                 "state": conversation_state
             }
     
+    def _detect_intent(self, user_message: str, conversation_history: list, conversation_state: dict,
+                       summary: str = "") -> dict:
+        """Intent detection and slot filling by the LLM (parsed JSON answer)."""
+        # Build conversation context
+        context = self._build_context(conversation_history, conversation_state)
+        
+        # Client names are resolved by the directory, not by the LLM
+        directory = get_client_directory()
+        client = directory.resolve(user_message)
+        if client:
+            conversation_state.setdefault("collected_params", {})["client_id"] = client[0]
+            client_hint = f'The message refers to client "{directory.display_name(client[0])}": client_id "{client[0]}".'
+        else:
+            client_hint = "If the client cannot be identified from the conversation state, ask for the company name or client_id."
+        
+        # Older turns only survive as the session summary
+        earlier = f"Earlier in the conversation (summary):\n{summary[-SUMMARY_PROMPT_CHARS:]}\n" if summary else ""
+
+        # Create prompt for intent detection and slot filling
+        prompt = f"""You are an AI assistant for a Tunisian banker. Analyze the user's message and determine their intent.
+
+Available actions:
+1. generate_prep_pack: Generate a client briefing (needs: client_id)
+2. create_reminder: Set a future reminder (needs: client_id, reminder_text, due_date, priority)
+3. log_update: Log informal client update (needs: client_id, update_type, message)
+4. submit_notes: Submit formal meeting notes (needs: client_id, meeting_date, meeting_type, notes)
+
+Current conversation state: {json.dumps(conversation_state, indent=2)}
+{earlier}Recent messages: {json.dumps(conversation_history[-3:], indent=2)}
+
+User's message: "{user_message}"
+
+Instructions:
+1. Detect the user's intent (which action they want)
+2. Extract any mentioned parameters (client name/ID, dates, priorities, etc.)
+3. Identify missing required parameters
+4. Generate a natural, helpful response in English
+
+{client_hint}
+
+Respond ONLY with valid JSON:
+{{
+    "intent": "action_name or none",
+    "extracted_params": {{}},
+    "missing_slots": [],
+    "response": "Your natural language response to the user in English",
+    "reasoning": "Brief explanation of your analysis"
+}}"""
+
+        def request():
+            acquire_gemini_slot("conversation_agent")
+            return self.model.generate_content(prompt)
+        with LLM_CALL_SECONDS.time(agent="conversation_agent"):
+            response = call_with_policy("conversation_agent", request)
+        LLM_PROMPT_TOKENS.observe(estimate_tokens(prompt), agent="conversation_agent")
+        LLM_OUTPUT_TOKENS.observe(estimate_tokens(response.text), agent="conversation_agent")
+        return json.loads(response.text.strip().replace("```json", "").replace("```", ""))
+    
     def _build_context(self, history: list, state: dict) -> str:
         """Build context string from conversation history."""
         if not history:
@@ -0,0 +1,220 @@
+"""
+Offline stand-in for the Gemini model used by the agents.
+Lets us exercise the whole pipeline (benchmarks, demos) without burning API quota.
+
+Latency specs (FAKE_LLM_LATENCY, --latency-spec): "0.5" or "fixed:0.5", "uniform:0.2:0.8",
+"normal:0.5:0.1", "lognormal:0.5:0.6" (median, sigma), "exp:0.5" (mean).
+"""
+import json
+import math
+import random
+import threading
+import time
+from google.api_core.exceptions import ServiceUnavailable
+
+# Minimal, schema-valid answers for each agent (keyed by agent name)
+CANNED_RESPONSES = {
+    "data_retriever_agent": {
+        "client_id": "ATB-SME-001",
+        "company_name": "SOTUPLAST S.A.R.L",
+        "segment": "SME (PME)",
+        "crm_data": {"kyc_status": "Review Required"},
+        "financial_summary": {"avg_balance_3m": -30000.0},
+        "products_held": [{"name": "Facilité de Caisse", "status": "Active"}],
+        "recent_interactions": [{"date": "2026-01-15", "type": "Call"}],
+        "document_status": {"Registre de Commerce": "Expired"},
+        "centrale_risques": {
+            "total_commitment_market": 450000.0,
+            "worst_class": 0,
+            "unpaid_amount": 0.0,
+            "bct_notes": "Situation saine."
+        },
+        "missing_data": ["États Financiers 2025"]
+    },
+    "client_brief_agent": {
+        "objet_visite": "Renouvellement dossier",
+        "synthese_situation": "Client sain, tension de trésorerie ponctuelle.",
+        "chiffres_cles": {"Engagement Total": "450 000 TND", "Impayés": "0 TND"},
+        "points_vigilance": ["Registre de Commerce expiré"],
+        "agenda_rencontre": ["Point trésorerie", "Projet d'investissement"],
+        "questions_decouverte": ["Quels sont vos besoins d'équipement ?"]
+    },
+    "risk_compliance_agent": {
+        "risk_flags": [{
+            "risk_type": "KYC",
+            "description": "Registre de Commerce expiré",
+            "severity": "high",
+            "impact": "Blocage du renouvellement",
+            "circular_reference": "BCT Circular 2025-02"
+        }],
+        "verification_checklist": ["Obtenir le RC à jour"],
+        "do_not_do_list": ["Ne pas débloquer de fonds avant KYC"],
+        "compliance_notes": "Dossier à régulariser.",
+        "requires_human_approval": True
+    },
+    "opportunity_agent": {
+        "recommended_structure": [{
+            "product_name": "Crédit d'investissement",
+            "amount_proposal": "80 000 TND / 48 mois",
+            "purpose": "Machine d'injection",
+            "financial_justification": "Mensualité compatible avec les flux.",
+            "mitigation_factors": "Garantie SOTUGAR 70%",
+            "estimated_revenue": "8 800 TND d'intérêts"
+        }],
+        "quick_checklist": ["Devis fournisseur"],
+        "next_actions": [{
+            "id": "task_0001",
+            "description": "Collecter les états financiers 2025",
+            "status": "pending",
+            "due_date": None,
+            "priority": "high"
+        }],
+        "missing_data": []
+    },
+    "conversation_agent": {
+        "intent": "none",
+        "extracted_params": {},
+        "missing_slots": [],
+        "response": "Bonjour ! Que puis-je faire pour vous ?",
+        "reasoning": "Greeting, no action requested."
+    },
+    "after_meeting_agent": {
+        "compte_rendu_officiel": "Compte-rendu de visite.",
+        "updated_tasks": [],
+        "draft_email_subject": "Suite à notre rencontre",
+        "draft_email_body": "Cher client, ...",
+        "new_reminders": [],
+        "action_committee_required": False
+    }
+}
+
+
+def latency_sampler(spec):
+    """Callable(rng) -> seconds for a latency spec (a number is a fixed latency)."""
+    if callable(spec):
+        return spec
+    if isinstance(spec, (int, float)):
+        return lambda rng: float(spec)
+    kind, _, rest = str(spec).partition(":")
+    if not rest:
+        kind, rest = "fixed", kind
+    args = [float(x) for x in rest.split(":")]
+    if kind == "fixed":
+        return lambda rng: args[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(args[0], args[1])
+    if kind == "normal":
+        return lambda rng: max(0.0, rng.gauss(args[0], args[1]))
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(math.log(args[0]), args[1])
+    if kind == "exp":
+        return lambda rng: rng.expovariate(1 / args[0])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+WORDS = ["dossier", "trésorerie", "garantie", "crédit", "client", "échéance", "investissement",
+         "export", "bilan", "relation", "risque", "document", "visite", "financement"]
+
+
+def generate_example(schema_class, rng: random.Random = None) -> dict:
+    """Random instance of a pydantic schema (as a dict) built from its JSON Schema."""
+    rng = rng or random.Random()
+    schema = schema_class.model_json_schema()
+    defs = schema.get("$defs", {})
+
+    def build(node, field=""):
+        if "$ref" in node:
+            return build(defs[node["$ref"].split("/")[-1]], field)
+        if "anyOf" in node:
+            options = [o for o in node["anyOf"] if o.get("type") != "null"]
+            return build(rng.choice(options), field) if options else None
+        kind = node.get("type")
+        if kind == "object":
+            properties = node.get("properties")
+            if not properties:  # free-form Dict[str, ...]
+                value_schema = node.get("additionalProperties")
+                value_schema = value_schema if isinstance(value_schema, dict) else {"type": "string"}
+                return {rng.choice(WORDS): build(value_schema, field) for _ in range(rng.randint(1, 3))}
+            return {name: build(sub, name) for name, sub in properties.items()}
+        if kind == "array":
+            return [build(node.get("items", {}), field) for _ in range(rng.randint(1, 3))]
+        if kind == "integer":
+            return rng.randint(0, 4)
+        if kind == "number":
+            return round(rng.uniform(0, 500000), 2)
+        if kind == "boolean":
+            return rng.random() < 0.5
+        if "enum" in node:
+            return rng.choice(node["enum"])
+        if field in ("severity", "priority"):
+            return rng.choice(["high", "medium", "low"])
+        if field == "status":
+            return "pending"
+        if "date" in field:
+            return f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        return " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 8)))
+
+    return schema_class(**build(schema)).model_dump()
+
+
+class FakeResponse:
+    """Mimics the `.text` attribute of a Gemini response."""
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """
+    Drop-in replacement for genai.GenerativeModel.generate_content.
+    `payload` is a dict or a callable(rng) returning one per call; `latency` is seconds or a
+    latency spec (see latency_sampler). Optionally injects transient errors (`error_rate`, 503
+    by default) and a slow tail (`slow_rate` of the calls take `slow_latency` instead),
+    reproducibly with `seed`.
+    """
+    def __init__(self, payload, latency=0.0, error_rate: float = 0.0, slow_rate: float = 0.0,
+                 slow_latency: float = 0.0, error_factory=None, seed: int = None):
+        self.payload = payload
+        self.latency = latency
+        self._sample_latency = latency_sampler(latency)
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.error_factory = error_factory or (lambda: ServiceUnavailable("fake LLM overloaded"))
+        self.calls = 0
+        self.errors = 0
+        self.last_prompt = None
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, generation_config=None, **kwargs):
+        with self._lock:
+            self.calls += 1
+            self.last_prompt = prompt
+            fail = self._random.random() < self.error_rate
+            slow = self._random.random() < self.slow_rate
+            if fail:
+                self.errors += 1
+            latency = self.slow_latency if slow else self._sample_latency(self._random)
+            payload = self.payload(self._random) if callable(self.payload) else self.payload
+        if latency:
+            time.sleep(latency)
+        if fail:
+            raise self.error_factory()
+        return FakeResponse(json.dumps(payload, ensure_ascii=False))
+
+
+def install_fake_models(orchestrator, latency: float = 0.0, **faults) -> dict:
+    """
+    Replaces every agent model of an Orchestrator with a FakeGenerativeModel. Returns them by agent name.
+    `faults` (error_rate, slow_rate, slow_latency, seed) are passed to each fake.
+    """
+    fakes = {}
+    seed = faults.pop("seed", None)
+    for i, agent in enumerate((orchestrator.data_agent, orchestrator.brief_agent, orchestrator.risk_agent,
+                               orchestrator.opp_agent, orchestrator.after_agent)):
+        # Distinct seeds so the agents' faults are independent
+        fakes[agent.name] = FakeGenerativeModel(
+            CANNED_RESPONSES[agent.name], latency, seed=None if seed is None else seed + i, **faults
+        )
+        agent.model = fakes[agent.name]
+    return fakes
@@ -0,0 +1,79 @@
+"""
+In-process cache of parsed JSON fixtures (client files, product catalog, BCT knowledge base).
+Entries are revalidated against the file's mtime+size on every load; writers also invalidate explicitly.
+Client files are grouped per client and the number of cached clients is bounded (LRU).
+
+Loaded objects are shared between callers: treat them as read-only and use fresh=True for read-modify-write.
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+from config import Config
+
+SHARED_GROUP = "_shared"  # catalog, knowledge base: never evicted
+
+
+class FixtureCache:
+    def __init__(self, max_clients: int = Config.FIXTURE_CACHE_MAX_CLIENTS, enabled: bool = Config.FIXTURE_CACHE_ENABLED):
+        self.max_clients = max_clients
+        self.enabled = enabled
+        self._groups = OrderedDict()  # group -> {path: (mtime_ns, size, data)}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "revalidations": 0, "evictions": 0, "invalidations": 0}
+
+    def load_json(self, path: str, default=None, group: str = SHARED_GROUP, fresh: bool = False):
+        """Parsed content of `path`, or `default` if the file does not exist."""
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return default
+        if not self.enabled or fresh:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+
+        with self._lock:
+            entry = self._groups.get(group, {}).get(path)
+            if entry is not None and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+                self._groups.move_to_end(group)
+                self._stats["hits"] += 1
+                return entry[2]
+            self._stats["revalidations" if entry is not None else "misses"] += 1
+
+        # Parse outside the lock; concurrent loads of the same file are harmless
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        with self._lock:
+            self._groups.setdefault(group, {})[path] = (st.st_mtime_ns, st.st_size, data)
+            self._groups.move_to_end(group)
+            self._evict()
+        return data
+
+    def invalidate(self, path: str = None, group: str = None):
+        """Drops one file, one client's files, or everything when called without arguments."""
+        with self._lock:
+            self._stats["invalidations"] += 1
+            if path is not None:
+                for files in self._groups.values():
+                    files.pop(path, None)
+            elif group is not None:
+                self._groups.pop(group, None)
+            else:
+                self._groups.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["clients"] = sum(1 for g in self._groups if g != SHARED_GROUP)
+            stats["files"] = sum(len(files) for files in self._groups.values())
+        return stats
+
+    def _evict(self):
+        client_groups = [g for g in self._groups if g != SHARED_GROUP]
+        for group in client_groups[:max(0, len(client_groups) - self.max_clients)]:
+            del self._groups[group]
+            self._stats["evictions"] += 1
+
+
+fixture_cache = FixtureCache()
@@ -0,0 +1,351 @@
+"""
+Seeded synthetic portfolio generator.
+Writes N clients in the data/fake_clients/<client_id>/*.json layout (CRM profile, accounts, products,
+Centrale des Risques classes 0-4, document vault with expiry dates, interactions and case history),
+so caches, indexes and benchmarks can be exercised at 1k-50k clients.
+
+Each client is derived from (seed, client_id) only: the same command always produces the same files,
+and growing a portfolio from 1k to 10k clients leaves the first 1k unchanged.
+
+    python generate_portfolio.py --count 1000 --seed 42
+    python generate_portfolio.py --count 50000 --out /tmp/portfolio --interactions 20 --case-history 5
+    python generate_portfolio.py --count 1000 --db data/clients.sqlite   # also load the SQLite store
+"""
+import argparse
+import datetime
+import functools
+import json
+import logging
+import math
+import os
+import random
+import time
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_AS_OF = "2026-01-31"
+BANKS = ["ATB", "BIAT", "STB", "BNA", "BH", "Amen Bank", "UIB", "Attijari", "BT", "UBCI"]
+SECTORS = [
+    "Plastics Manufacturing", "Olive Oil Production", "Textile & Garments", "Automotive Components",
+    "Agri-food Processing", "Construction Materials", "IT Services", "Pharmaceutical Distribution",
+    "Tourism & Hospitality", "Logistics & Transport", "Electrical Equipment", "Wholesale Trade",
+]
+CITIES = [
+    "Zone Industrielle Sidi Abdelhamid, Sousse", "Zone Industrielle Charguia, Tunis", "Route de Gabès, Sfax",
+    "Zone Industrielle Bir El Kassaa, Ben Arous", "Avenue Habib Bourguiba, Monastir", "Zone Industrielle, Bizerte",
+    "Route de Tunis, Nabeul", "Zone Industrielle El Fejja, Manouba", "Centre Urbain Nord, Tunis", "Route de Sousse, Kairouan",
+]
+NAME_PREFIXES = ["SOTU", "STE", "TUNI", "MED", "CAR", "SFAX", "NORD", "SAHEL", "ATLAS", "CAP", "GEN", "DELTA"]
+NAME_SYLLABLES = ["", "MA", "RO", "TI", "KA", "NE", "LI", "VA", "DO", "SE", "BI", "CO", "TA", "MI", "RA", "FI",
+                  "NO", "ZI", "LU", "GA"]
+NAME_STEMS = ["PLAST", "TEX", "AGRO", "METAL", "PACK", "BAT", "INFO", "PHARM", "TRANS", "ELEC", "OLIVE", "NEGOCE"]
+NAME_SUFFIXES = ["", "INDUSTRIES", "DISTRIBUTION", "TRADING", "SERVICES", "INTERNATIONAL", "TUNISIE",
+                 "MEDITERRANEE", "EXPORT", "GROUP", "SUD", "NORD", "CENTRE"]
+FIRST_NAMES = ["Ahmed", "Leila", "Mohamed", "Sonia", "Karim", "Amel", "Hichem", "Nadia", "Sami", "Ines", "Walid", "Rim"]
+LAST_NAMES = ["Tounsi", "Ben Ali", "Trabelsi", "Jaziri", "Gharbi", "Mejri", "Bouazizi", "Chaabane", "Khelifi", "Hamdi"]
+RM_NAMES = ["Sami Ben Ali", "Olfa Mansouri", "Youssef Karoui", "Meriem Saidi", "Anis Ferchichi"]
+SEGMENTS = [("SME (PME)", "SARL", 0.75), ("Corporate", "SA", 0.15), ("Professional", "SUARL", 0.10)]
+KYC_STATUSES = [("Valid", 0.7), ("Review Required", 0.25), ("Blocked", 0.05)]
+
+# Centrale des Risques class distribution (0 = sound ... 4 = compromised)
+RISK_CLASSES = [(0, 0.70), (1, 0.15), (2, 0.08), (3, 0.04), (4, 0.03)]
+BCT_NOTES = {
+    0: "Situation saine. Aucun incident de paiement signalé ces 12 derniers mois.",
+    1: "Engagements nécessitant un suivi particulier. Retards ponctuels inférieurs à 90 jours.",
+    2: "Actifs incertains: retards de paiement entre 90 et 180 jours.",
+    3: "Actifs préoccupants: retards de paiement entre 180 et 360 jours.",
+    4: "Actifs compromis: impayés supérieurs à 360 jours, procédure contentieuse engagée.",
+}
+
+KYC_DOCS = [("Statuts", False), ("CIN Gérant", True), ("Registre de Commerce", True), ("Attestation de Dépôt", True)]
+INTERACTION_TEMPLATES = [
+    ("Call", "Client called about overdraft limit. Mentioned cash flow tension due to delayed payment from main customer.",
+     "Promised to review profile."),
+    ("Branch Visit", "Deposited check. Asked about letter of credit fees.", "Provided fee schedule."),
+    ("Email", "Client requested an updated statement of account for their auditor.", "Statement sent."),
+    ("Call", "Client asked about financing for a new production line.", "Scheduled a visit to discuss an equipment loan."),
+    ("Visite", "Visit at the client's premises. Activity stable, new export contract under negotiation.",
+     "Requested the latest financial statements."),
+    ("Email", "Client complained about a delayed transfer to a foreign supplier.", "Escalated to international operations."),
+    ("Call", "Client mentioned a competitor offer on leasing rates.", "Agreed to prepare a counter-proposal."),
+]
+CASE_TOPICS = [
+    ("le renouvellement de la facilité de caisse", "Fournir les états financiers 2025."),
+    ("le financement d'une nouvelle machine de production", "Transmettre la facture proforma."),
+    ("l'ouverture d'une ligne de préfinancement export", "Domicilier les recettes export auprès de la banque."),
+    ("la régularisation des documents KYC", "Mettre à jour le Registre de Commerce."),
+    ("la restructuration des échéances du crédit de gestion", "Fournir un plan de trésorerie sur 12 mois."),
+]
+PRODUCTS = [
+    ("prod_overdraft_renewal", "Facilité de Caisse"),
+    ("prod_working_capital_loan", "Crédit de Gestion"),
+    ("prod_leasing_equipment", "Crédit Bail - Equipement"),
+    ("prod_export_prefinance", "Préfinancement Export"),
+]
+
+
+def _weighted(rng: random.Random, choices: list):
+    """Picks the first element of a (value, ..., weight) tuple list."""
+    return rng.choices(choices, weights=[c[-1] for c in choices])[0]
+
+
+def _date(as_of: datetime.date, days_back: int) -> str:
+    return (as_of - datetime.timedelta(days=days_back)).isoformat()
+
+
+def _person(rng: random.Random) -> str:
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+@functools.lru_cache(maxsize=None)
+def _stride(seed: int, size: int) -> int:
+    stride = random.Random(f"{seed}:{size}").randrange(size // 3, size // 2)
+    while math.gcd(stride, size) != 1:
+        stride += 1
+    return stride
+
+
+def _unique(index: int, seed: int, size: int, first: int = 0) -> int:
+    """Value in range(size), distinct for every index in 1..size; index 1 (the hand-written fixture) gets `first`."""
+    return (first + (index - 1) * _stride(seed, size)) % size
+
+
+def _company_name(index: int, seed: int, legal_form: str) -> str:
+    """
+    E.g. "SOTUMAPLAST EXPORT SARL": 37,440 distinct names before the legal form, then a numbered series
+    ("SOTUMAPLAST EXPORT 2 SARL"), so no two clients share a name. Index 1 is "SOTUPLAST", like the fixture.
+    """
+    parts = [NAME_PREFIXES, NAME_SYLLABLES, NAME_STEMS, NAME_SUFFIXES]
+    size = math.prod(len(choices) for choices in parts)
+    position, series = _unique(index, seed, size), (index - 1) // size
+    picks = []
+    for choices in reversed(parts):
+        position, pick = divmod(position, len(choices))
+        picks.append(choices[pick])
+    suffix, stem, syllable, prefix = picks
+    return " ".join(filter(None, [f"{prefix}{syllable}{stem}", suffix, str(series + 1) if series else "", legal_form]))
+
+
+def client_id_for(index: int) -> str:
+    return f"ATB-SME-{index:03d}"
+
+
+def client_index(client_id: str) -> int:
+    return int(client_id.rsplit("-", 1)[-1])
+
+
+def _crm_profile(rng, client_id, as_of, tax_number, seed) -> dict:
+    segment, legal_form, _ = _weighted(rng, SEGMENTS)
+    manager, partner = _person(rng), _person(rng)
+    share = rng.choice([51, 60, 70, 80, 100])
+    stakeholders = [{"name": manager, "role": "Gérant", "ownership": f"{share}%"}]
+    if share < 100:
+        stakeholders.append({"name": partner, "role": "Associé", "ownership": f"{100 - share}%"})
+    return {
+        "client_id": client_id,
+        "name": _company_name(client_index(client_id), seed, legal_form),
+        "legal_form": legal_form,
+        "founding_date": _date(as_of, rng.randint(365, 365 * 30)),
+        "activity_sector": rng.choice(SECTORS),
+        "segment": segment,
+        "rm_name": rng.choice(RM_NAMES),
+        "address": rng.choice(CITIES),
+        "tax_id": f"{tax_number}M/A/M/000",
+        "kyc_status": _weighted(rng, KYC_STATUSES)[0],
+        "stakeholders": stakeholders,
+    }
+
+
+def _account_summary(rng, client_id, as_of, account_base) -> dict:
+    checking = round(rng.uniform(-120000, 80000), 2)
+    savings = round(rng.uniform(0, 50000), 2)
+    inflow = round(rng.uniform(5000, 250000), 2)
+    return {
+        "client_id": client_id,
+        "data_date": as_of.isoformat(),
+        "accounts": [
+            {"account_number": f"{account_base}-001", "type": "Checking (Compte Courant)",
+             "balance": checking, "currency": "TND", "status": "Active"},
+            {"account_number": f"{account_base}-002", "type": "Savings (Compte Épargne)",
+             "balance": savings, "currency": "TND", "status": "Active"},
+        ],
+        "aggregated_metrics": {
+            "total_inflow_mtd": inflow,
+            "total_outflow_mtd": round(inflow * rng.uniform(0.6, 1.5), 2),
+            "avg_balance_3m": round(checking * rng.uniform(0.5, 1.2), 2),
+            "unpaid_checks_count": rng.choice([0] * 8 + [1, 2]),
+        },
+    }
+
+
+def _products_owned(rng, as_of) -> list:
+    products = []
+    for product_id, name in rng.sample(PRODUCTS, rng.randint(1, 3)):
+        start = as_of - datetime.timedelta(days=rng.randint(30, 365 * 3))
+        amount = float(rng.randrange(10000, 500000, 1000))
+        if product_id == "prod_overdraft_renewal":
+            products.append({
+                "product_id": product_id, "name": name, "status": "Active",
+                "amount_authorized": amount, "amount_utilized": round(amount * rng.uniform(0, 1.1), 2),
+                "start_date": start.isoformat(), "end_date": (start + datetime.timedelta(days=365)).isoformat(),
+                "next_review_date": (start + datetime.timedelta(days=380)).isoformat(),
+            })
+        else:
+            products.append({
+                "product_id": product_id, "name": name, "status": "Active",
+                "original_amount": amount, "outstanding_balance": round(amount * rng.uniform(0.1, 0.9), 2),
+                "maturity_date": (start + datetime.timedelta(days=365 * rng.randint(2, 7))).isoformat(),
+            })
+    return products
+
+
+def _centrale_des_risques(rng, as_of, tax_number) -> dict:
+    worst_class = _weighted(rng, RISK_CLASSES)[0]
+    commitments = []
+    for bank in ["ATB"] + rng.sample(BANKS[1:], rng.randint(0, 3)):
+        commitments.append({
+            "bank_code": bank,
+            "short_term": float(rng.randrange(0, 200000, 1000)),
+            "medium_term": float(rng.randrange(0, 600000, 1000)),
+            "class": rng.randint(0, worst_class),
+        })
+    commitments[rng.randrange(len(commitments))]["class"] = worst_class
+    total = sum(c["short_term"] + c["medium_term"] for c in commitments)
+    return {
+        "client_tax_id": f"{tax_number}M",
+        "data_date": _date(as_of, 1),
+        "total_commitment_market": total,
+        "worst_class": worst_class,
+        "unpaid_amount": round(total * rng.uniform(0.02, 0.3), 3) if worst_class >= 2 else 0.0,
+        "commitments_by_bank": commitments,
+        "bct_notes": BCT_NOTES[worst_class],
+    }
+
+
+def _document_vault(rng, as_of) -> dict:
+    kyc_docs = []
+    for name, expires in KYC_DOCS:
+        status = rng.choices(["Valid", "Expired", "Missing"], weights=[0.8, 0.12, 0.08])[0]
+        expiry = None
+        if expires and status != "Missing":
+            days = rng.randint(1, 900)
+            expiry = _date(as_of, days) if status == "Expired" else (as_of + datetime.timedelta(days=days)).isoformat()
+        kyc_docs.append({"doc_name": name, "status": status, "expiry": expiry})
+    year = as_of.year
+    financial_docs = [
+        {"doc_name": f"États Financiers {year - 2}", "status": "Valid"},
+        {"doc_name": f"États Financiers {year - 1}", "status": rng.choice(["Valid", "Missing", "Missing"])},
+    ]
+    return {"kyc_docs": kyc_docs, "financial_docs": financial_docs}
+
+
+def _interactions(rng, as_of, count: int) -> list:
+    """Newest first, like the legacy interactions_log.json."""
+    days_back = sorted(rng.sample(range(1, max(count * 15, 30)), count))
+    entries = []
+    for days in days_back:
+        kind, summary, outcome = rng.choice(INTERACTION_TEMPLATES)
+        entries.append({"date": _date(as_of, days), "type": kind, "summary": summary, "outcome": outcome})
+    return entries
+
+
+def _client_case(rng, client_id, as_of, contact: str, count: int) -> dict:
+    history, tasks = [], []
+    for days in sorted(rng.sample(range(1, max(count * 45, 60)), count), reverse=True):
+        topic, action = rng.choice(CASE_TOPICS)
+        date = _date(as_of, days)
+        history.append({
+            "date": date,
+            "type": rng.choice(["Visite", "Appel", "Réunion agence"]),
+            "minutes": (f"Compte-rendu de visite - Client {client_id}\nDate de la visite: {date}\n"
+                        f"Client: M. {contact}\nObjet: {topic[0].upper()}{topic[1:]}.\n\nActions à mener:\n- {action}"),
+            "draft_email": {
+                "subject": f"Compte-rendu de notre rencontre - {client_id}",
+                "body": f"Cher Monsieur {contact.split()[-1]},\n\nSuite à notre échange du {date} concernant {topic}, "
+                        f"nous vous remercions de bien vouloir: {action}\n\nCordialement,",
+            },
+        })
+        tasks.append({
+            "id": f"task_{rng.randint(1000, 9999)}",
+            "description": f"{action[:-1]} ({client_id}).",
+            "status": rng.choice(["pending", "pending", "done"]),
+            "due_date": (as_of + datetime.timedelta(days=rng.randint(-10, 30))).isoformat(),
+            "priority": rng.choice(["high", "medium", "low"]),
+        })
+    return {"client_id": client_id, "case_history": history, "current_tasks": tasks, "pending_reminders": []}
+
+
+def generate_client(client_id: str, seed: int = 42, as_of: str = DEFAULT_AS_OF,
+                    interactions: int = 2, case_history: int = 1) -> dict:
+    """
+    Fixture files of one client ({file name: content}), derived from (seed, client_id) only.
+    Name, tax number and account numbers are unique per client index (up to 900k clients).
+    """
+    rng = random.Random(f"{seed}:{client_id}")
+    as_of_date = datetime.date.fromisoformat(as_of)
+    index = client_index(client_id)
+    tax_number = 1000000 + _unique(index, seed, 9000000, first=234567)
+    account_base = f"001-{100000 + _unique(index, seed, 900000, first=23456)}"
+    crm = _crm_profile(rng, client_id, as_of_date, tax_number, seed)
+    return {
+        "crm_profile": crm,
+        "account_summary": _account_summary(rng, client_id, as_of_date, account_base),
+        "products_owned": _products_owned(rng, as_of_date),
+        "centrale_des_risques": _centrale_des_risques(rng, as_of_date, tax_number),
+        "document_vault_index": _document_vault(rng, as_of_date),
+        "interactions_log": _interactions(rng, as_of_date, interactions),
+        "client_case": _client_case(rng, client_id, as_of_date, crm["stakeholders"][0]["name"], case_history),
+    }
+
+
+def generate_portfolio(count: int, out_dir: str = Config.FAKE_DATA_PATH, seed: int = 42, start: int = 2,
+                       as_of: str = DEFAULT_AS_OF, interactions: int = 2, case_history: int = 1,
+                       overwrite: bool = False) -> list:
+    """Writes `count` clients (ATB-SME-<start>...) under out_dir. Existing clients are kept unless overwrite."""
+    written = []
+    for index in range(start, start + count):
+        client_id = client_id_for(index)
+        client_dir = os.path.join(out_dir, client_id)
+        if os.path.isdir(client_dir) and not overwrite:
+            continue
+        os.makedirs(client_dir, exist_ok=True)
+        for name, content in generate_client(client_id, seed, as_of, interactions, case_history).items():
+            with open(os.path.join(client_dir, f"{name}.json"), "w", encoding="utf-8") as f:
+                json.dump(content, f, indent=4, ensure_ascii=False)
+        written.append(client_id)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic client portfolio")
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--start", type=int, default=2, help="first client index (ATB-SME-001 is the hand-written fixture)")
+    parser.add_argument("--out", default=Config.FAKE_DATA_PATH)
+    parser.add_argument("--as-of", default=DEFAULT_AS_OF, help="reference date for balances, expiries and history")
+    parser.add_argument("--interactions", type=int, default=2, help="interactions per client")
+    parser.add_argument("--case-history", type=int, default=1, help="case history entries per client")
+    parser.add_argument("--overwrite", action="store_true")
+    parser.add_argument("--db", help="also import the written clients into this SQLite store")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    started = time.perf_counter()
+    written = generate_portfolio(args.count, args.out, args.seed, args.start, args.as_of,
+                                 args.interactions, args.case_history, args.overwrite)
+    print(f"Wrote {len(written)} clients to {args.out} in {time.perf_counter() - started:.1f}s "
+          f"({args.count - len(written)} already present).")
+
+    if args.db:
+        from repository import JsonClientRepository, SqliteClientRepository
+        source, target = JsonClientRepository(args.out), SqliteClientRepository(args.db)
+        for client_id in written:
+            data = source.get_client_data(client_id)
+            data["interactions_log"] = source.get_interactions(client_id)
+            target.import_client(client_id, data, [])
+        print(f"Imported {len(written)} clients into {args.db}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Idempotency cache for A2A messages (a2a_server.py).
+
+A peer retrying a message_id gets the stored response instead of a second agent (LLM) run.
+A duplicate arriving while the first execution is still running waits for it and shares its outcome.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Callable, Optional
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class IdempotencyConflict(ValueError):
+    """The key was already used for a different request."""
+
+
+class IdempotencyTimeout(TimeoutError):
+    """The first execution of the key did not finish within wait_timeout."""
+
+
+def fingerprint(*parts) -> str:
+    """Stable digest of the JSON-serializable request parts a key is bound to."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class IdempotencyCache:
+    """In-memory LRU of completed results with a TTL, plus one Future per key being executed."""
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 3600, wait_timeout: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.wait_timeout = wait_timeout
+        self._done = OrderedDict()  # key -> (stored_at, fingerprint, result)
+        self._running = {}  # key -> (fingerprint, Future)
+        self._lock = threading.Lock()
+        self._stats = {"executions": 0, "replays": 0, "joined": 0, "conflicts": 0, "evictions": 0}
+
+    def run(self, key: str, request_fingerprint: str, fn: Callable, store: Callable = None) -> tuple:
+        """
+        Returns (result, replayed). Runs `fn()` once per key; `store(result)` decides whether the result
+        is kept for later duplicates (e.g. not transient errors, which the peer may retry for real).
+        """
+        with self._lock:
+            entry = self._done.get(key)
+            if entry is not None and self.ttl_seconds and time.time() - entry[0] > self.ttl_seconds:
+                del self._done[key]
+                entry = None
+            if entry is not None:
+                self._check(key, entry[1], request_fingerprint)
+                self._done.move_to_end(key)
+                self._stats["replays"] += 1
+                return entry[2], True
+
+            running = self._running.get(key)
+            if running is None:
+                future = Future()
+                self._running[key] = (request_fingerprint, future)
+                self._stats["executions"] += 1
+            else:
+                self._check(key, running[0], request_fingerprint)
+                self._stats["joined"] += 1
+
+        if running is not None:
+            try:
+                return running[1].result(self.wait_timeout), True
+            except FutureTimeoutError:
+                raise IdempotencyTimeout(f"{key} is still being processed") from None
+
+        try:
+            result = fn()
+        except BaseException as e:
+            with self._lock:
+                del self._running[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._running[key]
+            if store is None or store(result):
+                self._done[key] = (time.time(), request_fingerprint, result)
+                while len(self._done) > self.max_entries:
+                    self._done.popitem(last=False)
+                    self._stats["evictions"] += 1
+        future.set_result(result)
+        return result, False
+
+    def _check(self, key: str, expected: str, request_fingerprint: str):
+        if expected != request_fingerprint:
+            self._stats["conflicts"] += 1
+            raise IdempotencyConflict(f"{key} was already used for a different request")
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._done)
+            stats["in_flight"] = len(self._running)
+        return stats
+
+
+_a2a_cache = None
+_a2a_cache_lock = threading.Lock()
+
+
+def get_a2a_idempotency_cache() -> IdempotencyCache:
+    """Process-wide cache used by a2a_server (max entries, TTL and wait from Config)."""
+    global _a2a_cache
+    if _a2a_cache is None:
+        with _a2a_cache_lock:
+            if _a2a_cache is None:
+                _a2a_cache = IdempotencyCache(
+                    max_entries=Config.A2A_IDEMPOTENCY_MAX_ENTRIES,
+                    ttl_seconds=Config.A2A_IDEMPOTENCY_TTL_SECONDS,
+                    wait_timeout=Config.A2A_IDEMPOTENCY_WAIT_SECONDS or None
+                )
+    return _a2a_cache
+
+
+def set_a2a_idempotency_cache(cache: Optional[IdempotencyCache]):
+    """Plugs in another cache (anything with run/stats). None resets to the default."""
+    global _a2a_cache
+    with _a2a_cache_lock:
+        _a2a_cache = cache
@@ -0,0 +1,288 @@
+"""
+Deterministic fast path for ConversationAgent.
+A keyword/regex grammar (French and English) detects the four /chat actions and parses dates;
+client names are resolved by client_directory.py. When exactly one action matches and every slot it
+needs is filled, the result is returned in the same shape as the LLM's JSON answer; anything else
+falls back to the LLM.
+
+Measure coverage and accuracy on the labeled corpus with:
+    python benchmark.py intents
+"""
+import datetime
+import logging
+import re
+from typing import Optional
+from client_directory import fold, get_client_directory
+
+logger = logging.getLogger(__name__)
+
+INTENT_PATTERNS = {
+    "generate_prep_pack": [
+        r"\bprep[- ]?packs?\b", r"\bbriefing\b", r"\bbrief\b", r"\bfiche client\b",
+        r"\bdossier de (?:preparation|visite)\b",
+        r"\bprepar\w*(?:[- ]moi| me)? (?:le |la |mon |ma |un |une |the |a |my )?(?:rdv|rendez-vous|reunion|visite|meeting|visit)\b",
+    ],
+    "create_reminder": [
+        r"\b(?:(?:cree|creer|ajoute|mets?) (?:un )?)?rappels?\b", r"\brappelle[- ]moi\b", r"\bn'oublie pas\b",
+        r"\b(?:(?:set|create|add) (?:a |an )?)?remind(?:er|ers)?(?: me)?\b",
+        r"\bdon'?t let me forget\b",
+    ],
+    "log_update": [
+        r"\bnote(?:r|z)? que\b", r"\bnote that\b", r"\bjournalis\w*\b", r"\blog(?:ger)?\b",
+        r"\bmise a jour\b", r"\bmet(?:s|tre) a jour\b", r"\bupdate\b", r"\bajoute(?:r|z)? (?:une )?(?:note|interaction)\b",
+        r"\badd (?:a |an )?(?:note|interaction|update)\b",
+    ],
+    "submit_notes": [
+        r"\bcompte[- ]rendu\b", r"\bcr (?:de|du) (?:la |notre |mon )?(?:visite|reunion|rdv|rendez-vous)\b",
+        r"\bnotes? (?:de|du) (?:la |notre |mon )?(?:visite|reunion|rdv|rendez-vous)\b",
+        r"\bmeeting notes\b", r"\bvisit notes\b", r"\bminutes\b", r"\bsubmit (?:the |my )?notes\b",
+    ],
+}
+REQUIRED_SLOTS = {
+    "generate_prep_pack": ["client_id"],
+    "create_reminder": ["client_id", "reminder_text", "due_date"],
+    "log_update": ["client_id", "message"],
+    "submit_notes": ["client_id", "meeting_date", "notes"],
+}
+# Slots filled from the free text left once the command words, client, date and priority are removed
+TEXT_SLOTS = {"create_reminder": "reminder_text", "log_update": "message", "submit_notes": "notes"}
+MIN_TEXT_WORDS = 1
+# Negations, cancellations and questions: the command words are there but the user is not asking for the
+# action ("Annule le rappel...", "Ne crée pas de rappel...", "Did I already set a reminder...?"). Left to the LLM.
+FALLBACK_PATTERNS = [
+    r"\bn(?:e |['’])(?!oubliez? pas\b)[^.;!?]*\b(?:pas|plus|jamais)\b", r"\bpas (?:besoin|la peine)\b",
+    r"\b(?:do|does|did)(?:n['’]?t| not)\b(?! let me forget)", r"\b(?:never|no need)\b",
+    r"\b(?:annul|supprim|effac|cancel|delet|remov)\w*", r"\best-ce qu", r"\?\s*$",
+]
+
+PRIORITY_PATTERNS = [
+    ("high", r"\b(?:(?:en )?priorite |priority )?(?:urgente?s?|haute|high|importante?|prioritaire|asap)(?: priority| priorite)?\b"),
+    ("low", r"\b(?:(?:en )?priorite |priority )?(?:faible|basse|low)(?: priority| priorite)?\b"),
+    ("medium", r"\b(?:(?:en )?priorite |priority )?(?:moyenne|medium|normale?)(?: priority| priorite)?\b"),
+]
+UPDATE_TYPES = [("Call", r"\b(?:appel\w*|call\w*|telephon\w*|phone\w*)\b"),
+                ("Email", r"\b(?:e-?mail\w*|courriel)\b"),
+                ("Visit", r"\b(?:visite|visit\w*|passage en agence)\b")]
+MEETING_TYPES = [("Appel", r"\b(?:appel|call)\b"), ("Réunion agence", r"\b(?:agence|branch)\b")]
+# Left over between the removed parts of the message: dropped from the ends of the free text
+CONNECTORS = {"de", "d'", "du", "des", "pour", "que", "qu'", "a", "au", "avec", "sur", "concernant", "le", "la", "les",
+              "l'", "to", "for", "about", "regarding", "that", "the", "on", "with", "of", "me", "moi", "client", "et",
+              "and", "par", "by", "in", "dans", "chez", "-", ":", ",", "."}
+
+MONTHS = {
+    "janvier": 1, "january": 1, "jan": 1, "fevrier": 2, "february": 2, "fev": 2, "feb": 2, "mars": 3, "march": 3,
+    "mar": 3, "avril": 4, "april": 4, "avr": 4, "apr": 4, "mai": 5, "may": 5, "juin": 6, "june": 6, "jun": 6,
+    "juillet": 7, "july": 7, "juil": 7, "jul": 7, "aout": 8, "august": 8, "aug": 8, "septembre": 9,
+    "september": 9, "sept": 9, "sep": 9, "octobre": 10, "october": 10, "oct": 10, "novembre": 11,
+    "november": 11, "nov": 11, "decembre": 12, "december": 12, "dec": 12,
+}
+WEEKDAYS = {
+    "lundi": 0, "monday": 0, "mardi": 1, "tuesday": 1, "mercredi": 2, "wednesday": 2, "jeudi": 3, "thursday": 3,
+    "vendredi": 4, "friday": 4, "samedi": 5, "saturday": 5, "dimanche": 6, "sunday": 6,
+}
+RELATIVE_DAYS = {
+    "apres-demain": 2, "apres demain": 2, "day after tomorrow": 2, "aujourd'hui": 0, "today": 0,
+    "demain": 1, "tomorrow": 1, "avant-hier": -2, "avant hier": -2, "hier": -1, "yesterday": -1,
+}
+NUMBER_WORDS = {"un": 1, "une": 1, "a": 1, "an": 1, "one": 1, "deux": 2, "two": 2, "trois": 3, "three": 3}
+_MONTH_RE = "|".join(sorted(MONTHS, key=len, reverse=True))
+_WEEKDAY_RE = "|".join(WEEKDAYS)
+_NUMBER_RE = r"\d+|" + "|".join(NUMBER_WORDS)
+_UNIT_RE = r"jours?|days?|semaines?|weeks?|mois|months?"
+
+
+def _add_months(day: datetime.date, months: int) -> datetime.date:
+    month = day.month - 1 + months
+    year, month = day.year + month // 12, month % 12 + 1
+    next_month = datetime.date(year + month // 12, month % 12 + 1, 1)
+    return day.replace(year=year, month=month, day=min(day.day, (next_month - datetime.timedelta(days=1)).day))
+
+
+def _shift(today: datetime.date, amount: int, unit: str) -> datetime.date:
+    if unit.startswith(("mois", "month")):
+        return _add_months(today, amount)
+    return today + datetime.timedelta(days=amount * (7 if unit.startswith(("semaine", "week")) else 1))
+
+
+def _number(token: str) -> int:
+    return int(token) if token.isdigit() else NUMBER_WORDS[token]
+
+
+def _safe_date(year: int, month: int, day: int) -> Optional[datetime.date]:
+    try:
+        return datetime.date(year, month, day)
+    except ValueError:
+        return None
+
+
+def _date_rules(today: datetime.date) -> list:
+    """(pattern, match -> date or None) pairs, most specific first."""
+    def year_of(match, group):
+        value = match.group(group)
+        if not value:
+            return today.year
+        return int(value) + (2000 if len(value) == 2 else 0)
+
+    def next_weekday(match):
+        delta = (WEEKDAYS[match.group(1)] - today.weekday()) % 7 or 7
+        return today + datetime.timedelta(days=delta)
+
+    def last_weekday(match):
+        delta = (today.weekday() - WEEKDAYS[match.group(1) or match.group(2)]) % 7 or 7
+        return today - datetime.timedelta(days=delta)
+
+    def end_of_month(match):
+        return _add_months(today.replace(day=1), 1) - datetime.timedelta(days=1)
+
+    def month_only(match):
+        month = MONTHS[match.group(1)]
+        year = int(match.group(2)) if match.group(2) else today.year + (month < today.month)
+        return datetime.date(year, month, 1)
+
+    return [
+        (r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b", lambda m: _safe_date(int(m.group(1)), int(m.group(2)), int(m.group(3)))),
+        (r"\b(\d{1,2})(?:/(\d{1,2})(?:/(\d{4}|\d{2}))?|\.(\d{1,2})\.(\d{4}|\d{2}))\b",
+         lambda m: _safe_date(year_of(m, 3 if m.group(2) else 5), int(m.group(2) or m.group(4)), int(m.group(1)))),
+        (rf"\b(\d{{1,2}})(?:er)? ({_MONTH_RE})\.?(?: (\d{{4}}))?\b",
+         lambda m: _safe_date(year_of(m, 3), MONTHS[m.group(2)], int(m.group(1)))),
+        (rf"\b({_MONTH_RE})\.? (\d{{1,2}})(?:st|nd|rd|th)?(?:,? (\d{{4}}))?\b",
+         lambda m: _safe_date(year_of(m, 3), MONTHS[m.group(1)], int(m.group(2)))),
+        (r"\b(?:(?:a la |la )?fin (?:du |de ce )?mois|(?:by |at )?(?:the )?end of (?:the |this )?month)\b", end_of_month),
+        (rf"\b(?:en|in|d'ici|by|pour|for) ({_MONTH_RE})(?: (\d{{4}}))?\b", month_only),
+        (rf"\b(?:dans|in) ({_NUMBER_RE}) ({_UNIT_RE})\b",
+         lambda m: _shift(today, _number(m.group(1)), m.group(2))),
+        (rf"\b(?:il y a ({_NUMBER_RE}) ({_UNIT_RE})|({_NUMBER_RE}) ({_UNIT_RE}) ago)\b",
+         lambda m: _shift(today, -_number(m.group(1) or m.group(3)), m.group(2) or m.group(4))),
+        (r"\b(?:la semaine prochaine|next week)\b", lambda m: today + datetime.timedelta(days=7)),
+        (r"\b(?:le mois prochain|next month)\b", lambda m: _add_months(today, 1)),
+        (rf"\b(?:(?:le |ce )?({_WEEKDAY_RE}) dernier|last ({_WEEKDAY_RE}))\b", last_weekday),
+        (rf"\b(?:next|on) ({_WEEKDAY_RE})\b", next_weekday),
+        (rf"\b(?:(?:le |ce )?({_WEEKDAY_RE})(?: prochain)?)\b", next_weekday),
+        ("|".join(rf"\b{re.escape(k)}\b" for k in RELATIVE_DAYS),
+         lambda m: today + datetime.timedelta(days=RELATIVE_DAYS[m.group(0)])),
+    ]
+
+
+def parse_date(text: str, today: datetime.date = None) -> Optional[tuple]:
+    """First date expression in `text` as (ISO date, (start, end)), or None."""
+    folded = fold(text)
+    for pattern, to_date in _date_rules(today or datetime.date.today()):
+        for match in re.finditer(pattern, folded):
+            day = to_date(match)
+            if day is not None:
+                return day.isoformat(), match.span()
+    return None
+
+
+def _remove_spans(text: str, spans: list) -> str:
+    for start, end in sorted(spans, reverse=True):
+        text = text[:start] + " " + text[end:]
+    return text
+
+
+def _free_text(text: str, spans: list) -> str:
+    words = _remove_spans(text, spans).split()
+    while words and fold(words[0]).strip(",.:;!?") in CONNECTORS | {""}:
+        words.pop(0)
+    while words and fold(words[-1]).strip(",.:;!?") in CONNECTORS | {""}:
+        words.pop()
+    # Elided articles glued to the next word ("d'appeler" -> "appeler")
+    if words and re.match(r"^(?:d|l|qu)'", fold(words[0])):
+        words[0] = words[0].split("'", 1)[1]
+    return " ".join(words).strip(" ,.:;")
+
+
+def _first_label(folded: str, rules: list, default: str) -> str:
+    return next((label for label, pattern in rules if re.search(pattern, folded)), default)
+
+
+def _response(intent: str, params: dict) -> str:
+    client = f"{get_client_directory().display_name(params['client_id'])} ({params['client_id']})"
+    if intent == "generate_prep_pack":
+        return f"Generating the prep pack for {client}."
+    if intent == "create_reminder":
+        return f"Reminder set for {client} on {params['due_date']}: {params['reminder_text']}."
+    if intent == "log_update":
+        return f"Update logged for {client}."
+    return f"Submitting the {params.get('meeting_type', 'Visite')} notes of {params['meeting_date']} for {client}."
+
+
+def classify(message: str, state: dict = None, today: datetime.date = None) -> Optional[dict]:
+    """
+    LLM-shaped result ({"intent", "extracted_params", "missing_slots", "response", "reasoning"})
+    when the rules are confident, None to fall back to the LLM.
+    """
+    state = state or {}
+    folded = fold(message)
+    if any(re.search(pattern, folded) for pattern in FALLBACK_PATTERNS):
+        return None
+    spans, intents = [], set()
+    for intent, patterns in INTENT_PATTERNS.items():
+        for pattern in patterns:
+            for match in re.finditer(pattern, folded):
+                intents.add(intent)
+                spans.append(match.span())
+
+    params, awaited = {}, None
+    if len(intents) == 1:
+        intent = intents.pop()
+    elif not intents and state.get("intent") in REQUIRED_SLOTS:
+        # Follow-up turn answering the slots the previous turn asked for. A state with nothing missing
+        # is left over from a failed action: "ok merci" must not run it again.
+        intent = state["intent"]
+        params.update(state.get("collected_params") or {})
+        awaited = [name for name in REQUIRED_SLOTS[intent] if not params.get(name)]
+        if not awaited:
+            return None
+    else:
+        return None
+
+    body, full_text = message, folded
+    if intent in TEXT_SLOTS and ":" in message:
+        # "Compte-rendu SOTUPLAST du 12/02: ..." -> the slots come from the head, the text from the body
+        head_end = message.index(":")
+        body = message[head_end + 1:]
+        message, folded = message[:head_end], folded[:head_end]
+
+    client = get_client_directory().resolve(message)
+    if client:
+        params["client_id"] = client[0]
+        spans.append(client[1])
+
+    # log_update has no date slot: "a appelé hier" stays in the logged message
+    date = parse_date(message, today) if intent != "log_update" else None
+    if date:
+        params["meeting_date" if intent == "submit_notes" else "due_date"] = date[0]
+        spans.append(date[1])
+    if intent == "create_reminder":
+        for label, pattern in PRIORITY_PATTERNS:
+            match = re.search(pattern, folded)
+            if match:
+                params["priority"] = label
+                spans.append(match.span())
+                break
+        params.setdefault("priority", "medium")
+    elif intent == "log_update":
+        params.setdefault("update_type", _first_label(full_text, UPDATE_TYPES, "AI Note"))
+    elif intent == "submit_notes":
+        params.setdefault("meeting_type", _first_label(folded, MEETING_TYPES, "Visite"))
+
+    slot = TEXT_SLOTS.get(intent)
+    if slot and slot not in params:
+        text = _free_text(message, spans) if body is message else body.strip()
+        if len(text.split()) >= MIN_TEXT_WORDS:
+            if intent == "submit_notes":
+                params[slot] = [note.strip(" -•") for note in re.split(r"[;\n]|\s-\s", text) if note.strip(" -•")]
+            else:
+                params[slot] = text[0].upper() + text[1:]
+
+    missing = [name for name in REQUIRED_SLOTS[intent] if not params.get(name)]
+    if missing or (awaited is not None and not any(params.get(name) for name in awaited)):
+        return None
+    return {
+        "intent": intent,
+        "extracted_params": params,
+        "missing_slots": [],
+        "response": _response(intent, params),
+        "reasoning": "Matched by the rule-based intent fast path.",
+    }
@@ -0,0 +1,114 @@
+"""
+Append-only interaction journal (one JSON object per line, oldest first).
+Appends are a single O_APPEND write, and the most recent entries are read backwards from the end of
+the file, so neither depends on the size of the client's history.
+
+Fold a journal back into the legacy interactions_log.json format with:
+    python interaction_journal.py export --client-id ATB-SME-001 [--out path.json]
+"""
+import argparse
+import json
+import os
+import threading
+from config import Config
+
+_append_lock = threading.Lock()
+BLOCK_SIZE = 64 * 1024
+
+
+class InteractionJournal:
+    """interactions_log.jsonl next to the legacy interactions_log.json."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def append(self, entry: dict):
+        """Atomically appends one entry (a single write of a complete line)."""
+        line = (json.dumps(entry, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with _append_lock:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+
+    def iter_recent(self, limit: int = None):
+        """Yields entries newest first, reading the file backwards block by block."""
+        if not self.exists() or limit == 0:
+            return
+        count = 0
+        with open(self.path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            tail = b""
+            while position > 0:
+                read_size = min(BLOCK_SIZE, position)
+                position -= read_size
+                f.seek(position)
+                lines = (f.read(read_size) + tail).split(b"\n")
+                # The first piece may be a partial line: keep it for the next block
+                tail = lines.pop(0)
+                for line in reversed(lines):
+                    if line.strip():
+                        yield json.loads(line)
+                        count += 1
+                        if limit and count >= limit:
+                            return
+            if tail.strip():
+                yield json.loads(tail)
+
+    def read_all(self) -> list:
+        """Entries newest first (same order as the legacy JSON log)."""
+        return list(self.iter_recent())
+
+
+def export_interactions(client_dir: str, out_path: str = None) -> int:
+    """
+    Writes journal + legacy entries as one newest-first JSON list (the historical format).
+    Without out_path the journal is folded into interactions_log.json and removed.
+    Returns the number of entries written.
+    """
+    legacy_path = os.path.join(client_dir, "interactions_log.json")
+    journal_path = os.path.join(client_dir, "interactions_log.jsonl")
+    compact = out_path is None
+
+    if compact and os.path.exists(journal_path):
+        # New appends go to a fresh journal while we fold the old one
+        folding_path = journal_path + ".folding"
+        os.replace(journal_path, folding_path)
+        journal_path = folding_path
+
+    entries = InteractionJournal(journal_path).read_all()
+    if os.path.exists(legacy_path):
+        with open(legacy_path, "r", encoding="utf-8") as f:
+            entries += json.load(f)
+
+    target = out_path or legacy_path
+    tmp_path = target + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(entries, f, indent=2)
+    os.replace(tmp_path, target)
+
+    if compact and os.path.exists(journal_path):
+        os.remove(journal_path)
+    return len(entries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Interaction journal tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("export", help="write the journal in the legacy interactions_log.json format")
+    p.add_argument("--client-id", required=True)
+    p.add_argument("--out", help="output file (default: fold into interactions_log.json)")
+    args = parser.parse_args()
+
+    count = export_interactions(os.path.join(Config.FAKE_DATA_PATH, args.client_id), args.out)
+    print(f"Exported {count} interactions for {args.client_id}")
+
+
+if __name__ == "__main__":
+    main()
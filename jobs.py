@@ -0,0 +1,267 @@
+"""
+Background job queue for long-running work (prep packs, after-meeting processing).
+Jobs are persisted in SQLite so they survive restarts; identical in-flight submissions are deduplicated.
+A running job holds a lease renewed by its process: if that process dies (killed worker, OOM), the lease
+expires and any live process re-queues the job.
+"""
+import datetime
+import hashlib
+import json
+import logging
+import os
+import queue
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Optional
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+def _now() -> str:
+    return datetime.datetime.now().isoformat()
+
+
+class JobQueue:
+    """SQLite-backed job queue executed by a pool of worker threads."""
+
+    def __init__(self, handlers: Dict[str, Callable[[str, dict], dict]],
+                 db_path: str = Config.JOB_DB_PATH, max_workers: int = Config.JOB_WORKERS,
+                 lease_seconds: float = Config.JOB_LEASE_SECONDS):
+        self.handlers = handlers
+        self.max_workers = max(1, max_workers)
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self._connect()
+        self._reset_process_state()
+
+    def _reset_process_state(self):
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._local_ids = set()  # ids put on self._queue and not yet taken by a worker
+        self._stopping = threading.Event()
+        self._maintenance_stop = threading.Event()
+        self._workers = []
+        self._maintenance = None
+
+    @staticmethod
+    def _owner() -> str:
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    def _connect(self):
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, kind TEXT NOT NULL, client_id TEXT NOT NULL, payload TEXT NOT NULL, "
+            "dedupe_key TEXT NOT NULL, status TEXT NOT NULL, result TEXT, error TEXT, "
+            "created_at TEXT NOT NULL, started_at TEXT, finished_at TEXT)"
+        )
+        columns = {row["name"] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (("owner", "TEXT"), ("lease_expires", "REAL")):
+            if column not in columns:  # job databases created before leases
+                self._db.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_jobs_dedupe ON jobs(dedupe_key, status)")
+        self._db.commit()
+
+    def recover(self) -> int:
+        """Marks jobs left running by a stopped process as queued again. Only safe while no process runs jobs."""
+        with self._lock:
+            recovered = self._db.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL, owner = NULL, lease_expires = NULL WHERE status = ?",
+                (QUEUED, RUNNING)
+            ).rowcount
+            self._db.commit()
+        if recovered:
+            logger.info(f"Recovered {recovered} interrupted jobs")
+        return recovered
+
+    def reclaim_expired(self) -> int:
+        """
+        Re-queues running jobs whose lease expired (their process died) and picks up queued jobs that
+        were only in a dead process's in-memory queue. Safe while other processes run jobs.
+        """
+        now = time.time()
+        with self._lock:
+            expired = [row["id"] for row in self._db.execute(
+                "SELECT id FROM jobs WHERE status = ? AND (lease_expires IS NULL OR lease_expires < ?)", (RUNNING, now)
+            )]
+            reclaimed = []
+            for job_id in expired:
+                # Conditional on the lease still being expired: the owner may have renewed it meanwhile
+                if self._db.execute(
+                    "UPDATE jobs SET status = ?, started_at = NULL, owner = NULL, lease_expires = NULL "
+                    "WHERE id = ? AND status = ? AND (lease_expires IS NULL OR lease_expires < ?)",
+                    (QUEUED, job_id, RUNNING, now)
+                ).rowcount:
+                    reclaimed.append(job_id)
+            self._db.commit()
+            stale_before = datetime.datetime.fromtimestamp(now - self.lease_seconds).isoformat()
+            orphaned = [row["id"] for row in self._db.execute(
+                "SELECT id FROM jobs WHERE status = ? AND created_at < ? ORDER BY created_at", (QUEUED, stale_before)
+            )]
+        if reclaimed:
+            logger.warning(f"Re-queued {len(reclaimed)} jobs whose worker stopped renewing its lease")
+        for job_id in reclaimed + orphaned:
+            self._enqueue(job_id)
+        return len(reclaimed)
+
+    def reopen(self):
+        """New SQLite connection and empty in-process queue, for a worker process forked after preloading."""
+        self._connect()
+        self._reset_process_state()
+
+    def start(self, recover: bool = True):
+        """
+        Re-queues jobs interrupted by a restart (unless `recover` is False: other processes may be running
+        jobs, only expired leases are reclaimed), then starts the workers and the lease heartbeat.
+        """
+        if recover:
+            self.recover()
+        self.reclaim_expired()
+        self._stopping.clear()
+        self._maintenance_stop.clear()
+        with self._lock:
+            pending = self._db.execute(
+                "SELECT id FROM jobs WHERE status = ? ORDER BY created_at", (QUEUED,)
+            ).fetchall()
+        for row in pending:
+            self._enqueue(row["id"])
+        if pending:
+            logger.info(f"Queued {len(pending)} pending jobs")
+
+        for i in range(self.max_workers):
+            worker = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+        self._maintenance = threading.Thread(target=self._maintain, name="job-leases", daemon=True)
+        self._maintenance.start()
+
+    def shutdown(self, wait: bool = True, timeout: Optional[float] = None) -> bool:
+        """
+        Stops the workers after the jobs they are currently running; jobs still queued stay queued
+        in SQLite for the next start. With wait=False, only stops claiming new jobs (call again to wait).
+        Returns False if running jobs outlast `timeout`: their leases then expire and another process re-runs them.
+        """
+        if not self._stopping.is_set():
+            self._stopping.set()
+            for _ in self._workers:
+                self._queue.put(None)
+        if not wait:
+            return not any(worker.is_alive() for worker in self._workers)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for worker in self._workers:
+            worker.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        finished = not any(worker.is_alive() for worker in self._workers)
+        self._maintenance_stop.set()  # leases are renewed until the running jobs are done or abandoned
+        self._workers = []
+        return finished
+
+    def submit(self, kind: str, client_id: str, payload: dict) -> tuple:
+        """Returns (job, deduplicated). An identical job already queued or running is returned as is."""
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        payload_json = json.dumps(payload, sort_keys=True, default=str)
+        dedupe_key = hashlib.sha256(f"{kind}|{client_id}|{payload_json}".encode("utf-8")).hexdigest()
+
+        with self._lock:
+            existing = self._db.execute(
+                "SELECT * FROM jobs WHERE dedupe_key = ? AND status IN (?, ?)", (dedupe_key, QUEUED, RUNNING)
+            ).fetchone()
+            if existing is not None:
+                return self._to_dict(existing), True
+
+            job_id = uuid.uuid4().hex
+            self._db.execute(
+                "INSERT INTO jobs (id, kind, client_id, payload, dedupe_key, status, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, client_id, payload_json, dedupe_key, QUEUED, _now())
+            )
+            self._db.commit()
+        self._enqueue(job_id)
+        logger.info(f"Job {job_id} queued ({kind} for {client_id})")
+        return self.get(job_id), False
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def _enqueue(self, job_id: str):
+        with self._lock:
+            if job_id in self._local_ids:
+                return
+            self._local_ids.add(job_id)
+        self._queue.put(job_id)
+
+    def _maintain(self):
+        """Renews the leases of this process's running jobs and reclaims expired ones, every third of a lease."""
+        while not self._maintenance_stop.wait(self.lease_seconds / 3):
+            try:
+                with self._lock:
+                    self._db.execute(
+                        "UPDATE jobs SET lease_expires = ? WHERE status = ? AND owner = ?",
+                        (time.time() + self.lease_seconds, RUNNING, self._owner())
+                    )
+                    self._db.commit()
+                if not self._stopping.is_set():
+                    self.reclaim_expired()
+            except sqlite3.Error as e:
+                logger.warning(f"Job lease maintenance failed: {e}")
+
+    def _work(self):
+        while True:
+            job_id = self._queue.get()
+            if job_id is not None:
+                with self._lock:
+                    self._local_ids.discard(job_id)
+            if job_id is None or self._stopping.is_set():
+                return
+            with self._lock:
+                # Claimed with a conditional update: with several worker processes, only one runs the job
+                claimed = self._db.execute(
+                    "UPDATE jobs SET status = ?, started_at = ?, owner = ?, lease_expires = ? WHERE id = ? AND status = ?",
+                    (RUNNING, _now(), self._owner(), time.time() + self.lease_seconds, job_id, QUEUED)
+                ).rowcount
+                self._db.commit()
+                row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone() if claimed else None
+                if row is None:
+                    continue
+
+            try:
+                result = self.handlers[row["kind"]](row["client_id"], json.loads(row["payload"]))
+                update = (DONE, json.dumps(result, default=str), None)
+            except Exception as e:
+                logger.error(f"Job {job_id} failed: {e}", exc_info=True)
+                update = (FAILED, None, str(e))
+
+            with self._lock:
+                recorded = self._db.execute(
+                    "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, lease_expires = NULL "
+                    "WHERE id = ? AND owner = ?",
+                    (*update, _now(), job_id, self._owner())
+                ).rowcount
+                self._db.commit()
+            if not recorded:
+                logger.warning(f"Job {job_id} finished after its lease was reclaimed; result discarded")
+                continue
+            logger.info(f"Job {job_id} {update[0]}")
+
+    @staticmethod
+    def _to_dict(row) -> dict:
+        return {
+            "job_id": row["id"],
+            "kind": row["kind"],
+            "client_id": row["client_id"],
+            "status": row["status"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"]
+        }
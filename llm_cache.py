@@ -0,0 +1,168 @@
+"""
+Content-addressed cache for LLM responses.
+Keys hash (agent name, model, response schema, full prompt); values are the raw response text,
+so every hit still goes through the Pydantic validation in BaseAgent.generate.
+"""
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """Two-tier cache: in-memory LRU, optionally backed by a SQLite file shared across processes."""
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 3600,
+                 sqlite_path: Optional[str] = None, max_disk_entries: int = 5000):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_entries = max_disk_entries
+        self.sqlite_path = sqlite_path
+        self._memory = OrderedDict()  # key -> (stored_at, text)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "memory_hits": 0, "disk_hits": 0, "evictions": 0}
+        self._db = None
+        if sqlite_path:
+            self._connect()
+
+    def _connect(self):
+        self._db = sqlite3.connect(self.sqlite_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_access ON llm_cache(last_access)")
+        self._db.commit()
+
+    def reopen(self):
+        """New SQLite connection, for a worker process forked after preloading."""
+        self._lock = threading.Lock()
+        if self.sqlite_path:
+            self._connect()
+
+    @staticmethod
+    def make_key(agent_name: str, model_name: str, schema_class, prompt: str) -> str:
+        schema = json.dumps(schema_class.model_json_schema(), sort_keys=True) if schema_class else ""
+        digest = hashlib.sha256()
+        for part in (agent_name, model_name, getattr(schema_class, "__name__", ""), schema, prompt):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\x00")
+        return digest.hexdigest()
+
+    def _expired(self, stored_at: float, now: float) -> bool:
+        return bool(self.ttl_seconds) and now - stored_at > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[0], now):
+                    self._memory.move_to_end(key)
+                    self._stats["hits"] += 1
+                    self._stats["memory_hits"] += 1
+                    return entry[1]
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute("SELECT value, stored_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    if not self._expired(row[1], now):
+                        self._db.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+                        self._db.commit()
+                        self._put_memory(key, row[1], row[0])
+                        self._stats["hits"] += 1
+                        self._stats["disk_hits"] += 1
+                        return row[0]
+                    self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    self._db.commit()
+
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, key: str, text: str):
+        now = time.time()
+        with self._lock:
+            self._put_memory(key, now, text)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, stored_at, last_access) VALUES (?, ?, ?, ?)",
+                    (key, text, now, now)
+                )
+                self._evict_disk(now)
+                self._db.commit()
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._memory.pop(key, None)
+            if self._db is not None:
+                self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM llm_cache")
+                self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+            if self._db is not None:
+                stats["disk_entries"] = self._db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        return stats
+
+    def _put_memory(self, key: str, stored_at: float, text: str):
+        self._memory[key] = (stored_at, text)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _evict_disk(self, now: float):
+        if self.ttl_seconds:
+            self._db.execute("DELETE FROM llm_cache WHERE stored_at < ?", (now - self.ttl_seconds,))
+        overflow = self._db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] - self.max_disk_entries
+        if overflow > 0:
+            self._db.execute(
+                "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY last_access LIMIT ?)",
+                (overflow,)
+            )
+            self._stats["evictions"] += overflow
+
+
+_response_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Process-wide cache used by BaseAgent.generate (None when LLM_CACHE_ENABLED=false)."""
+    global _response_cache
+    if _response_cache is None and Config.LLM_CACHE_ENABLED:
+        with _cache_lock:
+            if _response_cache is None:
+                _response_cache = ResponseCache(
+                    max_entries=Config.LLM_CACHE_MAX_ENTRIES,
+                    ttl_seconds=Config.LLM_CACHE_TTL_SECONDS,
+                    sqlite_path=Config.LLM_CACHE_SQLITE_PATH or None,
+                    max_disk_entries=Config.LLM_CACHE_MAX_DISK_ENTRIES
+                )
+    return _response_cache
+
+
+def set_response_cache(cache: Optional[ResponseCache]):
+    """Plugs in another cache implementation (anything with get/set/invalidate/stats). None resets to the default."""
+    global _response_cache
+    with _cache_lock:
+        _response_cache = cache
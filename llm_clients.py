@@ -0,0 +1,69 @@
+"""
+Process-wide registry of Gemini model clients.
+genai.configure() drops the library's cached transport, and each GenerativeModel opens its
+service client lazily, so both are done once here and the models are shared by every agent,
+the conversation agent and the A2A server. GenerativeModel holds no per-request state.
+"""
+import logging
+import threading
+import google.generativeai as genai
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_configured = False
+_models = {}  # model_name -> genai.GenerativeModel
+_stats = {"configure_calls": 0, "model_constructions": 0, "lookups": 0}
+WARM_UP_TIMEOUT_SECONDS = 10
+
+
+def configure():
+    """Configures the Gemini library once per process."""
+    global _configured
+    with _lock:
+        if _configured:
+            return
+        try:
+            genai.configure(api_key=Config.GEMINI_API_KEY)
+        except Exception as e:
+            logger.error(f"Failed to configure Gemini: {e}")
+        _configured = True
+        _stats["configure_calls"] += 1
+
+
+def get_model(model_name: str = Config.GEMINI_MODEL) -> genai.GenerativeModel:
+    """Shared GenerativeModel for `model_name`, constructed on first use."""
+    configure()
+    with _lock:
+        _stats["lookups"] += 1
+        model = _models.get(model_name)
+        if model is None:
+            model = genai.GenerativeModel(model_name)
+            _models[model_name] = model
+            _stats["model_constructions"] += 1
+            logger.info(f"Constructed Gemini client for {model_name}")
+        return model
+
+
+def warm_up(model_names: list = None, open_clients: bool = True):
+    """
+    Builds the models and their service client at startup instead of on the first request.
+    The client is opened by a count_tokens call (free, no generation); open_clients=False only builds
+    the models: a gRPC channel must not be inherited by forked workers.
+    """
+    if Config.LLM_PROVIDER != "gemini":
+        return
+    for model_name in model_names or [Config.GEMINI_MODEL]:
+        model = get_model(model_name)
+        if not open_clients or not Config.GEMINI_API_KEY:
+            continue  # offline (fake LLM): the service client would only probe for credentials
+        try:
+            model.count_tokens("ping", request_options={"timeout": WARM_UP_TIMEOUT_SECONDS, "retry": None})
+        except Exception as e:
+            logger.warning(f"Gemini client warm-up failed for {model_name}: {e}")
+
+
+def stats() -> dict:
+    with _lock:
+        return dict(_stats, models=sorted(_models))
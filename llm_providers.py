@@ -0,0 +1,80 @@
+"""
+LLM backends behind the agents. Both return objects with the genai.GenerativeModel
+generate_content(prompt, generation_config=None) interface used by BaseAgent and ConversationAgent.
+
+    LLM_PROVIDER=gemini   shared Gemini clients (llm_clients.py), the default
+    LLM_PROVIDER=fake     local fake (fake_llm.py): no quota, configurable latency and errors
+        FAKE_LLM_MODE=canned|generated   canned answers per agent, or random schema-valid JSON
+        FAKE_LLM_LATENCY=lognormal:0.8:0.5, FAKE_LLM_ERROR_RATE=0.05, FAKE_LLM_SEED=7
+"""
+import logging
+import threading
+from abc import ABC, abstractmethod
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class LLMProvider(ABC):
+    name = ""
+
+    @abstractmethod
+    def get_model(self, model_name: str, agent_name: str, output_schema=None):
+        """Model client used by `agent_name`; `output_schema` is the pydantic class it must produce."""
+
+
+class GeminiProvider(LLMProvider):
+    name = "gemini"
+
+    def get_model(self, model_name: str, agent_name: str, output_schema=None):
+        import llm_clients
+        return llm_clients.get_model(model_name)
+
+
+class FakeProvider(LLMProvider):
+    """One FakeGenerativeModel per agent, answering canned or generated schema-valid JSON."""
+    name = "fake"
+
+    def __init__(self, mode: str = None, latency=None, error_rate: float = None, seed: int = None):
+        self.mode = mode or Config.FAKE_LLM_MODE
+        self.latency = latency if latency is not None else Config.FAKE_LLM_LATENCY
+        self.error_rate = error_rate if error_rate is not None else Config.FAKE_LLM_ERROR_RATE
+        self.seed = seed if seed is not None else Config.FAKE_LLM_SEED
+        self.models = {}  # agent_name -> FakeGenerativeModel
+        self._lock = threading.Lock()
+
+    def get_model(self, model_name: str, agent_name: str, output_schema=None):
+        from fake_llm import CANNED_RESPONSES, FakeGenerativeModel, generate_example
+
+        with self._lock:
+            model = self.models.get(agent_name)
+            if model is None:
+                if self.mode == "generated" and output_schema is not None:
+                    payload = lambda rng: generate_example(output_schema, rng)
+                else:
+                    payload = CANNED_RESPONSES.get(agent_name) or generate_example(output_schema)
+                seed = None if self.seed is None else self.seed + len(self.models)
+                model = FakeGenerativeModel(payload, self.latency, error_rate=self.error_rate, seed=seed)
+                self.models[agent_name] = model
+            return model
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_provider() -> LLMProvider:
+    """Process-wide provider selected by Config.LLM_PROVIDER."""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = FakeProvider() if Config.LLM_PROVIDER == "fake" else GeminiProvider()
+            logger.info(f"LLM provider: {_provider.name}")
+        return _provider
+
+
+def set_provider(provider: LLMProvider):
+    """Replaces the process-wide provider (benchmarks); agents built afterwards use it."""
+    global _provider
+    with _provider_lock:
+        _provider = provider
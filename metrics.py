@@ -0,0 +1,248 @@
+"""
+Minimal Prometheus instrumentation (text exposition format 0.0.4), served at /metrics.
+Counters and histograms are updated in-process under a per-metric lock (a dict lookup and
+a bisect per observation); cache statistics are read from their owners only at scrape time.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}  # label values tuple -> state
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._render_samples(items))
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _render_samples(self, items):
+        return [f"{self.name}{_label_text(self.labelnames, key)} {_format_number(value)}" for key, value in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]  # per-bucket, sum, count
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _render_samples(self, items):
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="' + _format_number(bound if bound == float("inf") else float(bound)) + '"'
+                lines.append(f"{self.name}_bucket{_label_text(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labelnames, key)} {_format_number(total)}")
+            lines.append(f"{self.name}_count{_label_text(self.labelnames, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []  # callables returning [(name, kind, help, {labels}, value)]
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help_text: str, labelnames: tuple = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def _register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector):
+        """`collector()` is called at scrape time; failures are skipped so /metrics always answers."""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+            collectors = list(self._collectors)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+
+        samples = {}
+        for collector in collectors:
+            try:
+                for name, kind, help_text, labels, value in collector():
+                    samples.setdefault((name, kind, help_text), []).append((labels, value))
+            except Exception:
+                continue
+        for (name, kind, help_text), values in samples.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in values:
+                lines.append(f"{name}{_label_text(tuple(labels), tuple(labels.values()))} {_format_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# --- LLM calls (BaseAgent.generate, ConversationAgent.process_message) ---
+LLM_CALL_SECONDS = REGISTRY.histogram(
+    "copilot_llm_call_seconds", "Gemini call latency per agent, retries included", ("agent",))
+LLM_PROMPT_TOKENS = REGISTRY.histogram(
+    "copilot_llm_prompt_tokens", "Prompt tokens per call (Gemini usage or estimate)", ("agent",), TOKEN_BUCKETS)
+LLM_OUTPUT_TOKENS = REGISTRY.histogram(
+    "copilot_llm_output_tokens", "Response tokens per call (Gemini usage or estimate)", ("agent",), TOKEN_BUCKETS)
+LLM_ERRORS = REGISTRY.counter(
+    "copilot_llm_errors_total", "Failed LLM calls per agent and error type", ("agent", "error"))
+LLM_VALIDATION_FAILURES = REGISTRY.counter(
+    "copilot_llm_validation_failures_total", "Responses rejected by schema validation", ("agent",))
+LLM_CACHE_HITS = REGISTRY.counter(
+    "copilot_llm_cache_hits_total", "Agent calls answered by the LLM response cache", ("agent",))
+
+# --- Data access and end-to-end flows ---
+CLIENT_DATA_SECONDS = REGISTRY.histogram(
+    "copilot_client_data_load_seconds", "tools.get_client_data latency (fixture/DB I/O)", ("store",))
+PREP_PACK_SECONDS = REGISTRY.histogram(
+    "copilot_prep_pack_seconds", "End-to-end prep pack build time", ("source",))
+PREP_PACK_FAILURES = REGISTRY.counter(
+    "copilot_prep_pack_failures_total", "Prep pack builds that raised")
+CHAT_SECONDS = REGISTRY.histogram(
+    "copilot_chat_request_seconds", "/chat request latency", ("action",))
+INTENT_FAST_PATH = REGISTRY.counter(
+    "copilot_chat_intent_total", "/chat intents answered by the rule fast path (hit) or the LLM", ("result",))
+A2A_MESSAGE_SECONDS = REGISTRY.histogram(
+    "copilot_a2a_message_seconds", "/a2a/message latency per target agent", ("agent", "status"))
+
+
+def stats_collector(prefix: str, get_stats, kinds: dict):
+    """
+    Collector exposing selected numeric fields of an existing stats() dict,
+    e.g. stats_collector("copilot_fixture_cache", fixture_cache.stats, {"hits": "counter"}).
+    """
+    def collect():
+        stats = get_stats() or {}
+        for field, kind in kinds.items():
+            if isinstance(stats.get(field), (int, float)):
+                suffix = "_total" if kind == "counter" else ""
+                yield f"{prefix}_{field}{suffix}", kind, f"{prefix} {field}", {}, stats[field]
+    return collect
+
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+_process_collectors_registered = False
+
+
+def register_process_collectors():
+    """Scrape-time views of the process-wide caches, registries, call policy, chat sessions and Telegram queue (registered once)."""
+    global _process_collectors_registered
+    if _process_collectors_registered:
+        return
+    _process_collectors_registered = True
+    import call_policy
+    import llm_clients
+    from fixture_cache import fixture_cache
+    from llm_cache import get_response_cache
+    from client_directory import get_client_directory
+    from session_store import get_session_store
+    from telegram_notifier import telegram_notifier
+
+    def response_cache_stats():
+        cache = get_response_cache()
+        return cache.stats() if cache else {}
+
+    REGISTRY.register_collector(stats_collector(
+        "copilot_response_cache", response_cache_stats, {"hits": "counter", "misses": "counter", "evictions": "counter"}))
+    REGISTRY.register_collector(stats_collector(
+        "copilot_fixture_cache", fixture_cache.stats,
+        {"hits": "counter", "misses": "counter", "revalidations": "counter", "evictions": "counter", "files": "gauge"}))
+    REGISTRY.register_collector(stats_collector(
+        "copilot_llm_clients", llm_clients.stats, {"model_constructions": "counter"}))
+    REGISTRY.register_collector(stats_collector(
+        "copilot_llm_policy", call_policy.stats,
+        {"retries": "counter", "hedges": "counter", "hedge_wins": "counter", "failures": "counter"}))
+    REGISTRY.register_collector(stats_collector(
+        "copilot_chat_sessions", lambda: get_session_store().stats(),
+        {"sessions": "gauge", "created": "counter", "expired": "counter", "evictions": "counter",
+         "compacted_messages": "counter"}))
+    REGISTRY.register_collector(stats_collector(
+        "copilot_client_directory", lambda: get_client_directory().stats(),
+        {"clients": "gauge", "lookups": "counter", "refreshes": "counter", "reindexed": "counter",
+         "last_refresh_seconds": "gauge"}))
+    REGISTRY.register_collector(stats_collector(
+        "copilot_telegram", telegram_notifier.stats,
+        {"pending": "gauge", "queued": "counter", "sent": "counter", "failed": "counter", "dropped": "counter",
+         "retries": "counter"}))
+
+    def breaker_states():
+        states = {"closed": 0, "half_open": 1, "open": 2}
+        for backend, breaker in call_policy.stats()["breakers"].items():
+            yield ("copilot_llm_circuit_state", "gauge", "Circuit breaker state (0 closed, 1 half-open, 2 open)",
+                   {"backend": backend}, states[breaker["state"]])
+    REGISTRY.register_collector(breaker_states)
@@ -0,0 +1,91 @@
+"""
+Deterministic fast path for DataRetrieverAgent.
+Maps the raw fixtures returned by tools.get_client_data onto NormalizedClientSnapshot without an LLM call.
+"""
+import datetime
+from schemas import CentraleDesRisques
+
+RECENT_INTERACTIONS = 5
+EXPECTED_SOURCES = [
+    "crm_profile",
+    "account_summary",
+    "products_owned",
+    "interactions_log",
+    "document_vault_index",
+    "centrale_des_risques"
+]
+
+
+def _map_centrale_risques(cdr: dict):
+    """Returns a CentraleDesRisques dict, or None if the report lacks a required field."""
+    try:
+        return CentraleDesRisques(
+            total_commitment_market=cdr["total_commitment_market"],
+            worst_class=cdr["worst_class"],
+            unpaid_amount=cdr.get("unpaid_amount", 0.0),
+            bct_notes=cdr.get("bct_notes", "")
+        ).model_dump()
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _document_gaps(vault: dict, today: str) -> list:
+    """Flags missing and expired documents in the vault index."""
+    gaps = []
+    for category, docs in vault.items():
+        if not isinstance(docs, list):
+            continue
+        for doc in docs:
+            name = doc.get("doc_name", "Unknown document")
+            status = str(doc.get("status", "")).lower()
+            expiry = doc.get("expiry")
+            if status.startswith("missing"):
+                gaps.append(f"Missing document: {name} ({category})")
+            elif status.startswith("expired") or (expiry and str(expiry) < today and "received" not in status):
+                gaps.append(f"Expired document: {name} (expiry {expiry})")
+    return gaps
+
+
+def normalize_client_snapshot(client_id: str, data: dict, today: str = None) -> tuple:
+    """
+    Builds the snapshot from raw client data.
+    Returns (snapshot_dict, unmapped_fields): unmapped fields could not be derived and need the LLM.
+    """
+    today = today or datetime.date.today().isoformat()
+    crm = data.get("crm_profile") or {}
+    vault = data.get("document_vault_index") or {}
+    interactions = data.get("interactions_log") or []
+    products = data.get("products_owned") or []
+
+    unmapped = []
+    missing_data = [f"{source} not available" for source in EXPECTED_SOURCES if not data.get(source)]
+
+    company_name = crm.get("name") or crm.get("company_name")
+    if not company_name:
+        unmapped.append("company_name")
+    segment = crm.get("segment")
+    if not segment:
+        unmapped.append("segment")
+
+    centrale_risques = None
+    if data.get("centrale_des_risques"):
+        centrale_risques = _map_centrale_risques(data["centrale_des_risques"])
+        if centrale_risques is None:
+            # The report exists but does not follow the known layout
+            unmapped.append("centrale_risques")
+
+    missing_data.extend(_document_gaps(vault, today))
+
+    snapshot = {
+        "client_id": client_id,
+        "company_name": company_name or "",
+        "segment": segment or "",
+        "crm_data": crm,
+        "financial_summary": data.get("account_summary") or {},
+        "products_held": products if isinstance(products, list) else [products],
+        "recent_interactions": interactions[:RECENT_INTERACTIONS] if isinstance(interactions, list) else [],
+        "document_status": vault,
+        "centrale_risques": centrale_risques,
+        "missing_data": missing_data
+    }
+    return snapshot, unmapped
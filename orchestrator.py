@@ -1,49 +1,169 @@
-import json
 import os
+import time
 import datetime
 import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from agents import (
     DataRetrieverAgent, ClientBriefAgent, RiskComplianceAgent, 
     OpportunityAgent, AfterMeetingAgent
 )
-from schemas import PrepPack, Task, Reminder
+from schemas import (
+    PrepPack, Task, Reminder, NormalizedClientSnapshot, FicheDeVisiteResult,
+    RiskComplianceResult, OpportunityPlanResult
+)
 from config import Config
 from tools import new_id
+from prep_pack_cache import PrepPackCache
+from repository import ClientRepository, get_repository
+from fixture_cache import fixture_cache
+from metrics import PREP_PACK_FAILURES, PREP_PACK_SECONDS
 
 logger = logging.getLogger(__name__)
 
+class AgentTimeoutError(TimeoutError):
+    """Raised when an agent does not answer within its configured timeout."""
+    def __init__(self, agent_name: str, timeout: float):
+        super().__init__(f"Agent {agent_name} timed out after {timeout:.1f}s")
+        self.agent_name = agent_name
+        self.timeout = timeout
+
 class Orchestrator:
-    def __init__(self):
+    def __init__(self, parallel: bool = Config.PARALLEL_AGENTS, max_workers: int = Config.AGENT_MAX_WORKERS,
+                 repository: ClientRepository = None):
         self.data_agent = DataRetrieverAgent()
         self.brief_agent = ClientBriefAgent()
         self.risk_agent = RiskComplianceAgent()
         self.opp_agent = OpportunityAgent()
         self.after_agent = AfterMeetingAgent()
+
+        # Fan-out pool for agents that only depend on already computed results
+        self.parallel = parallel and max_workers > 1
+        self.max_workers = max(1, max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="agent")
         
         # Ensure outputs dir exists
         os.makedirs("outputs", exist_ok=True)
+        self.repository = repository or get_repository()
+        self.prep_pack_cache = PrepPackCache(self.repository) if Config.PREP_PACK_CACHE_ENABLED else None
+
+    def _iter_agents(self, calls: dict, executor: ThreadPoolExecutor = None):
+        """
+        Fan-out: runs {key: (agent, args)} and yields (key, result) as each agent finishes.
+        Each agent gets its own timeout (Config.agent_timeout), counted from the moment it starts.
+        `executor` defaults to the orchestrator's shared agent pool.
+        """
+        if not self.parallel:
+            for key, (agent, args) in calls.items():
+                yield key, agent.run(*args)
+            return
+
+        started = {}
+
+        def _call(key, agent, args):
+            started[key] = time.monotonic()
+            return agent.run(*args)
+
+        futures = {
+            (executor or self._executor).submit(_call, key, agent, args): (key, agent)
+            for key, (agent, args) in calls.items()
+        }
+        pending = set(futures)
+        try:
+            while pending:
+                # Wake up at the nearest deadline of the agents already running
+                now = time.monotonic()
+                deadlines = [
+                    started[key] + Config.agent_timeout(agent.name) - now
+                    for f, (key, agent) in futures.items() if f in pending and key in started
+                ]
+                wait_for = max(0.0, min(deadlines)) if deadlines else 0.05
+                done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+
+                for f in done:
+                    key, _ = futures[f]
+                    yield key, f.result()
+
+                now = time.monotonic()
+                for f in pending:
+                    key, agent = futures[f]
+                    timeout = Config.agent_timeout(agent.name)
+                    if key in started and now - started[key] > timeout:
+                        raise AgentTimeoutError(agent.name, timeout)
+        finally:
+            # Also reached when the consumer stops early (e.g. a closed stream)
+            for f in pending:
+                f.cancel()
+
+    def build_prep_pack(self, client_id: str, language: str = "fr", executor: ThreadPoolExecutor = None):
+        result = None
+        for event, payload in self.iter_prep_pack(client_id, language, executor):
+            if event == "complete":
+                result = payload
+        return result
+
+    def iter_prep_pack(self, client_id: str, language: str = "fr", executor: ThreadPoolExecutor = None):
+        """
+        Builds the Prep Pack step by step, yielding (event, payload) as each agent finishes:
+        snapshot, fiche_visite, risk_assessment, opportunities (each with its markdown section),
+        then ("complete", result) with the same result as build_prep_pack.
+        """
+        try:
+            yield from self._prep_pack_steps(client_id, language, executor)
+        except Exception:
+            PREP_PACK_FAILURES.inc()
+            raise
 
-    def build_prep_pack(self, client_id: str, language: str = "fr"):
+    def _prep_pack_steps(self, client_id: str, language: str, executor: ThreadPoolExecutor = None):
         logger.info(f"Building Prep Pack for {client_id}")
+        started = time.perf_counter()
+
+        # 0. Reuse the last pack if nothing it depends on has changed
+        fingerprint = None
+        if self.prep_pack_cache:
+            fingerprint = self.prep_pack_cache.fingerprint(client_id, language)
+            cached = self.prep_pack_cache.get(client_id, fingerprint)
+            if cached is not None:
+                logger.info(f"Prep Pack for {client_id} served from cache")
+                if not os.path.exists(cached["report_path"]):
+                    with open(cached["report_path"], "w", encoding="utf-8") as f:
+                        f.write(cached["report_markdown"])
+                data = cached["prep_pack"]
+                pack = PrepPack(**data)
+                yield self._section_event("snapshot", pack.snapshot, client_id, pack.generated_at, data["snapshot"])
+                for section in ("fiche_visite", "risk_assessment", "opportunities"):
+                    yield self._section_event(section, getattr(pack, section), client_id, data=data[section])
+                PREP_PACK_SECONDS.observe(time.perf_counter() - started, source="cache")
+                yield "complete", cached
+                return
         
         # 1. Retrieve Data
+        # Agents return already-validated dicts: each section is turned into a model once and
+        # those instances are reused below (PrepPack does not re-validate model instances).
         snapshot_data = self.data_agent.run(client_id)
+        snapshot = NormalizedClientSnapshot(**snapshot_data)
+        yield self._section_event("snapshot", snapshot, client_id, datetime.datetime.now().isoformat(), snapshot_data)
         
         # 2. Generate Brief
         brief_data = self.brief_agent.run(snapshot_data)
+        brief = FicheDeVisiteResult(**brief_data)
+        yield self._section_event("fiche_visite", brief, client_id, data=brief_data)
         
-        # 3. Assess Risk
-        risk_data = self.risk_agent.run(snapshot_data, brief_data)
-        
-        # 4. Identify Opportunities
-        opp_data = self.opp_agent.run(snapshot_data, brief_data)
+        # 3 & 4. Assess Risk and Identify Opportunities (independent -> fan-out)
+        fan_in = {}
+        for key, data in self._iter_agents({
+            "risk_assessment": (self.risk_agent, (snapshot_data, brief_data)),
+            "opportunities": (self.opp_agent, (snapshot_data, brief_data)),
+        }, executor):
+            model = RiskComplianceResult(**data) if key == "risk_assessment" else OpportunityPlanResult(**data)
+            fan_in[key] = (model, data)
+            yield self._section_event(key, model, client_id, data=data)
         
         # 5. Assemble Prep Pack
         prep_pack = PrepPack(
-            snapshot=snapshot_data,
-            fiche_visite=brief_data,
-            risk_assessment=risk_data,
-            opportunities=opp_data,
+            snapshot=snapshot,
+            fiche_visite=brief,
+            risk_assessment=fan_in["risk_assessment"][0],
+            opportunities=fan_in["opportunities"][0],
             generated_at=datetime.datetime.now().isoformat()
         )
         
@@ -56,22 +176,102 @@ class Orchestrator:
         with open(filename, "w", encoding="utf-8") as f:
             f.write(report_md)
             
-        return {
-            "prep_pack": prep_pack.model_dump(),
+        result = {
+            "prep_pack": {
+                "snapshot": snapshot_data,
+                "fiche_visite": brief_data,
+                "risk_assessment": fan_in["risk_assessment"][1],
+                "opportunities": fan_in["opportunities"][1],
+                "generated_at": prep_pack.generated_at
+            },
             "report_markdown": report_md,
             "report_path": filename
         }
+        if self.prep_pack_cache:
+            self.prep_pack_cache.put(client_id, fingerprint, result)
+        PREP_PACK_SECONDS.observe(time.perf_counter() - started, source="built")
+        yield "complete", result
+
+    def _section_event(self, section: str, model, client_id: str, generated_at: str = None, data: dict = None) -> tuple:
+        """
+        (section, {"data", "markdown"}) for one finished agent, markdown as in the final report.
+        `data` is the section's already-dumped dict when the caller has it.
+        """
+        if section == "snapshot":
+            markdown = self._render_header(model, client_id, generated_at)
+        elif section == "fiche_visite":
+            markdown = self._render_fiche(model) + self._render_agenda(model)
+        elif section == "risk_assessment":
+            markdown = self._render_risk(model)
+        else:
+            markdown = self._render_opportunities(model)
+        return section, {"client_id": client_id, "data": data if data is not None else model.model_dump(), "markdown": markdown}
+
+    def build_prep_packs(self, client_ids: list, language: str = "fr", max_workers: int = Config.BATCH_MAX_WORKERS) -> dict:
+        """
+        Builds prep packs for a portfolio of clients with a bounded worker pool.
+        One failing client does not stop the batch: each gets its own success/error entry.
+        """
+        client_ids = list(dict.fromkeys(client_ids))  # de-duplicate, keep order
+        max_workers = max(1, min(max_workers, len(client_ids)))
+        logger.info(f"Building {len(client_ids)} Prep Packs with {max_workers} workers")
+        # The batch gets its own agent pool: on the shared one (AGENT_MAX_WORKERS) every pack's risk and
+        # opportunity agents would queue behind the other packs' and the batch would run ~2 packs at a time
+        agent_pool = ThreadPoolExecutor(max_workers=max_workers * self.max_workers, thread_name_prefix="batch-agent")
+
+        def _build_one(client_id):
+            start = time.monotonic()
+            try:
+                result = self.build_prep_pack(client_id, language, agent_pool)
+                return {
+                    "client_id": client_id,
+                    "status": "success",
+                    "report_path": result["report_path"],
+                    "prep_pack": result["prep_pack"],
+                    "duration_seconds": round(time.monotonic() - start, 2)
+                }
+            except Exception as e:
+                logger.error(f"Prep Pack failed for {client_id}: {e}")
+                return {
+                    "client_id": client_id,
+                    "status": "error",
+                    "error": str(e),
+                    "duration_seconds": round(time.monotonic() - start, 2)
+                }
+
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="batch") as pool:
+                results = list(pool.map(_build_one, client_ids))
+        finally:
+            agent_pool.shutdown(wait=False, cancel_futures=True)
+
+        summary_md = self._generate_portfolio_summary(results)
+        date_str = datetime.datetime.now().strftime("%Y%m%d")
+        summary_path = f"outputs/portfolio_summary_{date_str}.md"
+        with open(summary_path, "w", encoding="utf-8") as f:
+            f.write(summary_md)
+
+        succeeded = sum(1 for r in results if r["status"] == "success")
+        return {
+            "results": results,
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded,
+            "summary_markdown": summary_md,
+            "summary_path": summary_path
+        }
+
+    def invalidate_client(self, client_id: str):
+        """Must be called after any write to a client's data."""
+        fixture_cache.invalidate(group=client_id)
+        if self.prep_pack_cache:
+            self.prep_pack_cache.invalidate(client_id)
 
     def _update_interactions_log(self, client_id: str, meeting_date: str, meeting_type: str, summary: str):
         """Appends the new meeting to the interactions log so next PrepPack sees it."""
-        log_path = os.path.join(Config.FAKE_DATA_PATH, client_id, "interactions_log.json")
-        if not os.path.exists(log_path):
+        if not self.repository.exists(client_id):
             return
 
         try:
-            with open(log_path, "r", encoding="utf-8") as f:
-                logs = json.load(f)
-            
             # Prepend new interaction
             new_entry = {
                 "date": meeting_date,
@@ -79,26 +279,21 @@ class Orchestrator:
                 "summary": summary[:300] + "..." if len(summary) > 300 else summary,
                 "outcome": "See Client Case for full minutes."
             }
-            logs.insert(0, new_entry)
-            
-            with open(log_path, "w", encoding="utf-8") as f:
-                json.dump(logs, f, indent=2)
+            self.repository.add_interaction(client_id, new_entry)
+            self.invalidate_client(client_id)
         except Exception as e:
             logger.error(f"Failed to update interactions log: {e}")
 
     def _update_document_vault(self, client_id: str, minutes: str):
         """Simple heuristic to update doc status if mentioned in minutes."""
-        vault_path = os.path.join(Config.FAKE_DATA_PATH, client_id, "document_vault_index.json")
-        if not os.path.exists(vault_path):
-            return
-
         lower_minutes = minutes.lower()
         if "reçu" not in lower_minutes and "received" not in lower_minutes:
             return
 
         try:
-            with open(vault_path, "r", encoding="utf-8") as f:
-                vault = json.load(f)
+            vault = self.repository.get_document_vault(client_id)
+            if not vault:
+                return
 
             updated = False
             # heuristic: check for financial statements
@@ -109,8 +304,8 @@ class Orchestrator:
                         updated = True
             
             if updated:
-                 with open(vault_path, "w", encoding="utf-8") as f:
-                    json.dump(vault, f, indent=2)
+                 self.repository.save_document_vault(client_id, vault)
+                 self.invalidate_client(client_id)
         except Exception as e:
             logger.error(f"Failed to update doc vault: {e}")
 
@@ -125,15 +320,7 @@ class Orchestrator:
         )
         
         # 2. Update Case File
-        case_path = os.path.join(Config.FAKE_DATA_PATH, client_id, "client_case.json")
-        if os.path.exists(case_path):
-            with open(case_path, "r", encoding="utf-8") as f:
-                case_file = json.load(f)
-        else:
-            case_file = {"client_id": client_id, "case_history": [], "current_tasks": []}
-            
-        # Merge new data
-        case_file["case_history"].append({
+        history_entry = {
             "date": input_data.get("meeting_date"),
             "type": input_data.get("meeting_type"),
             "minutes": result_data["compte_rendu_officiel"],
@@ -141,20 +328,18 @@ class Orchestrator:
                 "subject": result_data["draft_email_subject"],
                 "body": result_data["draft_email_body"]
             }
-        })
+        }
         
         # Add new tasks
-        existing_tasks = case_file.get("current_tasks", [])
+        new_tasks = []
         for t in result_data["updated_tasks"]:
             # naive check to avoid dups based on description, ideally strictly new IDs
             t["id"] = new_id("task")
-            existing_tasks.append(t)
-        case_file["current_tasks"] = existing_tasks
-        
+            new_tasks.append(t)
         
         # Save
-        with open(case_path, "w", encoding="utf-8") as f:
-            json.dump(case_file, f, indent=2, default=str)
+        self.repository.add_case_entry(client_id, history_entry, new_tasks)
+        self.invalidate_client(client_id)
         
         # 3. Close the loop: Update Interactions Log for next Prep Pack
         self._update_interactions_log(
@@ -170,22 +355,30 @@ class Orchestrator:
         return result_data
 
     def _generate_markdown_report(self, pack: PrepPack, client_id: str) -> str:
-        s = pack.snapshot
-        b = pack.fiche_visite # was brief
-        r = pack.risk_assessment
-        o = pack.opportunities
-        
+        return (
+            self._render_header(pack.snapshot, client_id, pack.generated_at)
+            + self._render_fiche(pack.fiche_visite)
+            + self._render_risk(pack.risk_assessment)
+            + self._render_opportunities(pack.opportunities)
+            + self._render_agenda(pack.fiche_visite)
+        )
+
+    def _render_header(self, s: NormalizedClientSnapshot, client_id: str, generated_at: str) -> str:
         md = f"# Client Prep Pack: {s.company_name} ({client_id})\n\n"
-        md += f"**Date:** {pack.generated_at[:10]} | **Segment:** {s.segment}\n\n"
-        
-        md += "## 1. Fiche de Visite (Executive Brief)\n"
+        md += f"**Date:** {generated_at[:10]} | **Segment:** {s.segment}\n\n"
+        return md
+
+    def _render_fiche(self, b: FicheDeVisiteResult) -> str:
+        md = "## 1. Fiche de Visite (Executive Brief)\n"
         md += f"**Objet:** {b.objet_visite}\n\n"
         md += f"{b.synthese_situation}\n\n"
         md += "**Chiffres Clés:**\n"
         for k, v in b.chiffres_cles.items():
             md += f"- **{k}:** {v}\n"
-            
-        md += "\n## 2. Risk & Compliance\n"
+        return md
+
+    def _render_risk(self, r: RiskComplianceResult) -> str:
+        md = "\n## 2. Risk & Compliance\n"
         if r.requires_human_approval:
             md += "> [!WARNING]\n> Human Verification Required\n\n"
         
@@ -193,15 +386,19 @@ class Orchestrator:
         for flag in r.risk_flags:
             ref = f" (Ref: {flag.circular_reference})" if flag.circular_reference else ""
             md += f"- [{flag.severity.upper()}] {flag.risk_type}: {flag.description} (Impact: {flag.impact}){ref}\n"
-            
-        md += "\n## 3. Credit Committee Proposals\n"
+        return md
+
+    def _render_opportunities(self, o: OpportunityPlanResult) -> str:
+        md = "\n## 3. Credit Committee Proposals\n"
         for opt in o.recommended_structure:
             md += f"### {opt.product_name} ({opt.amount_proposal or 'TBD'})\n"
             md += f"**Purpose:** {opt.purpose}\n"
             md += f"**Financial Logic:** {opt.financial_justification}\n"
             md += f"**Mitigation:** {opt.mitigation_factors}\n\n"
-            
-        md += "\n## 4. Meeting Agenda & Questions\n"
+        return md
+
+    def _render_agenda(self, b: FicheDeVisiteResult) -> str:
+        md = "\n## 4. Meeting Agenda & Questions\n"
         for item in b.agenda_rencontre:
             md += f"- {item}\n"
             
@@ -210,3 +407,28 @@ class Orchestrator:
             md += f"- {q}\n"
             
         return md
+
+    def _generate_portfolio_summary(self, results: list) -> str:
+        md = f"# Portfolio Prep Summary ({datetime.datetime.now().strftime('%Y-%m-%d')})\n\n"
+        md += f"**Clients:** {len(results)} | **Ready:** {sum(1 for r in results if r['status'] == 'success')}\n\n"
+        md += "| Client | Company | Segment | BCT Class | High Risks | Proposals | Report |\n"
+        md += "|---|---|---|---|---|---|---|\n"
+        for r in results:
+            if r["status"] != "success":
+                md += f"| {r['client_id']} | ❌ {r['error'][:80]} | | | | | |\n"
+                continue
+            pack = r["prep_pack"]
+            snapshot = pack["snapshot"]
+            cdr = snapshot.get("centrale_risques") or {}
+            high = sum(1 for f in pack["risk_assessment"]["risk_flags"] if f["severity"].lower() == "high")
+            proposals = len(pack["opportunities"]["recommended_structure"])
+            report = os.path.basename(r["report_path"])
+            md += (f"| {r['client_id']} | {snapshot['company_name']} | {snapshot['segment']} | "
+                   f"{cdr.get('worst_class', 'N/A')} | {high} | {proposals} | [{report}]({report}) |\n")
+
+        md += "\n## Top Priorities\n"
+        for r in results:
+            if r["status"] == "success":
+                b = r["prep_pack"]["fiche_visite"]
+                md += f"- **{r['prep_pack']['snapshot']['company_name']}:** {b['objet_visite']}\n"
+        return md
@@ -0,0 +1,89 @@
+"""
+Prep Pack memoization.
+A stored pack is reused while the client's data (repository fingerprint), the product catalog,
+the BCT knowledge base (mtime+size) and the model are unchanged. Writers also invalidate explicitly.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Optional
+from config import Config
+from tools import get_bct_knowledge_base_path
+
+logger = logging.getLogger(__name__)
+
+
+def _stat_signature(path: str) -> str:
+    try:
+        st = os.stat(path)
+        return f"{path}:{st.st_mtime_ns}:{st.st_size}"
+    except OSError:
+        return f"{path}:missing"
+
+
+class PrepPackCache:
+    """Memory + on-disk (JSON sidecar per client) cache of build_prep_pack results."""
+
+    def __init__(self, repository, cache_dir: str = Config.PREP_PACK_CACHE_DIR):
+        self.repository = repository
+        self.cache_dir = cache_dir
+        self._memory = {}  # client_id -> {"fingerprint": ..., "result": ...}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def fingerprint(self, client_id: str, language: str = "fr") -> str:
+        """Hash of everything a prep pack depends on."""
+        parts = [Config.GEMINI_MODEL, language, self.repository.fingerprint(client_id)]
+        parts.append(_stat_signature(Config.PRODUCT_CATALOG_PATH))
+        parts.append(_stat_signature(get_bct_knowledge_base_path() or "bct_knowledge_base.json"))
+        return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+    def _path(self, client_id: str) -> str:
+        return os.path.join(self.cache_dir, f"{client_id}.json")
+
+    def get(self, client_id: str, fingerprint: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._memory.get(client_id)
+            if entry is None:
+                try:
+                    with open(self._path(client_id), "r", encoding="utf-8") as f:
+                        entry = json.load(f)
+                    self._memory[client_id] = entry
+                except (OSError, ValueError):
+                    entry = None
+
+            if entry is not None and entry.get("fingerprint") == fingerprint:
+                self.hits += 1
+                return entry["result"]
+            self.misses += 1
+            return None
+
+    def put(self, client_id: str, fingerprint: str, result: dict):
+        entry = {"fingerprint": fingerprint, "result": result}
+        with self._lock:
+            self._memory[client_id] = entry
+            try:
+                tmp_path = self._path(client_id) + ".tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(entry, f, default=str)
+                os.replace(tmp_path, self._path(client_id))
+            except OSError as e:
+                logger.error(f"Failed to persist prep pack cache for {client_id}: {e}")
+
+    def invalidate(self, client_id: str):
+        """Called by every writer of a client's data so the next prep pack is rebuilt."""
+        with self._lock:
+            self._memory.pop(client_id, None)
+            try:
+                os.remove(self._path(client_id))
+            except FileNotFoundError:
+                pass
+        logger.info(f"Prep pack cache invalidated for {client_id}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._memory)}
@@ -0,0 +1,73 @@
+"""
+Process-wide token bucket limiting how fast we send requests to Gemini.
+Shared by every agent so batch runs stay under the API quota.
+"""
+import logging
+import threading
+import time
+from typing import Optional
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited_seconds = 0.0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens: float = 1, timeout: Optional[float] = None) -> bool:
+        """Blocks until `tokens` are available. Returns False if `timeout` expires first."""
+        start = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    self.waited_seconds += now - start
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+            if timeout is not None and now - start + wait > timeout:
+                return False
+            time.sleep(wait)
+
+
+def _build_gemini_limiter() -> Optional[TokenBucket]:
+    rpm = Config.GEMINI_REQUESTS_PER_MINUTE
+    if rpm <= 0 or Config.LLM_PROVIDER != "gemini":
+        return None
+    return TokenBucket(rate=rpm / 60.0, capacity=max(1, Config.GEMINI_BURST))
+
+
+gemini_rate_limiter = _build_gemini_limiter()
+
+
+def share_gemini_limit(processes: int):
+    """Splits GEMINI_REQUESTS_PER_MINUTE between `processes` worker processes so their sum stays under the quota."""
+    if gemini_rate_limiter is None or processes <= 1:
+        return
+    gemini_rate_limiter.rate = Config.GEMINI_REQUESTS_PER_MINUTE / 60.0 / processes
+    gemini_rate_limiter.capacity = max(1, Config.GEMINI_BURST // processes)
+    gemini_rate_limiter._tokens = min(gemini_rate_limiter._tokens, gemini_rate_limiter.capacity)
+
+
+def acquire_gemini_slot(agent_name: str):
+    """Waits for permission to send one Gemini request (no-op when GEMINI_REQUESTS_PER_MINUTE=0)."""
+    if gemini_rate_limiter is None:
+        return
+    start = time.monotonic()
+    gemini_rate_limiter.acquire()
+    waited = time.monotonic() - start
+    if waited > 0.5:
+        logger.info(f"Agent {agent_name} waited {waited:.1f}s for the Gemini rate limit.")
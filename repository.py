@@ -0,0 +1,469 @@
+"""
+Client data repository.
+One interface over the client store, with two backends:
+- JsonClientRepository: the historical data/fake_clients/<client_id>/*.json layout
+  (new interactions go to an append-only interactions_log.jsonl journal)
+- SqliteClientRepository: indexed tables (interactions, reminders, case history, tasks, documents)
+
+Migrate the fixtures once with:
+    python repository.py migrate --source data/fake_clients --db data/clients.sqlite
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from config import Config
+from fixture_cache import fixture_cache
+from interaction_journal import InteractionJournal
+
+logger = logging.getLogger(__name__)
+
+CLIENT_FILES = [
+    "crm_profile",
+    "account_summary",
+    "products_owned",
+    "interactions_log",
+    "document_vault_index",
+    "client_case",
+    "centrale_des_risques"
+]
+
+
+class ClientRepository(ABC):
+    """Storage interface used by the tools, the orchestrator and the API."""
+
+    def reopen(self):
+        """Reopens connections in a worker process forked after preloading (nothing to do for files)."""
+
+    @abstractmethod
+    def exists(self, client_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    def list_clients(self) -> list:
+        ...
+
+    @abstractmethod
+    def get_client_data(self, client_id: str) -> dict:
+        """All fixtures for a client, keyed like CLIENT_FILES ({} for missing ones)."""
+
+    @abstractmethod
+    def get_profile(self, client_id: str) -> dict:
+        """CRM profile only ({} if missing), for lookups over the whole portfolio."""
+
+    @abstractmethod
+    def profile_fingerprint(self, client_id: str) -> str:
+        """Cheap value that changes when the client's CRM profile may have changed."""
+
+    @abstractmethod
+    def fingerprint(self, client_id: str) -> str:
+        """Opaque value that changes whenever anything stored for the client changes."""
+
+    @abstractmethod
+    def get_interactions(self, client_id: str, limit: int = None) -> list:
+        """Most recent first."""
+
+    @abstractmethod
+    def add_interaction(self, client_id: str, entry: dict):
+        ...
+
+    @abstractmethod
+    def get_reminders(self, client_id: str) -> list:
+        ...
+
+    @abstractmethod
+    def add_reminder(self, client_id: str, reminder: dict):
+        ...
+
+    @abstractmethod
+    def get_case(self, client_id: str, fresh: bool = False) -> dict:
+        """fresh=True bypasses any read cache (read-modify-write)."""
+
+    @abstractmethod
+    def add_case_entry(self, client_id: str, history_entry: dict, new_tasks: list):
+        """Appends a case history entry and new tasks to the client case."""
+
+    @abstractmethod
+    def get_document_vault(self, client_id: str) -> dict:
+        ...
+
+    @abstractmethod
+    def save_document_vault(self, client_id: str, vault: dict):
+        ...
+
+
+class JsonClientRepository(ClientRepository):
+    """One directory per client, one JSON file per source (read and rewritten whole)."""
+
+    def __init__(self, base_path: str = Config.FAKE_DATA_PATH):
+        self.base_path = base_path
+        self._write_lock = threading.Lock()
+
+    def _path(self, client_id: str, name: str) -> str:
+        return os.path.join(self.base_path, client_id, f"{name}.json")
+
+    def _load(self, client_id: str, name: str, default, fresh: bool = False):
+        """Cached (shared, read-only) content; fresh=True re-reads the file for read-modify-write."""
+        return fixture_cache.load_json(self._path(client_id, name), default, group=client_id, fresh=fresh)
+
+    def _save(self, client_id: str, name: str, data):
+        path = self._path(client_id, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, default=str)
+        fixture_cache.invalidate(path=path)
+
+    def exists(self, client_id: str) -> bool:
+        return os.path.isdir(os.path.join(self.base_path, client_id))
+
+    def list_clients(self) -> list:
+        if not os.path.isdir(self.base_path):
+            return []
+        return sorted(d for d in os.listdir(self.base_path) if os.path.isdir(os.path.join(self.base_path, d)))
+
+    def get_client_data(self, client_id: str) -> dict:
+        base_path = os.path.join(self.base_path, client_id)
+        if not os.path.exists(base_path):
+            raise FileNotFoundError(f"Client data not found for {client_id} at {base_path}")
+        data = {}
+        for name in CLIENT_FILES:
+            if name == "interactions_log":
+                has_log = self._journal(client_id).exists() or os.path.exists(self._path(client_id, name))
+                data[name] = self.get_interactions(client_id, Config.INTERACTIONS_HISTORY_LIMIT) if has_log else {}
+            else:
+                data[name] = self._load(client_id, name, {})
+        return data
+
+    def get_profile(self, client_id: str) -> dict:
+        # Portfolio-wide scans bypass the fixture cache so they do not evict the hot clients
+        return self._load(client_id, "crm_profile", {}, fresh=True)
+
+    def profile_fingerprint(self, client_id: str) -> str:
+        try:
+            st = os.stat(self._path(client_id, "crm_profile"))
+        except FileNotFoundError:
+            return "missing"
+        return f"{st.st_mtime_ns}:{st.st_size}"
+
+    def fingerprint(self, client_id: str) -> str:
+        client_dir = os.path.join(self.base_path, client_id)
+        parts = []
+        if os.path.isdir(client_dir):
+            for name in sorted(os.listdir(client_dir)):
+                st = os.stat(os.path.join(client_dir, name))
+                parts.append(f"{name}:{st.st_mtime_ns}:{st.st_size}")
+        return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+    def _journal(self, client_id: str) -> InteractionJournal:
+        return InteractionJournal(os.path.join(self.base_path, client_id, "interactions_log.jsonl"))
+
+    def get_interactions(self, client_id: str, limit: int = None) -> list:
+        # New entries live in the append-only journal, older ones in the legacy JSON log
+        logs = list(self._journal(client_id).iter_recent(limit))
+        if limit and len(logs) >= limit:
+            return logs
+        legacy = self._load(client_id, "interactions_log", [])
+        logs += legacy[:limit - len(logs)] if limit else legacy
+        return logs
+
+    def add_interaction(self, client_id: str, entry: dict):
+        self._journal(client_id).append(entry)
+
+    def get_reminders(self, client_id: str) -> list:
+        return self._load(client_id, "reminders", [])
+
+    def add_reminder(self, client_id: str, reminder: dict):
+        with self._write_lock:
+            reminders = self._load(client_id, "reminders", [], fresh=True)
+            reminders.append(reminder)
+            self._save(client_id, "reminders", reminders)
+
+    def get_case(self, client_id: str, fresh: bool = False) -> dict:
+        empty_case = {"client_id": client_id, "case_history": [], "current_tasks": []}
+        return self._load(client_id, "client_case", empty_case, fresh=fresh)
+
+    def add_case_entry(self, client_id: str, history_entry: dict, new_tasks: list):
+        with self._write_lock:
+            case_file = self.get_case(client_id, fresh=True)
+            case_file.setdefault("case_history", []).append(history_entry)
+            case_file["current_tasks"] = case_file.get("current_tasks", []) + list(new_tasks)
+            self._save(client_id, "client_case", case_file)
+
+    def get_document_vault(self, client_id: str) -> dict:
+        # Callers update the vault in place before saving it: never hand out the cached object
+        return self._load(client_id, "document_vault_index", {}, fresh=True)
+
+    def save_document_vault(self, client_id: str, vault: dict):
+        with self._write_lock:
+            self._save(client_id, "document_vault_index", vault)
+
+
+class SqliteClientRepository(ClientRepository):
+    """Indexed SQLite store: appends are single-row inserts instead of whole-file rewrites."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS clients (
+        client_id TEXT PRIMARY KEY,
+        crm_profile TEXT, account_summary TEXT, products_owned TEXT, centrale_des_risques TEXT,
+        case_extra TEXT, version INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE TABLE IF NOT EXISTS interactions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, client_id TEXT NOT NULL, date TEXT, data TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_interactions_client ON interactions(client_id, id);
+    CREATE TABLE IF NOT EXISTS reminders (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT, client_id TEXT NOT NULL,
+        due_date TEXT, status TEXT, data TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_reminders_client ON reminders(client_id, seq);
+    CREATE TABLE IF NOT EXISTS case_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, client_id TEXT NOT NULL, date TEXT, data TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_case_history_client ON case_history(client_id, id);
+    CREATE TABLE IF NOT EXISTS tasks (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT, client_id TEXT NOT NULL,
+        status TEXT, due_date TEXT, data TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_tasks_client ON tasks(client_id, seq);
+    CREATE TABLE IF NOT EXISTS documents (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, client_id TEXT NOT NULL, category TEXT NOT NULL,
+        doc_name TEXT, status TEXT, expiry TEXT, data TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_documents_client ON documents(client_id, id);
+    """
+
+    def __init__(self, db_path: str = Config.CLIENT_DB_PATH):
+        self.db_path = db_path
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(self.SCHEMA)
+        self._db.commit()
+        self._lock = threading.Lock()
+
+    def reopen(self):
+        # A SQLite connection must not be shared with a forked process
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+
+    def _query(self, sql: str, params: tuple = ()) -> list:
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def _write(self, client_id: str, statements: list):
+        """Runs the statements in one transaction and bumps the client's version."""
+        with self._lock:
+            with self._db:
+                self._db.execute("INSERT OR IGNORE INTO clients (client_id) VALUES (?)", (client_id,))
+                for sql, params in statements:
+                    self._db.execute(sql, params)
+                self._db.execute("UPDATE clients SET version = version + 1 WHERE client_id = ?", (client_id,))
+
+    @staticmethod
+    def _loads(value, default):
+        return json.loads(value) if value else default
+
+    def exists(self, client_id: str) -> bool:
+        return bool(self._query("SELECT 1 FROM clients WHERE client_id = ?", (client_id,)))
+
+    def list_clients(self) -> list:
+        return [row[0] for row in self._query("SELECT client_id FROM clients ORDER BY client_id")]
+
+    def get_client_data(self, client_id: str) -> dict:
+        rows = self._query(
+            "SELECT crm_profile, account_summary, products_owned, centrale_des_risques FROM clients WHERE client_id = ?",
+            (client_id,)
+        )
+        if not rows:
+            raise FileNotFoundError(f"Client data not found for {client_id} in {self.db_path}")
+        crm, account, products, cdr = rows[0]
+        return {
+            "crm_profile": self._loads(crm, {}),
+            "account_summary": self._loads(account, {}),
+            "products_owned": self._loads(products, {}),
+            "interactions_log": self.get_interactions(client_id, Config.INTERACTIONS_HISTORY_LIMIT),
+            "document_vault_index": self.get_document_vault(client_id),
+            "client_case": self.get_case(client_id) if self._has_case(client_id) else {},
+            "centrale_des_risques": self._loads(cdr, {})
+        }
+
+    def get_profile(self, client_id: str) -> dict:
+        rows = self._query("SELECT crm_profile FROM clients WHERE client_id = ?", (client_id,))
+        return self._loads(rows[0][0], {}) if rows else {}
+
+    def profile_fingerprint(self, client_id: str) -> str:
+        return self.fingerprint(client_id)
+
+    def fingerprint(self, client_id: str) -> str:
+        rows = self._query("SELECT version FROM clients WHERE client_id = ?", (client_id,))
+        return f"{self.db_path}:{client_id}:{rows[0][0] if rows else 'missing'}"
+
+    def get_interactions(self, client_id: str, limit: int = None) -> list:
+        sql = "SELECT data FROM interactions WHERE client_id = ? ORDER BY id DESC"
+        params = (client_id,)
+        if limit:
+            sql += " LIMIT ?"
+            params += (limit,)
+        return [json.loads(row[0]) for row in self._query(sql, params)]
+
+    def add_interaction(self, client_id: str, entry: dict):
+        self._write(client_id, [(
+            "INSERT INTO interactions (client_id, date, data) VALUES (?, ?, ?)",
+            (client_id, entry.get("date"), json.dumps(entry, default=str))
+        )])
+
+    def get_reminders(self, client_id: str) -> list:
+        rows = self._query("SELECT data FROM reminders WHERE client_id = ? ORDER BY seq", (client_id,))
+        return [json.loads(row[0]) for row in rows]
+
+    def add_reminder(self, client_id: str, reminder: dict):
+        self._write(client_id, [(
+            "INSERT INTO reminders (id, client_id, due_date, status, data) VALUES (?, ?, ?, ?, ?)",
+            (reminder.get("id"), client_id, reminder.get("due_date"), reminder.get("status"),
+             json.dumps(reminder, default=str))
+        )])
+
+    def _has_case(self, client_id: str) -> bool:
+        rows = self._query(
+            "SELECT case_extra IS NOT NULL OR EXISTS (SELECT 1 FROM case_history WHERE client_id = ?) "
+            "OR EXISTS (SELECT 1 FROM tasks WHERE client_id = ?) FROM clients WHERE client_id = ?",
+            (client_id, client_id, client_id)
+        )
+        return bool(rows and rows[0][0])
+
+    def get_case(self, client_id: str, fresh: bool = False) -> dict:
+        extra = self._query("SELECT case_extra FROM clients WHERE client_id = ?", (client_id,))
+        case_file = {"client_id": client_id}
+        case_file["case_history"] = [
+            json.loads(row[0]) for row in
+            self._query("SELECT data FROM case_history WHERE client_id = ? ORDER BY id", (client_id,))
+        ]
+        case_file["current_tasks"] = [
+            json.loads(row[0]) for row in
+            self._query("SELECT data FROM tasks WHERE client_id = ? ORDER BY seq", (client_id,))
+        ]
+        if extra and extra[0][0]:
+            case_file.update(json.loads(extra[0][0]))
+        return case_file
+
+    def add_case_entry(self, client_id: str, history_entry: dict, new_tasks: list):
+        statements = [(
+            "INSERT INTO case_history (client_id, date, data) VALUES (?, ?, ?)",
+            (client_id, history_entry.get("date"), json.dumps(history_entry, default=str))
+        )]
+        for task in new_tasks:
+            statements.append((
+                "INSERT INTO tasks (id, client_id, status, due_date, data) VALUES (?, ?, ?, ?, ?)",
+                (task.get("id"), client_id, task.get("status"), task.get("due_date"), json.dumps(task, default=str))
+            ))
+        self._write(client_id, statements)
+
+    def get_document_vault(self, client_id: str) -> dict:
+        vault = {}
+        rows = self._query("SELECT category, data FROM documents WHERE client_id = ? ORDER BY id", (client_id,))
+        for category, data in rows:
+            vault.setdefault(category, []).append(json.loads(data))
+        return vault
+
+    def save_document_vault(self, client_id: str, vault: dict):
+        statements = [("DELETE FROM documents WHERE client_id = ?", (client_id,))]
+        for category, docs in vault.items():
+            for doc in docs if isinstance(docs, list) else []:
+                statements.append((
+                    "INSERT INTO documents (client_id, category, doc_name, status, expiry, data) VALUES (?, ?, ?, ?, ?, ?)",
+                    (client_id, category, doc.get("doc_name"), doc.get("status"), doc.get("expiry"),
+                     json.dumps(doc, default=str))
+                ))
+        self._write(client_id, statements)
+
+    def import_client(self, client_id: str, data: dict, reminders: list):
+        """Loads one client's JSON fixtures (replacing anything stored for that client)."""
+        case_file = data.get("client_case") or {}
+        case_extra = {k: v for k, v in case_file.items() if k not in ("client_id", "case_history", "current_tasks")}
+        statements = [(sql, (client_id,)) for sql in (
+            "DELETE FROM interactions WHERE client_id = ?",
+            "DELETE FROM reminders WHERE client_id = ?",
+            "DELETE FROM case_history WHERE client_id = ?",
+            "DELETE FROM tasks WHERE client_id = ?",
+        )]
+        statements.append((
+            "UPDATE clients SET crm_profile = ?, account_summary = ?, products_owned = ?, "
+            "centrale_des_risques = ?, case_extra = ? WHERE client_id = ?",
+            (json.dumps(data.get("crm_profile") or {}), json.dumps(data.get("account_summary") or {}),
+             json.dumps(data.get("products_owned") or []), json.dumps(data.get("centrale_des_risques") or {}),
+             json.dumps(case_extra) if case_file else None, client_id)
+        ))
+        # Stored oldest first so that ORDER BY id DESC gives the log's newest-first order
+        for entry in reversed(data.get("interactions_log") or []):
+            statements.append((
+                "INSERT INTO interactions (client_id, date, data) VALUES (?, ?, ?)",
+                (client_id, entry.get("date"), json.dumps(entry, default=str))
+            ))
+        for entry in case_file.get("case_history", []):
+            statements.append((
+                "INSERT INTO case_history (client_id, date, data) VALUES (?, ?, ?)",
+                (client_id, entry.get("date"), json.dumps(entry, default=str))
+            ))
+        for task in case_file.get("current_tasks", []):
+            statements.append((
+                "INSERT INTO tasks (id, client_id, status, due_date, data) VALUES (?, ?, ?, ?, ?)",
+                (task.get("id"), client_id, task.get("status"), task.get("due_date"), json.dumps(task, default=str))
+            ))
+        for reminder in reminders:
+            statements.append((
+                "INSERT INTO reminders (id, client_id, due_date, status, data) VALUES (?, ?, ?, ?, ?)",
+                (reminder.get("id"), client_id, reminder.get("due_date"), reminder.get("status"),
+                 json.dumps(reminder, default=str))
+            ))
+        self._write(client_id, statements)
+        self.save_document_vault(client_id, data.get("document_vault_index") or {})
+
+
+def migrate_json_to_sqlite(source_path: str = Config.FAKE_DATA_PATH, db_path: str = Config.CLIENT_DB_PATH) -> int:
+    """One-shot migration of data/fake_clients into the SQLite store. Returns the number of clients."""
+    source = JsonClientRepository(source_path)
+    target = SqliteClientRepository(db_path)
+    clients = source.list_clients()
+    for client_id in clients:
+        data = source.get_client_data(client_id)
+        data["interactions_log"] = source.get_interactions(client_id)  # full history, not just the recent window
+        target.import_client(client_id, data, source.get_reminders(client_id))
+        logger.info(f"Migrated {client_id}")
+    return len(clients)
+
+
+_repository = None
+_repository_lock = threading.Lock()
+
+
+def get_repository() -> ClientRepository:
+    """Process-wide repository selected by Config.CLIENT_STORE ("json" or "sqlite")."""
+    global _repository
+    if _repository is None:
+        with _repository_lock:
+            if _repository is None:
+                if Config.CLIENT_STORE == "sqlite":
+                    _repository = SqliteClientRepository(Config.CLIENT_DB_PATH)
+                else:
+                    _repository = JsonClientRepository(Config.FAKE_DATA_PATH)
+    return _repository
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Client repository tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("migrate", help="copy data/fake_clients into the SQLite store")
+    p.add_argument("--source", default=Config.FAKE_DATA_PATH)
+    p.add_argument("--db", default=Config.CLIENT_DB_PATH)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    count = migrate_json_to_sqlite(args.source, args.db)
+    print(f"Migrated {count} clients into {args.db}. Set CLIENT_STORE=sqlite to use it.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,12 @@
 """
 Run DONNA Telegram Bot
 This starts the bidirectional Telegram bot that can receive commands and send notifications
+(long polling, or a webhook server when TELEGRAM_WEBHOOK_URL is set)
 """
 import logging
 import os
 from dotenv import load_dotenv
+from config import Config
 from telegram_bot import DONNATelegramBot
 
 # Load environment variables
@@ -31,7 +33,10 @@ def main():
     logger.info(f"API Base URL: {api_base_url}")
     
     bot = DONNATelegramBot(bot_token, api_base_url)
-    bot.run_sync()  # Use synchronous runner
+    if Config.TELEGRAM_WEBHOOK_URL:
+        bot.run_webhook(Config.TELEGRAM_WEBHOOK_URL)  # Telegram pushes updates; workers can sit behind a proxy
+    else:
+        bot.run_sync()  # Use synchronous runner
 
 if __name__ == "__main__":
     try:
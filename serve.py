@@ -0,0 +1,131 @@
+"""
+Production server for the API (app.py):
+    python serve.py [--workers 4] [--threads 8] [--port 5000]
+
+app.py is imported once in the gunicorn master (preload): the orchestrator, agents, model objects,
+fixture cache and client directory are built there and shared copy-on-write by the forked gthread
+workers. Each worker then opens its own SQLite connections, gRPC clients and job worker threads
+(app.start_worker_process). On SIGTERM, workers stop accepting connections and stop claiming background
+jobs; in-flight requests (prep packs included) and running jobs then drain side by side, and queued
+Telegram notifications are flushed, all within SERVE_GRACEFUL_TIMEOUT (after which gunicorn kills the
+worker; its unfinished jobs are re-queued when their lease expires).
+
+Without gunicorn (e.g. on Windows) the app runs in a single-process threaded Werkzeug server,
+with the same drain on SIGTERM / Ctrl+C.
+"""
+import argparse
+import logging
+import signal
+import threading
+from config import Config
+
+try:
+    from gunicorn.app.base import BaseApplication
+    from gunicorn.workers.gthread import ThreadWorker
+except ImportError:  # Windows, or gunicorn not installed
+    BaseApplication = None
+
+logger = logging.getLogger(__name__)
+
+
+def load_app(preload: bool, workers: int = 1):
+    """Imports app.py (building the orchestrator and agents) and warms its caches."""
+    Config.PRELOAD_APP = preload
+    if workers > 1 and Config.SESSION_STORE == "memory":
+        # In-process sessions would be split between workers: a banker's next message may reach another one
+        logger.warning("SESSION_STORE=memory with several workers: using the SQLite session store instead")
+        Config.SESSION_STORE = "sqlite"
+    import app as api
+    api.warm_caches()
+    return api
+
+
+if BaseApplication is not None:
+    class DrainingThreadWorker(ThreadWorker):
+        """gthread worker that starts the background job drain as soon as it receives SIGTERM."""
+
+        def handle_exit(self, sig, frame):
+            import app as api
+            api.begin_worker_shutdown(self.cfg.graceful_timeout)
+            super().handle_exit(sig, frame)
+
+    class GunicornServer(BaseApplication):
+        """gunicorn configured in code, with app.py preloaded in the master process."""
+
+        def __init__(self, options: dict):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return load_app(preload=True, workers=self.options["workers"]).app
+
+
+def serve_gunicorn(host: str, port: int, workers: int, threads: int, graceful_timeout: float, timeout: float):
+    def post_fork(server, worker):
+        import app as api
+        api.start_worker_process(workers)
+
+    def worker_exit(server, worker):
+        import app as api
+        api.stop_worker_process(graceful_timeout)
+
+    GunicornServer({
+        "bind": f"{host}:{port}",
+        "workers": workers,
+        "worker_class": DrainingThreadWorker,
+        "threads": threads,
+        "preload_app": True,
+        "graceful_timeout": int(graceful_timeout),
+        "timeout": int(timeout),
+        "post_fork": post_fork,
+        "worker_exit": worker_exit,
+    }).run()
+
+
+def serve_werkzeug(host: str, port: int, graceful_timeout: float):
+    from werkzeug.serving import make_server
+
+    api = load_app(preload=False)
+    server = make_server(host, port, api.app, threaded=True)
+    server.daemon_threads = False  # server_close() then waits for in-flight requests
+
+    def stop(signum, frame):
+        logger.info("Shutting down: finishing in-flight requests")
+        api.begin_worker_shutdown(graceful_timeout)
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    logger.info(f"Serving on http://{host}:{port} (threaded Werkzeug, gunicorn unavailable)")
+    server.serve_forever()
+    server.server_close()
+    api.stop_worker_process(graceful_timeout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=Config.SERVE_HOST)
+    parser.add_argument("--port", type=int, default=Config.SERVE_PORT)
+    parser.add_argument("--workers", type=int, default=Config.SERVE_WORKERS)
+    parser.add_argument("--threads", type=int, default=Config.SERVE_THREADS, help="threads per worker")
+    parser.add_argument("--graceful-timeout", type=float, default=Config.SERVE_GRACEFUL_TIMEOUT)
+    parser.add_argument("--timeout", type=float, default=Config.SERVE_TIMEOUT, help="silent worker restart (s)")
+    parser.add_argument("--server", choices=["auto", "gunicorn", "werkzeug"], default="auto")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.server == "gunicorn" and BaseApplication is None:
+        parser.error("gunicorn is not installed")
+    if BaseApplication is not None and args.server != "werkzeug":
+        serve_gunicorn(args.host, args.port, max(1, args.workers), max(1, args.threads),
+                       args.graceful_timeout, args.timeout)
+    else:
+        serve_werkzeug(args.host, args.port, args.graceful_timeout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Conversation sessions for /chat: {"history": [...], "state": {...}, "summary": "..."} per session id.
+Sessions are evicted after SESSION_TTL_SECONDS of inactivity and beyond SESSION_MAX_SESSIONS (least
+recently used first). Each history keeps the last SESSION_HISTORY_LIMIT messages; older turns are folded
+into a short text summary, sent with the /chat intent prompt (ConversationAgent).
+
+SESSION_STORE=memory keeps sessions in-process; SESSION_STORE=sqlite stores them in SESSION_SQLITE_PATH,
+so they survive restarts and are shared by every worker process.
+"""
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_MAX_CHARS = 2000
+SUMMARY_TURN_CHARS = 160
+
+
+def new_session() -> dict:
+    return {"history": [], "state": {}, "summary": ""}
+
+
+def compact_history(session: dict, limit: int) -> int:
+    """Keeps the last `limit` messages and folds older ones into session["summary"]. Returns messages folded."""
+    history = session.get("history", [])
+    overflow = len(history) - limit
+    if limit <= 0 or overflow <= 0:
+        return 0
+    folded = [f"{m.get('role', 'user')}: {str(m.get('content', ''))[:SUMMARY_TURN_CHARS]}" for m in history[:overflow]]
+    summary = "\n".join(filter(None, [session.get("summary", "")] + folded))
+    session["summary"] = summary[-SUMMARY_MAX_CHARS:]  # keep the most recent part of the summary
+    del history[:overflow]
+    return overflow
+
+
+class SessionStore:
+    """In-memory LRU of sessions with idle TTL."""
+
+    def __init__(self, max_sessions: int = 1000, ttl_seconds: float = 3600, history_limit: int = 20):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.history_limit = history_limit
+        self._sessions = OrderedDict()  # session_id -> (last_access, session)
+        self._lock = threading.Lock()
+        self._stats = {"created": 0, "expired": 0, "evictions": 0, "compacted_messages": 0}
+
+    def reopen(self):
+        """Fresh lock (and connection) for a worker process forked after preloading."""
+        self._lock = threading.Lock()
+
+    def _expired(self, last_access: float, now: float) -> bool:
+        return bool(self.ttl_seconds) and now - last_access > self.ttl_seconds
+
+    def get(self, session_id: str) -> dict:
+        """The session, or a new empty one if it never existed or has expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is not None and not self._expired(entry[0], now):
+                self._sessions[session_id] = (now, entry[1])
+                self._sessions.move_to_end(session_id)
+                return entry[1]
+            if entry is not None:
+                del self._sessions[session_id]
+                self._stats["expired"] += 1
+            self._stats["created"] += 1
+            return new_session()
+
+    def save(self, session_id: str, session: dict):
+        """Stores the session after a turn, compacting its history and evicting idle or surplus sessions."""
+        now = time.time()
+        with self._lock:
+            self._stats["compacted_messages"] += compact_history(session, self.history_limit)
+            self._sessions[session_id] = (now, session)
+            self._sessions.move_to_end(session_id)
+            self._evict(now)
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+
+    def _evict(self, now: float):
+        # Oldest entries first: stop at the first one still fresh
+        while self._sessions:
+            session_id, (last_access, _) = next(iter(self._sessions.items()))
+            if self._expired(last_access, now):
+                self._stats["expired"] += 1
+            elif len(self._sessions) > self.max_sessions:
+                self._stats["evictions"] += 1
+            else:
+                break
+            del self._sessions[session_id]
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["sessions"] = len(self._sessions)
+        stats["backend"] = "memory"
+        return stats
+
+
+class SqliteSessionStore(SessionStore):
+    """Sessions in a SQLite file (one JSON row per session), shared across processes and restarts."""
+
+    def __init__(self, sqlite_path: str, max_sessions: int = 1000, ttl_seconds: float = 3600, history_limit: int = 20):
+        super().__init__(max_sessions, ttl_seconds, history_limit)
+        self.sqlite_path = sqlite_path
+        self._connect()
+
+    def _connect(self):
+        self._db = sqlite3.connect(self.sqlite_path, check_same_thread=False, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS chat_sessions ("
+            "session_id TEXT PRIMARY KEY, data TEXT NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_chat_sessions_access ON chat_sessions(last_access)")
+        self._db.commit()
+
+    def reopen(self):
+        super().reopen()
+        self._connect()
+
+    def get(self, session_id: str) -> dict:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT data, last_access FROM chat_sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is not None and not self._expired(row[1], now):
+                return json.loads(row[0])
+            if row is not None:
+                self._db.execute("DELETE FROM chat_sessions WHERE session_id = ?", (session_id,))
+                self._db.commit()
+                self._stats["expired"] += 1
+            self._stats["created"] += 1
+            return new_session()
+
+    def save(self, session_id: str, session: dict):
+        now = time.time()
+        with self._lock:
+            self._stats["compacted_messages"] += compact_history(session, self.history_limit)
+            self._db.execute(
+                "INSERT OR REPLACE INTO chat_sessions (session_id, data, last_access) VALUES (?, ?, ?)",
+                (session_id, json.dumps(session, ensure_ascii=False, default=str), now)
+            )
+            self._evict(now)
+            self._db.commit()
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._db.execute("DELETE FROM chat_sessions WHERE session_id = ?", (session_id,))
+            self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM chat_sessions")
+            self._db.commit()
+
+    def _evict(self, now: float):
+        if self.ttl_seconds:
+            expired = self._db.execute(
+                "DELETE FROM chat_sessions WHERE last_access < ?", (now - self.ttl_seconds,)
+            ).rowcount
+            self._stats["expired"] += expired
+        overflow = self._db.execute("SELECT COUNT(*) FROM chat_sessions").fetchone()[0] - self.max_sessions
+        if overflow > 0:
+            self._db.execute(
+                "DELETE FROM chat_sessions WHERE session_id IN "
+                "(SELECT session_id FROM chat_sessions ORDER BY last_access LIMIT ?)",
+                (overflow,)
+            )
+            self._stats["evictions"] += overflow
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["sessions"] = self._db.execute("SELECT COUNT(*) FROM chat_sessions").fetchone()[0]
+        stats["backend"] = "sqlite"
+        return stats
+
+
+_session_store = None
+_store_lock = threading.Lock()
+
+
+def get_session_store() -> SessionStore:
+    """Process-wide store selected by Config.SESSION_STORE ("memory" or "sqlite")."""
+    global _session_store
+    if _session_store is None:
+        with _store_lock:
+            if _session_store is None:
+                settings = dict(max_sessions=Config.SESSION_MAX_SESSIONS, ttl_seconds=Config.SESSION_TTL_SECONDS,
+                                history_limit=Config.SESSION_HISTORY_LIMIT)
+                if Config.SESSION_STORE == "sqlite":
+                    _session_store = SqliteSessionStore(Config.SESSION_SQLITE_PATH, **settings)
+                else:
+                    _session_store = SessionStore(**settings)
+    return _session_store
+
+
+def set_session_store(store: Optional[SessionStore]):
+    """Plugs in another store (anything with get/save/delete/stats). None resets to the default."""
+    global _session_store
+    with _store_lock:
+        _session_store = store
@@ -2,22 +2,89 @@
 Bidirectional Telegram Bot for DONNA Banking Assistant
 - Sends prep pack notifications to bankers
 - Receives and processes natural language commands from bankers
+
+Updates are handled concurrently (up to TELEGRAM_MAX_CONCURRENT_UPDATES), one at a time per chat,
+and /chat is called through a pooled async HTTP client, so a slow prep pack for one banker never
+stalls the others. Runs with long polling, or as a webhook server (TELEGRAM_WEBHOOK_URL) so several
+bot workers can share the load behind a reverse proxy.
 """
 import asyncio
 import logging
-import requests
+import time
+import httpx
 from telegram import Update, Bot
-from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
+from telegram.ext import (
+    Application, BaseUpdateProcessor, CommandHandler, MessageHandler, filters, ContextTypes
+)
+from config import Config
 
 logger = logging.getLogger(__name__)
 
+TYPING_REFRESH_SECONDS = 4  # Telegram shows "typing..." for 5 seconds per chat action
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Processes up to `max_concurrent_updates` updates at once, but one at a time per chat, in arrival order."""
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        self._chat_locks = {}  # chat_id -> [lock, updates waiting or running]
+
+    async def process_update(self, update: object, coroutine) -> None:
+        chat = getattr(update, "effective_chat", None)
+        if chat is None:
+            await super().process_update(update, coroutine)
+            return
+        # The chat lock is taken before a concurrency slot, so a busy chat's backlog does not hold slots
+        entry = self._chat_locks.setdefault(chat.id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                await super().process_update(update, coroutine)
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._chat_locks[chat.id]
+
+    async def do_process_update(self, update: object, coroutine) -> None:
+        await coroutine
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+
 class DONNATelegramBot:
     """Bidirectional Telegram bot for banking operations"""
     
-    def __init__(self, bot_token: str, api_base_url: str = "http://localhost:5000"):
+    def __init__(self, bot_token: str, api_base_url: str = "http://localhost:5000",
+                 max_concurrent_updates: int = None, api_timeout: float = None, progress_after: float = None):
         self.bot_token = bot_token
         self.api_base_url = api_base_url
+        self.max_concurrent_updates = max_concurrent_updates or Config.TELEGRAM_MAX_CONCURRENT_UPDATES
+        self.api_timeout = api_timeout or Config.TELEGRAM_API_TIMEOUT_SECONDS
+        self.progress_after = Config.TELEGRAM_PROGRESS_AFTER_SECONDS if progress_after is None else progress_after
         self.application = None
+        self._http = None
+
+    def _http_client(self) -> httpx.AsyncClient:
+        """One pooled client for every /chat call (created on the bot's event loop)."""
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                base_url=self.api_base_url,
+                timeout=httpx.Timeout(self.api_timeout, connect=5.0),
+                limits=httpx.Limits(max_connections=self.max_concurrent_updates,
+                                    max_keepalive_connections=self.max_concurrent_updates)
+            )
+        return self._http
+
+    async def close(self, application: Application = None):
+        """Closes the HTTP client (post_shutdown hook)."""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
         
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handler for /start command"""
@@ -67,26 +134,27 @@ Speak naturally, I understand French and English! 🤖
         user_message = update.message.text
         chat_id = update.message.chat_id
         
-        # Show typing indicator
-        await update.message.chat.send_action(action="typing")
-        
         try:
-            # Call the /chat API endpoint
-            response = requests.post(
-                f"{self.api_base_url}/chat",
+            # Call the /chat API endpoint, keeping the banker informed while it runs
+            request = asyncio.ensure_future(self._http_client().post(
+                "/chat",
                 json={
                     "message": user_message,
                     "session_id": f"telegram_{chat_id}"
-                },
-                timeout=30
-            )
+                }
+            ))
+            progress = await self._wait_with_progress(update, request)
+            response = request.result()
             
             if response.status_code == 200:
                 data = response.json()
                 
-                # Send AI response
+                # Send AI response (in place of the progress message, if one was sent)
                 ai_response = data.get("response", "Sorry, I didn't understand.")
-                await update.message.reply_text(ai_response)
+                if progress is not None:
+                    await progress.edit_text(ai_response)
+                else:
+                    await update.message.reply_text(ai_response)
                 
                 # If action was executed, send confirmation
                 if data.get("action_executed"):
@@ -96,16 +164,31 @@ Speak naturally, I understand French and English! 🤖
                 error_msg = response.json().get("error", "Unknown error")
                 await update.message.reply_text(f"❌ Error: {error_msg}")
                 
-        except requests.exceptions.Timeout:
+        except httpx.TimeoutException:
             await update.message.reply_text("⏱️ Request timeout. Please try again.")
         except Exception as e:
             logger.error(f"Error processing message: {e}", exc_info=True)
             await update.message.reply_text("❌ An error occurred. Please try again.")
+
+    async def _wait_with_progress(self, update: Update, request: asyncio.Future):
+        """Shows "typing..." until the request completes; past `progress_after` seconds, also posts a progress message (returned)."""
+        progress_at = time.monotonic() + self.progress_after
+        progress = None
+        while not request.done():
+            try:
+                await update.message.chat.send_action(action="typing")
+                if progress is None and time.monotonic() >= progress_at:
+                    progress = await update.message.reply_text("⏳ Working on it, this can take a minute...")
+            except Exception as e:
+                logger.warning(f"Could not send progress to chat {update.message.chat_id}: {e}")
+            wait = TYPING_REFRESH_SECONDS if progress else min(TYPING_REFRESH_SECONDS, progress_at - time.monotonic())
+            await asyncio.wait({request}, timeout=max(0.05, wait))
+        return progress
     
     async def send_notification(self, chat_id: str, message: str):
         """Send notification to user (for prep pack results)"""
         try:
-            bot = Bot(token=self.bot_token)
+            bot = self.application.bot if self.application else Bot(token=self.bot_token)
             await bot.send_message(
                 chat_id=chat_id,
                 text=message,
@@ -125,24 +208,61 @@ Speak naturally, I understand French and English! 🤖
             MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_message)
         )
     
+    def build_application(self) -> Application:
+        """Application with the bot's handlers, concurrent per-chat-ordered updates and the pooled HTTP client"""
+        self.application = (
+            Application.builder()
+            .token(self.bot_token)
+            .concurrent_updates(ChatOrderedUpdateProcessor(self.max_concurrent_updates))
+            .post_shutdown(self.close)
+            .build()
+        )
+        self.setup_handlers()
+        return self.application
+
     def run_sync(self):
         """Start the bot with polling (synchronous - Windows compatible)"""
-        self.application = Application.builder().token(self.bot_token).build()
-        self.setup_handlers()
+        self.build_application()
         
         logger.info("🤖 DONNA Telegram Bot started!")
         logger.info("Press Ctrl+C to stop")
         
         # Use run_polling which handles its own event loop
         self.application.run_polling(allowed_updates=Update.ALL_TYPES)
+
+    def run_webhook(self, webhook_url: str, listen: str = None, port: int = None, secret_token: str = None):
+        """
+        Start the bot as a webhook server (needs python-telegram-bot[webhooks]).
+        Telegram POSTs updates to `webhook_url`; several workers can serve it behind a reverse proxy.
+        Per-chat ordering holds within a worker, so route by chat where the proxy allows it.
+        """
+        self.build_application()
+        url_path = httpx.URL(webhook_url).path.lstrip("/")
+        
+        logger.info(f"🤖 DONNA Telegram Bot started (webhook {webhook_url})")
+        self.application.run_webhook(
+            listen=listen or Config.TELEGRAM_WEBHOOK_LISTEN,
+            port=port or Config.TELEGRAM_WEBHOOK_PORT,
+            url_path=url_path,
+            webhook_url=webhook_url,
+            secret_token=secret_token or Config.TELEGRAM_WEBHOOK_SECRET,
+            allowed_updates=Update.ALL_TYPES
+        )
     
     async def run(self):
         """Start the bot with polling (async version)"""
-        self.application = Application.builder().token(self.bot_token).build()
-        self.setup_handlers()
+        self.build_application()
         
         logger.info("🤖 DONNA Telegram Bot started!")
-        await self.application.run_polling(allowed_updates=Update.ALL_TYPES)
+        async with self.application:
+            await self.application.start()
+            await self.application.updater.start_polling(allowed_updates=Update.ALL_TYPES)
+            try:
+                await asyncio.Event().wait()
+            finally:
+                await self.application.updater.stop()
+                await self.application.stop()
+                await self.close()
 
 # Singleton for sending notifications
 _bot_instance = None
@@ -1,55 +1,237 @@
 """
-Telegram Bot Notifier for sending prep packs to bankers' phones
+Telegram Bot Notifier for sending prep packs to bankers' phones.
+
+Messages go through a TelegramDispatcher: one background thread running one event loop with a
+reused Bot (and its HTTP connection pool). send_prep_pack only enqueues, so /prep-pack never waits
+on Telegram. Long reports are split into several 4096-char messages, each chat is paced under
+Telegram's flood limits, and failed sends are retried with backoff.
 """
 import asyncio
+import atexit
 import logging
+import random
+import threading
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional
+from telegram import Bot
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter
 from config import Config
-from telegram_bot import send_telegram_notification
 
 logger = logging.getLogger(__name__)
 
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+
+def split_message(text: str, limit: int = TELEGRAM_MESSAGE_LIMIT) -> list:
+    """Splits text into parts of at most `limit` chars, at paragraph, then line, then word boundaries."""
+    parts = []
+    text = text.strip()
+    while len(text) > limit:
+        window = text[:limit]
+        cut = max(window.rfind("\n\n"), 0) or max(window.rfind("\n"), 0) or max(window.rfind(" "), 0) or limit
+        parts.append(text[:cut].rstrip())
+        text = text[cut:].lstrip()
+    if text:
+        parts.append(text)
+    return parts
+
+
+def _seconds(delay) -> float:
+    return delay.total_seconds() if hasattr(delay, "total_seconds") else float(delay)
+
+
+class TelegramDispatcher:
+    """Bounded outbound queue drained by a background event loop, in order per chat."""
+
+    def __init__(self, bot_token: str = None, send: Callable[..., Awaitable] = None,
+                 max_queue: int = None, chat_interval: float = None, group_interval: float = None,
+                 global_rate: float = None, max_attempts: int = None):
+        """`send(chat_id, text, parse_mode)` replaces the Bot (benchmarks, tests)."""
+        self.bot_token = bot_token
+        self._send_override = send
+        self.max_queue = Config.TELEGRAM_QUEUE_SIZE if max_queue is None else max_queue
+        self.chat_interval = Config.TELEGRAM_CHAT_INTERVAL_SECONDS if chat_interval is None else chat_interval
+        self.group_interval = Config.TELEGRAM_GROUP_INTERVAL_SECONDS if group_interval is None else group_interval
+        self.global_rate = Config.TELEGRAM_MESSAGES_PER_SECOND if global_rate is None else global_rate
+        self.max_attempts = max(1, Config.TELEGRAM_MAX_ATTEMPTS if max_attempts is None else max_attempts)
+        self._bot = None
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pending = 0  # messages accepted and not yet sent or given up
+        self._chats = {}  # chat_id -> deque of (text, parse_mode), drained by one task per chat
+        self._next_chat_slot = {}  # chat_id -> monotonic time of its next allowed send
+        self._next_global_slot = 0.0
+        self._stats = {"queued": 0, "sent": 0, "failed": 0, "dropped": 0, "retries": 0, "plain_text_fallbacks": 0}
+
+    # --- Producer side (any thread) ---
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._loop.run_forever, name="telegram-dispatcher", daemon=True)
+            self._thread.start()
+        atexit.register(self.close)
+
+    def reopen(self):
+        """Forgets the parent's event loop in a worker process forked after preloading (restarted on the next submit)."""
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._thread, self._loop, self._bot = None, None, None
+        self._pending = 0
+        self._chats, self._next_chat_slot = {}, {}
+
+    def submit(self, chat_id, text: str, parse_mode: Optional[str] = "Markdown") -> bool:
+        """Queues `text` (split into 4096-char messages) for `chat_id`. False if the queue is full."""
+        parts = split_message(text)
+        with self._lock:
+            if self._pending + len(parts) > self.max_queue:
+                self._stats["dropped"] += len(parts)
+                logger.warning(f"Telegram queue full ({self._pending} pending), dropping message for {chat_id}")
+                return False
+            self._pending += len(parts)
+            self._stats["queued"] += len(parts)
+        self.start()
+        self._loop.call_soon_threadsafe(self._enqueue, str(chat_id), parts, parse_mode)
+        return True
+
+    def flush(self, timeout: float = None) -> bool:
+        """Waits until every queued message is sent or given up. False on timeout."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self, timeout: float = 5.0):
+        """Drains the queue (up to `timeout`) and stops the event loop."""
+        if self._thread is None:
+            return
+        if not self.flush(timeout):
+            logger.warning(f"Telegram dispatcher closed with {self._pending} unsent messages")
+        if self._bot is not None:
+            asyncio.run_coroutine_threadsafe(self._bot.shutdown(), self._loop).result(timeout)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        with self._lock:
+            self._thread, self._loop, self._bot = None, None, None
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending"] = self._pending
+        return stats
+
+    # --- Event loop side ---
+
+    def _enqueue(self, chat_id: str, parts: list, parse_mode: Optional[str]):
+        queue = self._chats.get(chat_id)
+        if queue is None:
+            queue = self._chats[chat_id] = deque()
+            self._loop.create_task(self._drain_chat(chat_id, queue))
+        queue.extend((part, parse_mode) for part in parts)
+
+    async def _drain_chat(self, chat_id: str, queue: deque):
+        """Sends one chat's messages in order; the task ends (and the chat is forgotten) once its queue is empty."""
+        while queue:
+            text, parse_mode = queue.popleft()
+            sent = await self._send_with_retry(chat_id, text, parse_mode)
+            with self._lock:
+                self._pending -= 1
+                self._stats["sent" if sent else "failed"] += 1
+                self._idle.notify_all()
+        del self._chats[chat_id]
+
+    async def _wait_for_slot(self, chat_id: str):
+        """Telegram allows about one message per second per chat (20 per minute in groups) and 30 per second overall."""
+        now = time.monotonic()
+        interval = self.group_interval if chat_id.startswith("-") else self.chat_interval
+        slot = max(now, self._next_chat_slot.get(chat_id, 0.0))
+        if self.global_rate > 0:
+            slot = max(slot, self._next_global_slot)
+            self._next_global_slot = slot + 1.0 / self.global_rate
+        self._next_chat_slot[chat_id] = slot + interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def _send(self, chat_id: str, text: str, parse_mode: Optional[str]):
+        if self._send_override is not None:
+            return await self._send_override(chat_id, text, parse_mode)
+        if self._bot is None:
+            bot = Bot(token=self.bot_token)
+            await bot.initialize()
+            self._bot = bot
+        return await self._bot.send_message(chat_id=chat_id, text=text, parse_mode=parse_mode)
+
+    async def _send_with_retry(self, chat_id: str, text: str, parse_mode: Optional[str]) -> bool:
+        attempt = 0
+        while True:
+            attempt += 1
+            await self._wait_for_slot(chat_id)
+            try:
+                await self._send(chat_id, text, parse_mode)
+                return True
+            except RetryAfter as e:
+                delay = _seconds(e.retry_after)  # flood control: Telegram tells us how long to wait
+                self._next_chat_slot[chat_id] = time.monotonic() + delay
+            except BadRequest as e:
+                if parse_mode and "parse" in str(e).lower():
+                    # Report markdown Telegram cannot parse (a split inside *bold*, stray underscores): send it as plain text
+                    with self._lock:
+                        self._stats["plain_text_fallbacks"] += 1
+                    parse_mode = None
+                    attempt -= 1
+                    continue
+                logger.error(f"Telegram rejected message for {chat_id}: {e}")
+                return False
+            except Forbidden as e:
+                logger.error(f"Telegram chat {chat_id} unavailable: {e}")
+                return False
+            except (NetworkError, ConnectionError, TimeoutError) as e:
+                delay = min(30.0, 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+                self._next_chat_slot[chat_id] = time.monotonic() + delay
+                logger.warning(f"Telegram send to {chat_id} failed (attempt {attempt}): {e}")
+            except Exception as e:
+                logger.error(f"Telegram send to {chat_id} failed: {e}", exc_info=True)
+                return False
+            if attempt >= self.max_attempts:
+                logger.error(f"Giving up on Telegram message for {chat_id} after {attempt} attempts")
+                return False
+            with self._lock:
+                self._stats["retries"] += 1
+
+
 class TelegramNotifier:
     """Sends prep pack summaries to bankers via Telegram"""
-    
-    def __init__(self):
+
+    def __init__(self, dispatcher: TelegramDispatcher = None):
         self.bot_token = getattr(Config, 'TELEGRAM_BOT_TOKEN', None)
         self.chat_id = getattr(Config, 'TELEGRAM_CHAT_ID', None)
         self.enabled = bool(self.bot_token and self.chat_id)
-        
+        self.dispatcher = dispatcher or TelegramDispatcher(self.bot_token)
+
         if not self.enabled:
             logger.warning("Telegram notifications disabled - missing TELEGRAM_BOT_TOKEN or TELEGRAM_CHAT_ID")
-    
-    def send_prep_pack(self, client_name: str, report_markdown: str):
-        """Send prep pack notification"""
+
+    def send_prep_pack(self, client_name: str, report_markdown: str, chat_id: str = None) -> bool:
+        """Queue the prep pack notification (returns at once; long reports go out as several messages)"""
         if not self.enabled:
-            return
-        
-        try:
-            # Format message for Telegram (max 4096 chars)
-            header = f"📊 *Prep Pack Generated*\n\n"
-            header += f"*Client:* {client_name}\n"
-            header += f"━━━━━━━━━━━━━━━━━━━━\n\n"
-            
-            # Truncate markdown if too long
-            max_content = 4096 - len(header) - 100
-            content = report_markdown[:max_content]
-            if len(report_markdown) > max_content:
-                content += "\n\n_[Report truncated - view full version in web app]_"
-            
-            message = header + content
-            
-            # Send message using the bot module
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            loop.run_until_complete(
-                send_telegram_notification(self.bot_token, self.chat_id, message)
-            )
-            loop.close()
-            
-            logger.info(f"Telegram notification sent for client: {client_name}")
-            
-        except Exception as e:
-            logger.error(f"Failed to send Telegram notification: {e}", exc_info=True)
+            return False
+
+        header = f"📊 *Prep Pack Generated*\n\n"
+        header += f"*Client:* {client_name}\n"
+        header += f"━━━━━━━━━━━━━━━━━━━━\n\n"
+
+        queued = self.dispatcher.submit(chat_id or self.chat_id, header + report_markdown)
+        if queued:
+            logger.info(f"Telegram notification queued for client: {client_name}")
+        return queued
+
+    def stats(self) -> dict:
+        stats = self.dispatcher.stats()
+        stats["enabled"] = self.enabled
+        return stats
 
 # Singleton instance
 telegram_notifier = TelegramNotifier()
@@ -1,44 +1,23 @@
 import os
-import json
 import random
 import datetime
+import logging
 from config import Config
+from repository import get_repository
+from fixture_cache import fixture_cache
+from bct_index import get_index
+from metrics import CLIENT_DATA_SECONDS
 
-def get_client_data(client_id: str) -> dict:
-    """Loads all fixture files for a client."""
-    base_path = os.path.join(Config.FAKE_DATA_PATH, client_id)
-    if not os.path.exists(base_path):
-        raise FileNotFoundError(f"Client data not found for {client_id} at {base_path}")
-
-    data = {}
-    files = [
-        "crm_profile.json",
-        "account_summary.json",
-        "products_owned.json",
-        "interactions_log.json",
-        "document_vault_index.json",
-        "client_case.json",
-        "centrale_des_risques.json"
-    ]
+logger = logging.getLogger(__name__)
 
-    for f in files:
-        path = os.path.join(base_path, f)
-        key = f.replace(".json", "")
-        if os.path.exists(path):
-            with open(path, "r", encoding="utf-8") as file:
-                data[key] = json.load(file)
-        else:
-            data[key] = {} # Return empty dict if file missing
-            
-    return data
+def get_client_data(client_id: str) -> dict:
+    """Loads all fixture files for a client (from the configured client repository)."""
+    with CLIENT_DATA_SECONDS.time(store=Config.CLIENT_STORE):
+        return get_repository().get_client_data(client_id)
 
 def get_product_catalog() -> list:
-    """Loads product catalog."""
-    path = Config.PRODUCT_CATALOG_PATH
-    if not os.path.exists(path):
-        return []
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    """Loads product catalog (cached until the file changes)."""
+    return fixture_cache.load_json(Config.PRODUCT_CATALOG_PATH, [])
 
 def new_id(prefix: str = "obj") -> str:
     """Generates a random ID."""
@@ -56,32 +35,47 @@ def reminder_dates(due_date_str: str) -> list:
     except ValueError:
         return []
 
-def search_bct_regulations(query_keywords: list = None) -> list:
-    """Simulates searching the local BCT knowledge base."""
+_bct_kb_path = None
+
+def get_bct_knowledge_base_path() -> str:
+    """Locates the BCT knowledge base file (None if missing)."""
+    global _bct_kb_path
+    if _bct_kb_path and os.path.exists(_bct_kb_path):
+        return _bct_kb_path
+
     path = os.path.join("data", "bct_knowledge_base.json")
     # Handle absolute/relative path if needed, assuming run from root
     if not os.path.exists(path):
          # Try connecting to Config path location if that's safer
         path = os.path.join(Config.FAKE_DATA_PATH, "..", "bct_knowledge_base.json")
         if not os.path.exists(path):
-            return []
+            return None
+    _bct_kb_path = path
+    return path
+
+def search_bct_regulations(query_keywords: list = None, top_k: int = None) -> list:
+    """
+    Searches the local BCT knowledge base (BM25 over title, summary and keywords).
+    Without keywords, or when none of them occurs in the base, the whole base is returned;
+    otherwise the best `top_k` matches, best first.
+    """
+    path = get_bct_knowledge_base_path()
+    if not path:
+        return []
             
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            kb = json.load(f)
+        kb = fixture_cache.load_json(path, [])
     except:
         return []
 
     if not query_keywords:
         return kb
 
-    results = []
-    for item in kb:
-        # naive match
-        text = (item["title"] + " " + item["summary"]).lower()
-        if any(k.lower() in text for k in query_keywords):
-            results.append(item)
-    return results
+    matches = [item for _, item in get_index(kb).search(query_keywords, top_k or len(kb))]
+    if not matches:
+        logger.info(f"No BCT circular matches {query_keywords}; sending the whole knowledge base")
+        return kb
+    return matches
 
 def calculate_loan_payment(amount: float, rate_percent: float, duration_months: int) -> float:
     """Calculates monthly payment (PMT)."""